@@ -0,0 +1,28 @@
+"""tasks created_at index
+
+Revision ID: 6c3a9e1f7b20
+Revises: 0b8f5d3e6a21
+Create Date: 2026-10-18 16:21:05.482917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6c3a9e1f7b20'
+down_revision: Union[str, Sequence[str], None] = '0b8f5d3e6a21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_tasks_created_at_id', 'tasks', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_created_at_id', table_name='tasks')
@@ -0,0 +1,51 @@
+"""task counters
+
+Revision ID: 90af34792974
+Revises: d4233c5545b6
+Create Date: 2026-10-18 10:05:13.402911
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '90af34792974'
+down_revision: Union[str, Sequence[str], None] = 'd4233c5545b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('task_counters',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('completed', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('low', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('medium', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('high', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.execute(
+        """
+        INSERT INTO task_counters (user_id, total, completed, low, medium, high)
+        SELECT user_id,
+               count(*),
+               count(*) FILTER (WHERE is_completed),
+               count(*) FILTER (WHERE priority = 'LOW'),
+               count(*) FILTER (WHERE priority = 'MEDIUM'),
+               count(*) FILTER (WHERE priority = 'HIGH')
+        FROM tasks
+        WHERE user_id IS NOT NULL
+        GROUP BY user_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('task_counters')
@@ -0,0 +1,32 @@
+"""tasks filter indexes
+
+Revision ID: a81f2d6c4e07
+Revises: 3b7e51c0a9d2
+Create Date: 2026-10-18 12:03:27.540113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a81f2d6c4e07'
+down_revision: Union[str, Sequence[str], None] = '3b7e51c0a9d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_tasks_user_id_due_date', 'tasks', ['user_id', 'due_date'], unique=False)
+    op.create_index('ix_tasks_user_id_is_completed_due_date', 'tasks', ['user_id', 'is_completed', 'due_date'], unique=False)
+    op.create_index('ix_tasks_user_id_priority_due_date', 'tasks', ['user_id', 'priority', 'due_date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_user_id_priority_due_date', table_name='tasks')
+    op.drop_index('ix_tasks_user_id_is_completed_due_date', table_name='tasks')
+    op.drop_index('ix_tasks_user_id_due_date', table_name='tasks')
@@ -0,0 +1,28 @@
+"""task counters version
+
+Revision ID: c5e0b9a37f14
+Revises: a81f2d6c4e07
+Create Date: 2026-10-18 13:21:06.774352
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e0b9a37f14'
+down_revision: Union[str, Sequence[str], None] = 'a81f2d6c4e07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('task_counters', sa.Column('version', sa.BigInteger(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('task_counters', 'version')
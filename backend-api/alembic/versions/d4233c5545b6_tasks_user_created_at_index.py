@@ -0,0 +1,28 @@
+"""tasks user created_at index
+
+Revision ID: d4233c5545b6
+Revises: 5f20fc39e721
+Create Date: 2026-10-18 09:12:40.118274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4233c5545b6'
+down_revision: Union[str, Sequence[str], None] = '5f20fc39e721'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_tasks_user_id_created_at_id', 'tasks', ['user_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_user_id_created_at_id', table_name='tasks')
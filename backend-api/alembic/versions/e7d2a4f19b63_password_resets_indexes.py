@@ -0,0 +1,32 @@
+"""password resets indexes
+
+Revision ID: e7d2a4f19b63
+Revises: c5e0b9a37f14
+Create Date: 2026-10-18 14:02:41.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7d2a4f19b63'
+down_revision: Union[str, Sequence[str], None] = 'c5e0b9a37f14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_password_resets_user_id', 'password_resets', ['user_id'], unique=False)
+    op.create_index('ix_password_resets_expires_at', 'password_resets', ['expires_at'], unique=False)
+    op.create_index('ix_password_resets_used', 'password_resets', ['id'], unique=False, postgresql_where=sa.text('used'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_password_resets_used', table_name='password_resets')
+    op.drop_index('ix_password_resets_expires_at', table_name='password_resets')
+    op.drop_index('ix_password_resets_user_id', table_name='password_resets')
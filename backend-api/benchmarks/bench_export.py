@@ -0,0 +1,75 @@
+"""
+Peak RSS and rows/s for the task export stream.
+
+    python -m benchmarks.bench_export --rows 1000000 --format ndjson
+
+Seeds a throwaway user with --rows tasks using one INSERT ... SELECT
+generate_series, drains stream_tasks() the way StreamingResponse would,
+then deletes the user and its tasks again.
+"""
+import argparse
+import resource
+import time
+import uuid
+from sqlalchemy import text
+from sqlmodel import Session
+
+from src.db import engine
+from src.tasks.export import ExportFormat, export_statement, stream_tasks, task_filters
+
+
+def _peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def seed(rows: int) -> int:
+    with Session(engine) as session:
+        user_id = session.exec(
+            text("INSERT INTO users (email, hashed_password, created_at) VALUES (:email, 'x', now()) RETURNING id"),
+            params={"email": f"bench-{uuid.uuid4().hex[:8]}@example.com"},
+        ).scalar_one()
+        session.exec(
+            text(
+                """
+                INSERT INTO tasks (title, description, due_date, priority, is_completed, created_at, updated_at, user_id)
+                SELECT 'Task ' || n, 'Benchmark task number ' || n, now() + n * interval '1 minute',
+                       (ARRAY['LOW', 'MEDIUM', 'HIGH'])[1 + n % 3]::priority, n % 4 = 0,
+                       now() - n * interval '1 second', now(), :user_id
+                FROM generate_series(1, :rows) AS n
+                """
+            ),
+            params={"user_id": user_id, "rows": rows},
+        )
+        session.commit()
+    return user_id
+
+def cleanup(user_id: int) -> None:
+    with Session(engine) as session:
+        session.exec(text("DELETE FROM tasks WHERE user_id = :user_id"), params={"user_id": user_id})
+        session.exec(text("DELETE FROM users WHERE id = :user_id"), params={"user_id": user_id})
+        session.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=[f.value for f in ExportFormat], default=ExportFormat.NDJSON.value)
+    args = parser.parse_args()
+
+    user_id = seed(args.rows)
+    try:
+        baseline = _peak_rss_mb()
+        stmt = export_statement(task_filters(user_id))
+        started = time.perf_counter()
+        total_bytes = 0
+        for chunk in stream_tasks(lambda: Session(engine), stmt, ExportFormat(args.format)):
+            total_bytes += len(chunk)
+        elapsed = time.perf_counter() - started
+    finally:
+        cleanup(user_id)
+
+    print(f"rows:      {args.rows:,} ({args.format}, {total_bytes / 1024 / 1024:,.1f} MiB)")
+    print(f"rows/s:    {args.rows / elapsed:,.0f}")
+    print(f"peak RSS:  {_peak_rss_mb():,.1f} MiB (+{_peak_rss_mb() - baseline:,.1f} MiB while streaming)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Tasks/s for the COPY-based importer.
+
+    python -m benchmarks.bench_import --rows 1000000 --format csv
+
+Generates the input file in memory, imports it for a throwaway user and
+deletes everything again afterwards.
+"""
+import argparse
+import io
+import json
+import time
+from sqlmodel import Session
+
+from src.db import engine
+from src.tasks.export import ExportFormat
+from src.tasks.importer import import_tasks
+from .bench_export import cleanup, seed
+
+PRIORITIES = ("LOW", "MEDIUM", "HIGH")
+
+
+def generate(rows: int, import_format: ExportFormat) -> io.StringIO:
+    buffer = io.StringIO()
+    if import_format == ExportFormat.CSV:
+        buffer.write("title,description,priority,is_completed,due_date\n")
+        for n in range(rows):
+            buffer.write(f"Imported task {n},Benchmark row {n},{PRIORITIES[n % 3]},{n % 4 == 0},2030-01-01T00:00:00\n")
+    else:
+        for n in range(rows):
+            buffer.write(json.dumps({
+                "title": f"Imported task {n}",
+                "description": f"Benchmark row {n}",
+                "priority": PRIORITIES[n % 3],
+                "is_completed": n % 4 == 0,
+                "due_date": "2030-01-01T00:00:00",
+            }) + "\n")
+    buffer.seek(0)
+    return buffer
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=[f.value for f in ExportFormat], default=ExportFormat.CSV.value)
+    args = parser.parse_args()
+
+    import_format = ExportFormat(args.format)
+    stream = generate(args.rows, import_format)
+    user_id = seed(0)
+    try:
+        started = time.perf_counter()
+        with Session(engine) as session:
+            report = import_tasks(session, user_id, stream, import_format)
+        elapsed = time.perf_counter() - started
+    finally:
+        cleanup(user_id)
+
+    print(f"imported:  {report.imported:,} ({report.failed:,} failed, {args.format})")
+    print(f"elapsed:   {elapsed:,.2f}s")
+    print(f"tasks/s:   {report.imported / elapsed:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Verified-token throughput on a single core, before and after memoization.
+
+    python -m benchmarks.bench_jwt --tokens 100 --seconds 3
+
+"before" is a plain jwt.decode per request; "after" goes through
+decode_token, which serves repeat tokens from the verified-token cache.
+"""
+import argparse
+import itertools
+import time
+import jwt
+
+from src import settings
+from src.users.helpers import ALGORITHM, create_access_token, decode_token, token_cache
+
+
+def _throughput(fn, tokens: list[str], seconds: float) -> float:
+    calls = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    for token in itertools.cycle(tokens):
+        fn(token)
+        calls += 1
+        if calls % 1000 == 0 and time.perf_counter() >= deadline:
+            break
+    return calls / (time.perf_counter() - started)
+
+def _uncached(token: str):
+    return jwt.decode(token, settings.AUTHJWT_SECRET_KEY, algorithms=[ALGORITHM])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=100, help="distinct live tokens (active users)")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    tokens = [create_access_token({"sub": f"user{i}@example.com", "uid": i}) for i in range(args.tokens)]
+    token_cache.resize(settings.TOKEN_CACHE_SIZE)
+    token_cache.clear()
+
+    before = _throughput(_uncached, tokens, args.seconds)
+    after = _throughput(decode_token, tokens, args.seconds)
+    print(f"jwt.decode:    {before:>12,.0f} verifications/s/core")
+    print(f"decode_token:  {after:>12,.0f} verifications/s/core ({after / before:.1f}x)")
+    print(f"cache:         {token_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Time to load and serialize one page of tasks, ORM + response_model versus the
+FAST_TASK_SERIALIZATION path.
+
+    python -m benchmarks.bench_serialization --page-size 100 --iterations 500
+
+Seeds a throwaway user with one page of tasks. The ORM path loads Task
+instances and renders them exactly as FastAPI does for response_model; the
+fast path selects row tuples and calls serialization.dump_page. Both start
+from a fresh Session per iteration, like a request would.
+"""
+import argparse
+import asyncio
+import time
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from sqlmodel import Session, select
+
+from src.db import engine
+from src.models import Task
+from src.tasks.schemas import PaginatedTaskSchema
+from src.tasks.serialization import dump_page, select_task_rows
+from .bench_export import cleanup, seed
+
+response_field = create_model_field(name="Response", type_=PaginatedTaskSchema, mode="serialization")
+loop = asyncio.new_event_loop()
+
+
+def _page(items, limit: int) -> dict:
+    return dict(items=items, total=len(items), limit=limit, offset=0, has_next=False, next_cursor=None)
+
+def orm_path(user_id: int, limit: int) -> bytes:
+    with Session(engine) as session:
+        tasks = session.exec(select(Task).where(Task.user_id == user_id).order_by(Task.created_at, Task.id).limit(limit)).all()
+        content = PaginatedTaskSchema(**_page(tasks, limit))
+    # what FastAPI's request handler does with a response_model
+    content = loop.run_until_complete(serialize_response(field=response_field, response_content=content, is_coroutine=False))
+    return JSONResponse(content).body
+
+def fast_path(user_id: int, limit: int) -> bytes:
+    with Session(engine) as session:
+        rows = session.exec(select_task_rows().where(Task.user_id == user_id).order_by(Task.created_at, Task.id).limit(limit)).all()
+    return dump_page(_page(rows, limit))
+
+def measure(path, user_id: int, limit: int, iterations: int) -> float:
+    path(user_id, limit)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        path(user_id, limit)
+    return (time.perf_counter() - started) / iterations
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    user_id = seed(args.page_size)
+    try:
+        assert orm_path(user_id, args.page_size) == fast_path(user_id, args.page_size), "paths must be byte-compatible"
+        orm = measure(orm_path, user_id, args.page_size, args.iterations)
+        fast = measure(fast_path, user_id, args.page_size, args.iterations)
+    finally:
+        cleanup(user_id)
+
+    print(f"page size: {args.page_size}")
+    print(f"orm:       {orm * 1000:,.2f} ms/page ({1 / orm:,.0f} pages/s)")
+    print(f"fast:      {fast * 1000:,.2f} ms/page ({1 / fast:,.0f} pages/s)")
+    print(f"speedup:   {orm / fast:,.1f}x")
+
+
+if __name__ == "__main__":
+    main()
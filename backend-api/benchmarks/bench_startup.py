@@ -0,0 +1,96 @@
+"""
+Cold-start cost: import time, time to first request, and gunicorn boot.
+
+    python -m benchmarks.bench_startup --runs 5
+    python -m benchmarks.bench_startup --gunicorn 4
+
+Every measurement runs in a fresh interpreter. "import" is `import src.main`
+alone; "app" adds building the application; "first request" adds the
+lifespan startup and a first GET /api/users/ (which opens the first
+database connection). With --gunicorn N it also boots N workers with and
+without --preload and reports when all of them finished startup and the
+CPU time the boot cost.
+"""
+import argparse
+import json
+import re
+import resource
+import signal
+import statistics
+import subprocess
+import sys
+import time
+
+PROBE = r"""
+import json, time
+started = time.perf_counter()
+import src.main
+imported = time.perf_counter()
+from src.main import app
+built = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app) as client:
+    ready = time.perf_counter()
+    assert client.get("/api/users/").status_code == 200
+    served = time.perf_counter()
+print(json.dumps({
+    "import": imported - started,
+    "app": built - started,
+    "startup": ready - started,
+    "first request": served - started,
+}))
+"""
+
+READY = re.compile(rb"Application startup complete")
+
+
+def probe(runs: int) -> dict[str, float]:
+    samples: dict[str, list[float]] = {}
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", PROBE], capture_output=True, text=True, check=True).stdout
+        for name, seconds in json.loads(out.strip().splitlines()[-1]).items():
+            samples.setdefault(name, []).append(seconds)
+    return {name: statistics.median(values) for name, values in samples.items()}
+
+def boot_gunicorn(workers: int, preload: bool, port: int, argv: list[str]) -> tuple[float, float]:
+    """Seconds until every worker finished startup, and CPU seconds spent by then."""
+    cmd = [sys.executable, "-m", *argv, "-w", str(workers), "-b", f"127.0.0.1:{port}"]
+    if preload:
+        cmd.append("--preload")
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    started = time.perf_counter()
+    proc = subprocess.Popen(cmd, stderr=subprocess.PIPE, stdout=subprocess.DEVNULL)
+    ready = 0
+    try:
+        for line in proc.stderr:
+            ready += bool(READY.search(line))
+            if ready == workers:
+                break
+        elapsed = time.perf_counter() - started
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait()
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+    return elapsed, cpu
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--gunicorn", type=int, default=0, metavar="WORKERS", help="also boot gunicorn with this many workers")
+    parser.add_argument("--port", type=int, default=8099)
+    args = parser.parse_args()
+
+    for name, seconds in probe(args.runs).items():
+        print(f"{name + ':':<15}{seconds * 1000:>9,.0f} ms (median of {args.runs})")
+
+    if args.gunicorn:
+        argv = ["gunicorn", "-k", "uvicorn.workers.UvicornWorker", "src.main:app"]
+        for preload in (False, True):
+            elapsed, cpu = boot_gunicorn(args.gunicorn, preload, args.port, argv)
+            label = "gunicorn --preload:" if preload else "gunicorn:"
+            print(f"{label:<21}{args.gunicorn} workers ready in {elapsed * 1000:,.0f} ms, {cpu:,.2f} s CPU")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Latency and database round trips per single-task write.
+
+    python -m benchmarks.bench_writes --requests 500
+
+Drives PATCH and DELETE /api/tasks/{id} through the app for a throwaway user
+and counts what each request sends to Postgres (statements plus BEGIN,
+COMMIT and ROLLBACK). Every round trip costs one network RTT in production,
+so the count is what matters once the database is not on localhost.
+"""
+import argparse
+import statistics
+import time
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+from sqlmodel import Session
+
+from src.db import engine
+from src.main import app
+from src.users.helpers import create_access_token
+from .bench_export import cleanup, seed
+
+round_trips = 0
+
+
+def _count(*args, **kwargs):
+    global round_trips
+    round_trips += 1
+
+for name in ("before_cursor_execute", "begin", "commit", "rollback"):
+    event.listen(engine, name, _count)
+
+
+def measure(client: TestClient, method: str, urls: list[str], headers: dict, **kwargs) -> tuple[float, float]:
+    global round_trips
+    latencies, trips = [], []
+    for url in urls:
+        round_trips = 0
+        started = time.perf_counter()
+        res = client.request(method, url, headers=headers, **kwargs)
+        latencies.append(time.perf_counter() - started)
+        trips.append(round_trips)
+        assert res.status_code < 300, res.text
+    return statistics.median(latencies) * 1000, statistics.median(trips)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    user_id = seed(args.requests)
+    try:
+        with Session(engine) as session:
+            email = session.exec(text("SELECT email FROM users WHERE id = :id"), params={"id": user_id}).scalar_one()
+            task_ids = session.exec(text("SELECT id FROM tasks WHERE user_id = :id"), params={"id": user_id}).scalars().all()
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': email, 'uid': user_id})}"}
+        urls = [f"/api/tasks/{task_id}" for task_id in task_ids]
+        with TestClient(app) as client:
+            client.get("/api/tasks/user", headers=headers)  # warm the user cache and pool
+            patch = measure(client, "PATCH", urls, headers, json={"is_completed": True, "priority": "HIGH"})
+            delete = measure(client, "DELETE", urls, headers)
+    finally:
+        cleanup(user_id)
+
+    print(f"PATCH:     p50 {patch[0]:,.2f} ms, {patch[1]:g} round trips")
+    print(f"DELETE:    p50 {delete[0]:,.2f} ms, {delete[1]:g} round trips")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Diff two benchmarks.load reports.
+
+    python -m benchmarks.compare benchmarks/results/1056725-asgi.json benchmarks/results/04550ec-asgi.json
+
+Prints every metric per scenario as old -> new with the relative change.
+"""
+import argparse
+import json
+from pathlib import Path
+
+METRICS = ("throughput_rps", "p50_ms", "p95_ms", "p99_ms", "queries_per_request", "errors")
+
+
+def _change(old, new) -> str:
+    if old is None or new is None:
+        return ""
+    if old == 0:
+        return "" if new == 0 else "new"
+    return f"{(new - old) / old:+.1%}"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("old", type=Path)
+    parser.add_argument("new", type=Path)
+    args = parser.parse_args()
+
+    old, new = (json.loads(path.read_text()) for path in (args.old, args.new))
+    print(f"{old['meta']['commit']} -> {new['meta']['commit']} ({new['meta']['target']})")
+    for name in new["scenarios"]:
+        if name not in old["scenarios"]:
+            continue
+        print(f"\n{name}")
+        for metric in METRICS:
+            before, after = old["scenarios"][name].get(metric), new["scenarios"][name].get(metric)
+            print(f"  {metric:<20}{before!s:>10} -> {after!s:<10}{_change(before, after):>8}")
+
+
+if __name__ == "__main__":
+    main()
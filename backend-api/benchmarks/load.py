@@ -0,0 +1,281 @@
+"""
+Scripted load scenarios against the ASGI app in-process or a running server.
+
+    python -m benchmarks.seed --users 1000 --max-tasks 100000
+    python -m benchmarks.load --requests 500 --concurrency 8
+    python -m benchmarks.load --url http://localhost:8000 --concurrency 32
+
+Scenarios (--scenarios, in this order): login, list (first page of a random
+user's list, half of them filtered and sorted by due date), paginate
+(cursor walks through the largest lists), create, update and delete (on the
+tasks create made, so the seeded data is left as it was).
+
+Reports p50/p95/p99 latency, throughput and database statements per request
+for each scenario, and writes the whole run as JSON (default
+benchmarks/results/<commit>-<target>.json) for benchmarks.compare.
+
+Statements are counted with engine events in-process; against --url they
+come from pg_stat_statements when the extension is installed (and include
+everything else hitting the database). Start the server with
+RATE_LIMIT_BACKEND=none, or login will mostly measure 429s.
+"""
+import argparse
+import json
+import random
+import statistics
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+import httpx
+from sqlalchemy import event, text
+from sqlmodel import Session
+
+from src.db import async_engine, engine
+from src.users.helpers import create_access_token
+from .seed import BENCH_PASSWORD, seeded_users
+
+SCENARIOS = ("login", "list", "paginate", "create", "update", "delete")
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+class Recorder:
+    def __init__(self, client: httpx.Client):
+        self.client = client
+        self.latencies: list[float] = []
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        started = time.perf_counter()
+        res = self.client.request(method, url, **kwargs)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.latencies.append(elapsed)
+            self.errors += res.status_code >= 400
+        return res
+
+
+class StatementCounter:
+    """Statements sent to Postgres, from engine events or pg_stat_statements."""
+
+    def __init__(self, remote: bool):
+        self.remote = remote
+        self.count = 0
+        self.available = True
+        if not remote:
+            for target in (engine, async_engine.sync_engine):
+                event.listen(target, "before_cursor_execute", self._count)
+        else:
+            self.available = self._pg_stat_statements() is not None
+
+    def _count(self, *args):
+        self.count += 1
+
+    def _pg_stat_statements(self) -> int | None:
+        try:
+            with engine.connect() as conn:
+                return conn.execute(text("SELECT coalesce(sum(calls), 0) FROM pg_stat_statements")).scalar_one()
+        except Exception:
+            return None
+
+    def read(self) -> int | None:
+        if not self.available:
+            return None
+        return self._pg_stat_statements() if self.remote else self.count
+
+
+class Context:
+    def __init__(self, users: list, tokens: dict, requests: int):
+        self.users = users
+        self.tokens = tokens
+        self.requests = requests
+        self.created: list[tuple[int, int]] = []
+        self._lock = threading.Lock()
+
+    def headers(self, user_id: int) -> dict:
+        return {"Authorization": f"Bearer {self.tokens[user_id]}"}
+
+    def random_user(self) -> int:
+        return random.choice(self.users)[0]
+
+
+def login_jobs(ctx: Context) -> list[Callable]:
+    emails = [email for _, email, _ in ctx.users]
+    def job(rec: Recorder):
+        rec.request("POST", "/api/users/login", json={"email": random.choice(emails), "password": BENCH_PASSWORD})
+    return [job] * ctx.requests
+
+def list_jobs(ctx: Context) -> list[Callable]:
+    def job(rec: Recorder):
+        user_id = ctx.random_user()
+        params = {"offset": 0, "limit": 20}
+        if random.random() < 0.5:
+            params.update(is_completed="false", sort="due_date")
+        rec.request("GET", "/api/tasks/user", params=params, headers=ctx.headers(user_id))
+    return [job] * ctx.requests
+
+def paginate_jobs(ctx: Context, pages: int = 50) -> list[Callable]:
+    def walk(user_id: int):
+        def job(rec: Recorder):
+            params = {"offset": 0, "limit": 100, "include_total": "false"}
+            for _ in range(pages):
+                body = rec.request("GET", "/api/tasks/user", params=params, headers=ctx.headers(user_id)).json()
+                if not body.get("next_cursor"):
+                    break
+                params = {"limit": 100, "cursor": body["next_cursor"], "include_total": "false"}
+        return job
+    heaviest = [user_id for user_id, _, _ in ctx.users[: max(1, ctx.requests // pages)]]
+    return [walk(user_id) for user_id in heaviest]
+
+def create_jobs(ctx: Context) -> list[Callable]:
+    def job(rec: Recorder):
+        user_id = ctx.random_user()
+        res = rec.request("POST", "/api/tasks", json={"title": "Bench task", "priority": "HIGH"}, headers=ctx.headers(user_id))
+        if res.status_code < 300:
+            with ctx._lock:
+                ctx.created.append((user_id, res.json()["id"]))
+    return [job] * ctx.requests
+
+def update_jobs(ctx: Context) -> list[Callable]:
+    def update(user_id: int, task_id: int):
+        def job(rec: Recorder):
+            rec.request("PATCH", f"/api/tasks/{task_id}", json={"is_completed": True}, headers=ctx.headers(user_id))
+        return job
+    return [update(*created) for created in ctx.created]
+
+def delete_jobs(ctx: Context) -> list[Callable]:
+    def delete(user_id: int, task_id: int):
+        def job(rec: Recorder):
+            rec.request("DELETE", f"/api/tasks/{task_id}", headers=ctx.headers(user_id))
+        return job
+    jobs = [delete(*created) for created in ctx.created]
+    ctx.created = []
+    return jobs
+
+JOBS = {
+    "login": login_jobs,
+    "list": list_jobs,
+    "paginate": paginate_jobs,
+    "create": create_jobs,
+    "update": update_jobs,
+    "delete": delete_jobs,
+}
+
+
+def _percentile(latencies: list[float], q: int) -> float:
+    if len(latencies) < 2:
+        return latencies[0] if latencies else 0.0
+    return statistics.quantiles(latencies, n=100, method="inclusive")[q - 1]
+
+def run_scenario(client: httpx.Client, jobs: list[Callable], concurrency: int, counter: StatementCounter) -> dict:
+    rec = Recorder(client)
+    before = counter.read()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(job, rec) for job in jobs]:
+            future.result()
+    elapsed = time.perf_counter() - started
+    after = counter.read()
+    requests = len(rec.latencies)
+    ms = [latency * 1000 for latency in rec.latencies]
+    return {
+        "requests": requests,
+        "errors": rec.errors,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(_percentile(ms, 50), 2),
+        "p95_ms": round(_percentile(ms, 95), 2),
+        "p99_ms": round(_percentile(ms, 99), 2),
+        "mean_ms": round(statistics.fmean(ms), 2) if ms else 0.0,
+        "queries_per_request": round((after - before) / requests, 2) if requests and after is not None else None,
+    }
+
+def _git_commit() -> tuple[str, bool]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="base URL of a running server; default is the ASGI app in-process")
+    parser.add_argument("--tag", default="default", help="seed tag (see benchmarks.seed)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario; paginate walks requests / 50 lists of up to 50 pages")
+    parser.add_argument("--login-requests", type=int, default=50, help="logins are bcrypt-bound, so fewer by default")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0, help="random seed, so runs pick the same users")
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    scenarios = [name for name in SCENARIOS if name in args.scenarios.split(",")]
+    random.seed(args.seed)
+    with Session(engine) as session:
+        users = seeded_users(session, args.tag)
+    if not users:
+        parser.error(f"no users seeded under tag {args.tag!r}; run python -m benchmarks.seed first")
+    tokens = {user_id: create_access_token({"sub": email, "uid": user_id}) for user_id, email, _ in users}
+
+    if args.url:
+        client = httpx.Client(base_url=args.url, timeout=60, limits=httpx.Limits(max_connections=args.concurrency))
+        target = args.url
+    else:
+        from fastapi.testclient import TestClient
+        from src.main import app
+        from src.users.ratelimit import rate_limiter
+        rate_limiter.backend = None  # every login comes from one address
+        client = TestClient(app)
+        client.__enter__()
+        target = "asgi"
+    counter = StatementCounter(remote=bool(args.url))
+    ctx = Context(users, tokens, args.requests)
+
+    results = {}
+    try:
+        for name in scenarios:
+            ctx.requests = args.login_requests if name == "login" else args.requests
+            if name in ("update", "delete") and not ctx.created:
+                # nothing to modify yet: create the tasks untimed
+                run_scenario(client, create_jobs(ctx), args.concurrency, counter)
+            results[name] = run_scenario(client, JOBS[name](ctx), args.concurrency, counter)
+    finally:
+        if ctx.created:
+            run_scenario(client, delete_jobs(ctx), args.concurrency, counter)
+        if args.url:
+            client.close()
+        else:
+            client.__exit__(None, None, None)
+
+    commit, dirty = _git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "dirty": dirty,
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "target": target,
+            "tag": args.tag,
+            "users": len(users),
+            "concurrency": args.concurrency,
+        },
+        "scenarios": results,
+    }
+    output = args.output or RESULTS_DIR / f"{commit}-{'asgi' if target == 'asgi' else 'server'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n")
+
+    print(f"{'scenario':<10}{'reqs':>7}{'err':>5}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'q/req':>7}")
+    for name, r in results.items():
+        queries = "-" if r["queries_per_request"] is None else f"{r['queries_per_request']:g}"
+        print(f"{name:<10}{r['requests']:>7}{r['errors']:>5}{r['throughput_rps']:>9,.1f}"
+              f"{r['p50_ms']:>9,.2f}{r['p95_ms']:>9,.2f}{r['p99_ms']:>9,.2f}{queries:>7}")
+    print(f"written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Realistic benchmark data: N users with Zipf-skewed task counts.
+
+    python -m benchmarks.seed --users 1000 --max-tasks 100000 --skew 1.0
+    python -m benchmarks.seed --cleanup
+
+The user of rank r gets max(--min-tasks, --max-tasks / r ** --skew) tasks,
+so a handful of users own 100k-task lists and the long tail owns a few
+dozen, as in production. Everything is written with set-based SQL (one
+INSERT ... SELECT per table) and task_counters are rebuilt afterwards.
+Seeded users share the password BENCH_PASSWORD and are tagged by email
+(bench-<tag>-<n>@example.com) so runs can coexist and be cleaned up.
+"""
+import argparse
+import time
+from sqlalchemy import text
+from sqlmodel import Session
+
+from src.db import engine
+from src.tasks.counters import rebuild_counters
+from src.users.helpers import hash_password
+
+BENCH_PASSWORD = "bench-password"
+
+
+def _pattern(tag: str) -> str:
+    return f"bench-{tag}-%@example.com"
+
+def seed(users: int, max_tasks: int, min_tasks: int = 10, skew: float = 1.0, tag: str = "default") -> int:
+    """Returns the number of tasks written."""
+    hashed = hash_password(BENCH_PASSWORD)  # one bcrypt for every user
+    with Session(engine) as session:
+        session.exec(
+            text(
+                """
+                INSERT INTO users (email, hashed_password, created_at)
+                SELECT 'bench-' || :tag || '-' || n || '@example.com', :hashed, now()
+                FROM generate_series(1, :users) AS n
+                """
+            ),
+            params={"tag": tag, "hashed": hashed, "users": users},
+        )
+        tasks = session.exec(
+            text(
+                """
+                INSERT INTO tasks (title, description, due_date, priority, is_completed, created_at, updated_at, user_id)
+                SELECT 'Task ' || n, 'Benchmark task number ' || n,
+                       CASE WHEN n % 5 = 0 THEN NULL ELSE now() + (n % 720 - 360) * interval '1 hour' END,
+                       (ARRAY['LOW', 'MEDIUM', 'HIGH'])[1 + n % 3]::priority, n % 4 = 0,
+                       now() - n * interval '1 second', now(), u.id
+                FROM (
+                    SELECT id, row_number() OVER (ORDER BY id) AS rank
+                    FROM users WHERE email LIKE :pattern
+                ) AS u
+                CROSS JOIN LATERAL generate_series(
+                    1, greatest(:min_tasks, floor(:max_tasks / power(u.rank, :skew)))::int
+                ) AS n
+                """
+            ),
+            params={"pattern": _pattern(tag), "min_tasks": min_tasks, "max_tasks": max_tasks, "skew": skew},
+        ).rowcount
+        for user_id, _, _ in seeded_users(session, tag):
+            rebuild_counters(session, user_id)
+        session.commit()
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").exec_driver_sql("ANALYZE users, tasks, task_counters")
+    return tasks
+
+def seeded_users(session: Session, tag: str = "default") -> list[tuple[int, str, int]]:
+    """(id, email, task count) of the seeded users, largest task lists first."""
+    return session.exec(
+        text(
+            """
+            SELECT u.id, u.email, coalesce(c.total, 0) AS total
+            FROM users u LEFT JOIN task_counters c ON c.user_id = u.id
+            WHERE u.email LIKE :pattern
+            ORDER BY total DESC, u.id
+            """
+        ),
+        params={"pattern": _pattern(tag)},
+    ).all()
+
+def cleanup(tag: str = "default") -> int:
+    """Deletes the seeded users and everything they own. Returns the number of users removed."""
+    with Session(engine) as session:
+        user_ids = [user_id for user_id, _, _ in seeded_users(session, tag)]
+        if user_ids:
+            params = {"ids": user_ids}
+            for table in ("tasks", "task_counters", "password_resets"):
+                session.exec(text(f"DELETE FROM {table} WHERE user_id = ANY(:ids)"), params=params)
+            session.exec(text("DELETE FROM users WHERE id = ANY(:ids)"), params=params)
+        session.commit()
+    return len(user_ids)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--max-tasks", type=int, default=100_000, help="tasks of the largest user")
+    parser.add_argument("--min-tasks", type=int, default=10)
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent; higher concentrates tasks in fewer users")
+    parser.add_argument("--tag", default="default")
+    parser.add_argument("--cleanup", action="store_true", help="delete the users seeded under --tag and exit")
+    args = parser.parse_args()
+
+    if args.cleanup:
+        print(f"Removed {cleanup(args.tag):,} user(s) tagged {args.tag!r}.")
+        return
+    started = time.perf_counter()
+    tasks = seed(args.users, args.max_tasks, min_tasks=args.min_tasks, skew=args.skew, tag=args.tag)
+    print(f"Seeded {args.users:,} users and {tasks:,} tasks tagged {args.tag!r} in {time.perf_counter() - started:,.1f}s.")
+
+
+if __name__ == "__main__":
+    main()
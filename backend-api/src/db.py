@@ -1,13 +1,104 @@
+import threading
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 from . import settings
+from .metrics import TimedAsyncQueuePool, TimedQueuePool, instrument_engine
+from .profiler import profile_engine
 
-database_url = settings.DATABASE_URL
-print(database_url)
-engine = create_engine(database_url, echo=True)
+# engines are created on first use, not at import: under `gunicorn --preload`
+# the app is imported in the master, and pooled connections must not cross the fork
+_engines: dict = {}
+_engines_lock = threading.Lock()
+
+
+def to_async_url(url: str) -> str:
+    return make_url(url).set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+
+def _database_url() -> str:
+    if not settings.DATABASE_URL:
+        raise RuntimeError("DATABASE_URL is not set")
+    return settings.DATABASE_URL
+
+def build_engine(url: str, label: str):
+    engine = create_engine(
+        url,
+        echo=settings.SQL_ECHO,
+        poolclass=TimedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+    )
+    engine.pool.metrics_label = label
+    instrument_engine(engine, label)
+    profile_engine(engine)
+    return engine
+
+def build_async_engine(url: str, label: str):
+    engine = create_async_engine(
+        url,
+        echo=settings.SQL_ECHO,
+        poolclass=TimedAsyncQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+    )
+    engine.pool.metrics_label = label
+    instrument_engine(engine.sync_engine, label)
+    profile_engine(engine.sync_engine)
+    return engine
+
+def get_engine():
+    engine = _engines.get("sync")
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get("sync")
+            if engine is None:
+                engine = _engines["sync"] = build_engine(_database_url(), "sync")
+    return engine
+
+def get_async_engine():
+    engine = _engines.get("async")
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get("async")
+            if engine is None:
+                url = settings.ASYNC_DATABASE_URL or to_async_url(_database_url())
+                engine = _engines["async"] = build_async_engine(url, "async")
+    return engine
+
+def dispose_engines() -> None:
+    """Forget the engines so the next use builds them from the current settings."""
+    with _engines_lock:
+        engines = list(_engines.values())
+        _engines.clear()
+    for engine in engines:
+        if hasattr(engine, "sync_engine"):
+            engine.sync_engine.dispose(close=False)
+        else:
+            engine.dispose(close=False)
+
+def __getattr__(name: str):
+    # `from src.db import engine` keeps working for scripts and benchmarks
+    if name == "engine":
+        return get_engine()
+    if name == "async_engine":
+        return get_async_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def init_db():
-    SQLModel.metadata.create_all(engine)
+    SQLModel.metadata.create_all(get_engine())
 
 def get_session():
-    with Session(engine) as session:
-        yield session
\ No newline at end of file
+    with Session(get_engine()) as session:
+        yield session
+
+def get_session_factory():
+    # for streaming responses: a yield dependency's session is closed before
+    # the body is sent, so the response generator opens its own
+    engine = get_engine()
+    return lambda: Session(engine)
+
+async def get_async_session():
+    # objects must stay readable after commit: lazy refreshes cannot run outside the greenlet
+    async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+        yield session
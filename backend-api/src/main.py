@@ -1,8 +1,28 @@
-from fastapi import FastAPI, Request, status
+import hmac
+from contextlib import asynccontextmanager
+from anyio import to_thread
+from fastapi import APIRouter, Depends, FastAPI, Header, Request, status
 from fastapi.exceptions import RequestValidationError, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from sqlmodel import Session
+from src import settings
+from src.db import dispose_engines, get_session, get_session_factory
+from src.metrics import MetricsMiddleware, render as render_metrics
+from src.profiler import ProfilerMiddleware
+from src.cache import TTLCache
+from src.replicas import PINS_SIZE, ReadYourWritesMiddleware, ReplicaMonitor, get_replica_set, primary_pins, reset_replica_set
+from src.settings import Settings
+from src.tasks.async_routes import router as async_tasks_router
+from src.tasks.response_cache import build_backend as build_response_cache_backend, response_cache
 from src.tasks.routes import router as tasks_router
+from src.users.async_routes import router as async_users_router
+from src.users.cache import InvalidationListener, user_cache
+from src.users.hasher import password_hasher
+from src.users.helpers import CREDENTIALS_EXCEPTION, token_cache
+from src.users.outbox import OutboxWorker, build_transport
+from src.users.ratelimit import build_backend as build_rate_limit_backend, rate_limiter
+from src.users.resets import PurgeScheduler, password_reset_stats
 from src.users.routes import router as users_router
 
 # the following is for early dev stages where we want to check the database connection
@@ -12,21 +32,37 @@ from src.users.routes import router as users_router
 #     init_db()
 #     yield
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.THREADPOOL_SIZE > 0:
+        to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+    listener = None
+    if settings.USER_CACHE_NOTIFY:
+        listener = InvalidationListener(settings.DATABASE_URL)
+        listener.start()
+    purger = None
+    if settings.PASSWORD_RESET_PURGE_INTERVAL > 0:
+        purger = PurgeScheduler(get_session_factory(), settings.PASSWORD_RESET_PURGE_INTERVAL)
+        purger.start()
+    monitor = None
+    if get_replica_set().replicas:
+        monitor = ReplicaMonitor(get_replica_set(), settings.REPLICA_LAG_CHECK_INTERVAL)
+        monitor.start()
+    outbox = None
+    if settings.EMAIL_OUTBOX_WORKER or (settings.EMAIL_OUTBOX_WORKER is None and not settings.IS_PROD_MODE):
+        outbox = OutboxWorker(get_session_factory(), build_transport(), settings.EMAIL_OUTBOX_POLL_INTERVAL)
+        outbox.start()
+    yield
+    if listener is not None:
+        listener.stop()
+    if purger is not None:
+        purger.stop()
+    if outbox is not None:
+        outbox.stop()
+    if monitor is not None:
+        monitor.stop()
+    password_hasher.shutdown()
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000"],  
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-    expose_headers=["*"],
-)
-
-app.include_router(tasks_router, prefix="/api", tags=["task_tags"])
-app.include_router(users_router, prefix="/api/users", tags=["users"])
-
-@app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc:HTTPException):
     default = {
         "code": "HTTP ERROR",
@@ -51,10 +87,10 @@ async def http_exception_handler(request: Request, exc:HTTPException):
                 "message": msg,
                 "fields": fields
             }
-        }
+        },
+        headers=exc.headers,
     )
 
-@app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     fields = {}
     for err in exc.errors():
@@ -75,6 +111,120 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
         }
     )
 
-@app.get("/health")
+health_router = APIRouter()
+
+@health_router.get("/health")
 def health():
-    return {"ok": True}
\ No newline at end of file
+    return {"ok": True}
+
+@health_router.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+HEALTH_DETAILS_NOT_FOUND_ERR = {
+    "code": "NOT_FOUND",
+    "message": "Not Found",
+}
+
+def require_health_token(authorization: str | None = Header(None)):
+    # cache sizes, queue depths and replica URLs are for operators, not for the internet
+    expected = settings.HEALTH_DETAILS_TOKEN
+    if not expected:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=HEALTH_DETAILS_NOT_FOUND_ERR)
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode("utf-8"), expected.encode("utf-8")):
+        raise CREDENTIALS_EXCEPTION
+
+health_details_router = APIRouter(prefix="/health", dependencies=[Depends(require_health_token)], include_in_schema=False)
+
+@health_details_router.get("/hasher")
+def hasher_health():
+    return password_hasher.stats()
+
+@health_details_router.get("/user-cache")
+def user_cache_health():
+    return user_cache.stats()
+
+@health_details_router.get("/token-cache")
+def token_cache_health():
+    return token_cache.stats()
+
+@health_details_router.get("/response-cache")
+def response_cache_health():
+    return response_cache.stats()
+
+@health_details_router.get("/rate-limit")
+def rate_limit_health():
+    return rate_limiter.stats()
+
+@health_details_router.get("/replicas")
+def replicas_health():
+    return get_replica_set().stats()
+
+@health_details_router.get("/password-resets")
+def password_resets_health(session: Session = Depends(get_session)):
+    return password_reset_stats(session)
+
+
+def _configure_singletons() -> None:
+    # module-level singletons are created empty at import; size them from the installed settings
+    user_cache.resize(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL)
+    token_cache.resize(settings.TOKEN_CACHE_SIZE)
+    response_cache.backend = build_response_cache_backend(settings.RESPONSE_CACHE_BACKEND)
+    response_cache.ttl = settings.RESPONSE_CACHE_TTL
+    rate_limiter.backend = build_rate_limit_backend(settings.RATE_LIMIT_BACKEND)
+    primary_pins.backend = response_cache.backend or TTLCache(maxsize=PINS_SIZE, ttl=settings.REPLICA_STICKY_SECONDS)
+
+def create_app(app_settings: Settings | None = None) -> FastAPI:
+    """
+    Build the application. Without arguments the settings come from the
+    environment; nothing connects to the database until the first request or
+    the lifespan, so the app can be created in a `gunicorn --preload` master.
+    """
+    (app_settings or settings.get_settings()).validate()
+    if app_settings is not None:
+        settings.configure(app_settings)
+        dispose_engines()
+        reset_replica_set()
+    _configure_singletons()
+
+    app = FastAPI(lifespan=lifespan)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["http://localhost:3000"],  
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["*"],
+    )
+
+    app.add_middleware(ProfilerMiddleware)
+    if get_replica_set().replicas:
+        app.add_middleware(ReadYourWritesMiddleware)
+    if settings.METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
+
+    # async routers go first so they shadow the sync endpoints they replace;
+    # anything without an async variant keeps being served by the sync routers
+    if settings.USE_ASYNC_DB:
+        app.include_router(async_tasks_router, prefix="/api", include_in_schema=False)
+        app.include_router(async_users_router, prefix="/api/users", include_in_schema=False)
+    app.include_router(tasks_router, prefix="/api", tags=["task_tags"])
+    app.include_router(users_router, prefix="/api/users", tags=["users"])
+
+    app.add_exception_handler(HTTPException, http_exception_handler)
+    app.add_exception_handler(RequestValidationError, validation_exception_handler)
+    app.include_router(health_router)
+    app.include_router(health_details_router)
+    return app
+
+
+def __getattr__(name: str):
+    # `src.main:app` for uvicorn/gunicorn: built from the environment on first access
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
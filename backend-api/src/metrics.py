@@ -0,0 +1,182 @@
+"""
+Prometheus metrics, exposed at /metrics.
+
+Under gunicorn every worker has its own registry; set PROMETHEUS_MULTIPROC_DIR
+to an empty directory before the workers start and prometheus_client writes
+the values to per-process files there, which /metrics aggregates on scrape
+(src/server.py does both, and cleans up after exited workers). Without the variable
+metrics are per process, which is what a single uvicorn process needs.
+"""
+import contextvars
+import os
+import time
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from src import settings
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by route template and status.",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Requests being served.",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Statements sent to the database per request.",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds",
+    "Time spent executing statements per request.",
+    ["route"],
+)
+POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection.",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+POOL_SIZE = Gauge("db_pool_size", "Configured pool size.", ["engine"], multiprocess_mode="livesum")
+POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Connections in use.", ["engine"], multiprocess_mode="livesum")
+POOL_OVERFLOW = Gauge("db_pool_overflow", "Connections open beyond the pool size.", ["engine"], multiprocess_mode="livesum")
+PASSWORD_HASH_SECONDS = Histogram(
+    "password_hash_seconds",
+    "bcrypt time in the hasher pool.",
+    ["operation"],
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 2, 5),
+)
+PASSWORD_HASH_QUEUE_SECONDS = Histogram(
+    "password_hash_queue_seconds",
+    "Time bcrypt jobs waited for a hasher process.",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5),
+)
+PASSWORD_HASH_REJECTED = Counter("password_hash_rejected", "bcrypt jobs rejected with 503 because the queue was full.")
+JWT_SECONDS = Histogram(
+    "jwt_seconds",
+    "JWT signing and verification time (token cache hits excluded).",
+    ["operation"],
+    buckets=(0.00001, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.005),
+)
+JWT_CACHE_HITS = Counter("jwt_cache_hits", "Tokens served from the verified-token cache.")
+PASSWORD_RESETS_PURGED = Counter("password_resets_purged", "Used and expired password resets deleted by the purge job.")
+PASSWORD_RESETS_ROWS = Gauge(
+    "password_resets_rows",
+    "Estimated rows in password_resets (pg_class.reltuples), as of the last purge.",
+    multiprocess_mode="mostrecent",
+)
+PASSWORD_RESETS_BYTES = Gauge(
+    "password_resets_bytes",
+    "Size of password_resets with its indexes, as of the last purge.",
+    multiprocess_mode="mostrecent",
+)
+
+# [statements, seconds] of the current request; a mutable list so that the
+# copies of the context made for threadpool endpoints still add to it
+_request_db: contextvars.ContextVar[list | None] = contextvars.ContextVar("request_db", default=None)
+
+
+class _TimedCheckout:
+    """Pool mixin that records how long each checkout waited."""
+
+    metrics_label: str
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_CHECKOUT_WAIT.labels(self.metrics_label).observe(time.perf_counter() - started)
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    metrics_label = "sync"
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    metrics_label = "async"
+
+
+def _update_pool_gauges(pool, label: str) -> None:
+    POOL_SIZE.labels(label).set(pool.size())
+    POOL_CHECKED_OUT.labels(label).set(pool.checkedout())
+    POOL_OVERFLOW.labels(label).set(max(pool.overflow(), 0))
+
+def instrument_engine(engine, label: str) -> None:
+    """Count statements per request and track the pool gauges of a sync Engine."""
+    if not settings.METRICS_ENABLED:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["metrics_started"].pop()
+        db = _request_db.get()
+        if db is not None:
+            db[0] += 1
+            db[1] += time.perf_counter() - started
+
+    for name in ("checkout", "checkin", "connect"):
+        event.listen(engine.pool, name, lambda *args: _update_pool_gauges(engine.pool, label))
+    _update_pool_gauges(engine.pool, label)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: latency, in-flight and database time per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        method = scope["method"]
+        status = 500
+        db = [0, 0.0]
+        token = _request_db.set(db)
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_progress = REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_progress.dec()
+            _request_db.reset(token)
+            # the router stores the matched route in the scope; templates keep label cardinality bounded
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            REQUEST_LATENCY.labels(method, path, str(status)).observe(elapsed)
+            REQUEST_DB_QUERIES.labels(path).observe(db[0])
+            REQUEST_DB_SECONDS.labels(path).observe(db[1])
+
+
+def render() -> tuple[bytes, str]:
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -1,5 +1,7 @@
 from datetime import datetime, timedelta
 from typing import Optional
+from sqlalchemy import BigInteger, Column, Computed, Index, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlmodel import Field, Relationship, SQLModel
 from enum import Enum as PyEnum
 
@@ -22,6 +24,14 @@ class User(SQLModel, table=True):
 
 class Task(SQLModel, table=True):
     __tablename__ = "tasks"
+    __table_args__ = (
+        Index("ix_tasks_user_id_created_at_id", "user_id", "created_at", "id"),
+        # the cross-user listing (GET /tasks without user_id)
+        Index("ix_tasks_created_at_id", "created_at", "id"),
+        Index("ix_tasks_user_id_due_date", "user_id", "due_date"),
+        Index("ix_tasks_user_id_is_completed_due_date", "user_id", "is_completed", "due_date"),
+        Index("ix_tasks_user_id_priority_due_date", "user_id", "priority", "due_date"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     title: str
     description: Optional[str] = None
@@ -34,9 +44,43 @@ class Task(SQLModel, table=True):
 
     user: Optional[User] = Relationship(back_populates="tasks")
 
+# Generated full-text document for /tasks/user/search. It is added to the table
+# but left unmapped so select(Task) never drags the tsvector along.
+TASK_SEARCH_CONFIG = "english"
+Task.__table__.append_column(
+    Column(
+        "search_vector",
+        TSVECTOR,
+        Computed(
+            f"setweight(to_tsvector('{TASK_SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+            f"setweight(to_tsvector('{TASK_SEARCH_CONFIG}', coalesce(description, '')), 'B')",
+            persisted=True,
+        ),
+    )
+)
+Index("ix_tasks_search_vector", Task.__table__.c.search_vector, postgresql_using="gin")
+
+
+class TaskCounter(SQLModel, table=True):
+    __tablename__ = "task_counters"
+    user_id: int = Field(primary_key=True, foreign_key="users.id", ondelete="CASCADE")
+    total: int = Field(default=0)
+    completed: int = Field(default=0)
+    low: int = Field(default=0)
+    medium: int = Field(default=0)
+    high: int = Field(default=0)
+    # bumped by every task write; list ETags are derived from it
+    version: int = Field(default=0, sa_type=BigInteger)
+
 
 class PasswordReset(SQLModel, table=True):
     __tablename__ = "password_resets"
+    __table_args__ = (
+        Index("ix_password_resets_user_id", "user_id"),
+        Index("ix_password_resets_expires_at", "expires_at"),
+        # used rows are purged before they expire; keeps that half of the purge off a seq scan
+        Index("ix_password_resets_used", "id", postgresql_where=text("used")),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int | None = Field(default=None, foreign_key="users.id")
     hashed_token: str = Field(index=True, unique=True)
@@ -45,3 +89,21 @@ class PasswordReset(SQLModel, table=True):
     created_at: datetime = Field(default_factory=datetime.now)
 
     user: Optional[User] = Relationship(back_populates="password_resets")
+
+
+class OutboxEmail(SQLModel, table=True):
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        # only rows still waiting for delivery are indexed; sent and abandoned ones drop out
+        Index("ix_email_outbox_next_attempt_at", "next_attempt_at", postgresql_where=text("next_attempt_at IS NOT NULL")),
+    )
+    id: Optional[int] = Field(default=None, primary_key=True)
+    to_email: str = Field(max_length=100)
+    subject: str
+    body: str
+    attempts: int = Field(default=0)
+    # NULL once the email was sent or retries were exhausted
+    next_attempt_at: Optional[datetime] = Field(default_factory=datetime.now)
+    last_error: Optional[str] = None
+    sent_at: Optional[datetime] = None
+    created_at: datetime = Field(default_factory=datetime.now)
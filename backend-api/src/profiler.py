@@ -0,0 +1,176 @@
+"""
+SQL profiler built on engine cursor events, replacing echo=True.
+
+- Slow queries (SQL_SLOW_QUERY_MS) are always logged to src.profiler.slow.
+  With SQL_SLOW_QUERY_EXPLAIN, SELECTs also get an EXPLAIN (ANALYZE, BUFFERS)
+  plan, taken at most once per statement fingerprint every
+  SQL_SLOW_QUERY_EXPLAIN_INTERVAL seconds since ANALYZE runs the query a
+  second time. Off by default: plans can carry literal values into the logs.
+- Sampled requests (SQL_PROFILE_SAMPLE_RATE, or the X-Profile-SQL header
+  when SQL_PROFILE_HEADER is on) get a structured query log: every
+  statement's fingerprint and time, and the fingerprints repeated at least
+  SQL_N_PLUS_ONE_THRESHOLD times, which is what lazy loads in a loop (e.g.
+  Task.user, User.tasks) look like.
+
+Everything is off in the defaults except the slow-query log.
+"""
+import contextvars
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from sqlalchemy import event
+
+from src import settings
+
+logger = logging.getLogger(__name__)
+slow_logger = logging.getLogger(f"{__name__}.slow")
+
+PROFILE_HEADER = b"x-profile-sql"
+
+_LITERALS = [
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"%\(\w+\)s|\$\d+|(?<!:):\w+"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    # expanding IN lists vary in length with the data
+    (re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)"), "(?)"),
+    (re.compile(r"\s+"), " "),
+]
+_WRITES = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE)\b", re.IGNORECASE)
+
+
+def fingerprint(statement: str) -> str:
+    """Statement with literals and parameters replaced, so repeats of one query compare equal."""
+    for pattern, replacement in _LITERALS:
+        statement = pattern.sub(replacement, statement)
+    return statement.strip()
+
+def _fingerprint_id(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:12]
+
+
+class QueryProfile:
+    def __init__(self, label: str):
+        self.label = label
+        self.queries: list[tuple[str, float]] = []
+        self._statements: dict[str, str] = {}
+
+    def record(self, statement: str, seconds: float) -> None:
+        normalized = fingerprint(statement)
+        key = _fingerprint_id(normalized)
+        self._statements.setdefault(key, normalized)
+        self.queries.append((key, seconds))
+
+    def repeated(self, threshold: int) -> list[dict]:
+        counts = Counter(key for key, _ in self.queries)
+        return [
+            {"fingerprint": key, "count": count, "statement": self._statements[key]}
+            for key, count in counts.most_common()
+            if count >= threshold and self._statements[key].upper().startswith("SELECT")
+        ]
+
+    def summary(self) -> dict:
+        return {
+            "label": self.label,
+            "queries": len(self.queries),
+            "seconds": round(sum(seconds for _, seconds in self.queries), 6),
+            "log": [{"fingerprint": key, "ms": round(seconds * 1000, 3)} for key, seconds in self.queries],
+            "statements": self._statements,
+            "n_plus_one": self.repeated(settings.SQL_N_PLUS_ONE_THRESHOLD),
+        }
+
+
+_profile: contextvars.ContextVar[QueryProfile | None] = contextvars.ContextVar("sql_profile", default=None)
+_explained: dict[str, float] = {}
+_explained_lock = threading.Lock()
+
+
+@contextmanager
+def profile(label: str):
+    """Profile every statement run in this context; logs the summary on exit."""
+    current = QueryProfile(label)
+    token = _profile.set(current)
+    try:
+        yield current
+    finally:
+        _profile.reset(token)
+        summary = current.summary()
+        for repeat in summary["n_plus_one"]:
+            logger.warning("possible N+1 in %s: %d x %s", label, repeat["count"], repeat["statement"])
+        logger.info("sql profile %s", json.dumps(summary))
+
+
+def _should_explain(statement: str, key: str) -> bool:
+    if not settings.SQL_SLOW_QUERY_EXPLAIN or _WRITES.search(statement):
+        return False
+    now = time.monotonic()
+    with _explained_lock:
+        if now - _explained.get(key, float("-inf")) < settings.SQL_SLOW_QUERY_EXPLAIN_INTERVAL:
+            return False
+        _explained[key] = now
+    return True
+
+def _explain(conn, statement: str, parameters) -> list | str:
+    # a fresh DBAPI cursor on the same connection: same transaction, no engine
+    # events; the savepoint keeps a failing EXPLAIN from aborting the transaction
+    explain_cursor = conn.connection.cursor()
+    try:
+        explain_cursor.execute("SAVEPOINT sql_profiler_explain")
+        try:
+            explain_cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}", parameters)
+            plan = explain_cursor.fetchone()[0]
+        except Exception as exc:
+            explain_cursor.execute("ROLLBACK TO SAVEPOINT sql_profiler_explain")
+            return f"EXPLAIN failed: {exc}"
+        explain_cursor.execute("RELEASE SAVEPOINT sql_profiler_explain")
+        return json.loads(plan) if isinstance(plan, str) else plan
+    finally:
+        explain_cursor.close()
+
+def _log_slow(conn, statement: str, parameters, seconds: float, executemany: bool) -> None:
+    normalized = fingerprint(statement)
+    key = _fingerprint_id(normalized)
+    record = {"fingerprint": key, "ms": round(seconds * 1000, 3), "statement": normalized}
+    if not executemany and _should_explain(statement, key):
+        record["plan"] = _explain(conn, statement, parameters)
+    slow_logger.warning("slow query %s", json.dumps(record, default=str))
+
+
+def profile_engine(engine) -> None:
+    """Attach the profiler to a sync Engine (use AsyncEngine.sync_engine for async ones)."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("profiler_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["profiler_started"].pop()
+        current = _profile.get()
+        if current is not None:
+            current.record(statement, seconds)
+        if settings.SQL_SLOW_QUERY_MS and seconds * 1000 >= settings.SQL_SLOW_QUERY_MS:
+            _log_slow(conn, statement, parameters, seconds, executemany)
+
+
+class ProfilerMiddleware:
+    """Profiles a sample of requests, or those asking for it with the X-Profile-SQL header."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def _sampled(self, scope) -> bool:
+        if settings.SQL_PROFILE_HEADER and any(name == PROFILE_HEADER for name, _ in scope["headers"]):
+            return True
+        return settings.SQL_PROFILE_SAMPLE_RATE > 0 and random.random() < settings.SQL_PROFILE_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._sampled(scope):
+            return await self.app(scope, receive, send)
+        with profile(f"{scope['method']} {scope['path']}"):
+            await self.app(scope, receive, send)
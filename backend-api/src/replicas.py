@@ -0,0 +1,304 @@
+"""
+Read-replica routing for read-only routes.
+
+Routes that only read take their session from get_read_session (or
+get_async_read_session), which picks a streaming replica round-robin and
+falls back to the primary session from get_session when:
+
+- no replica is configured (DATABASE_REPLICA_URLS),
+- the client wrote recently: after every successful write,
+  ReadYourWritesMiddleware pins the user of the bearer token to the primary
+  for REPLICA_STICKY_SECONDS (primary_pins), and sets a cookie that does the
+  same for browser sessions without a token. Pins live in the response
+  cache backend when there is one, so with Redis they hold whichever worker
+  serves the next read; otherwise they are per worker,
+- every replica is lagging by more than REPLICA_MAX_LAG_SECONDS, is down,
+  or has not been measured recently. ReplicaMonitor measures the lag of
+  each replica in the background.
+
+Routes behind the response cache read from the primary while the cache is
+enabled (get_cached_read_session): a miss computed on a replica that has not
+replayed a write yet would be stored under the generation that write
+started, and served to every client until RESPONSE_CACHE_TTL.
+"""
+import itertools
+import logging
+import threading
+import time
+import anyio
+from fastapi import Depends, HTTPException, Request
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.datastructures import Headers
+
+from src import settings
+from src.db import build_async_engine, build_engine, get_async_session, get_session, to_async_url
+from src.users.helpers import verify_token
+
+logger = logging.getLogger(__name__)
+
+PRIMARY_COOKIE = "read_primary_until"
+# per-worker pins when the response cache has no backend to share
+PINS_SIZE = 100_000
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+# seconds the replica is behind the primary; 0 when it has replayed all it received
+LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class Replica:
+    def __init__(self, url: str, label: str):
+        self.url = url
+        self.label = label
+        self.lag: float | None = None
+        self.checked_at = float("-inf")
+        self.picks = 0
+        self._engine = None
+        self._async_engine = None
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self):
+        with self._lock:
+            if self._engine is None:
+                self._engine = build_engine(self.url, self.label)
+            return self._engine
+
+    @property
+    def async_engine(self):
+        with self._lock:
+            if self._async_engine is None:
+                self._async_engine = build_async_engine(to_async_url(self.url), self.label)
+            return self._async_engine
+
+    def measure_lag(self) -> float:
+        with self.engine.connect() as conn:
+            return float(conn.execute(LAG_SQL).scalar_one())
+
+    def check(self) -> None:
+        was_healthy = self.healthy()
+        try:
+            self.lag = self.measure_lag()
+        except Exception as exc:
+            self.lag = None
+            if was_healthy:
+                logger.warning("replica %s is unreachable: %s", self.label, exc)
+        else:
+            if was_healthy and self.lag > settings.REPLICA_MAX_LAG_SECONDS:
+                logger.warning("replica %s is %.1fs behind, skipping it", self.label, self.lag)
+        self.checked_at = time.monotonic()
+
+    def healthy(self) -> bool:
+        # a measurement older than a few intervals means the monitor is not keeping up
+        fresh = time.monotonic() - self.checked_at <= 3 * settings.REPLICA_LAG_CHECK_INTERVAL
+        return fresh and self.lag is not None and self.lag <= settings.REPLICA_MAX_LAG_SECONDS
+
+    def stats(self) -> dict:
+        return {
+            "url": make_url(self.url).render_as_string(hide_password=True),
+            "lag_seconds": self.lag,
+            "healthy": self.healthy(),
+            "picks": self.picks,
+        }
+
+    def dispose(self) -> None:
+        with self._lock:
+            if self._engine is not None:
+                self._engine.dispose(close=False)
+            if self._async_engine is not None:
+                self._async_engine.sync_engine.dispose(close=False)
+            self._engine = self._async_engine = None
+
+
+class ReplicaSet:
+    def __init__(self, urls: list[str]):
+        self.replicas = [Replica(url, f"replica-{index}") for index, url in enumerate(urls)]
+        self._next = itertools.count()
+        self._lock = threading.Lock()
+        self.primary_reads = 0
+
+    def pick(self) -> Replica | None:
+        """Next healthy replica round-robin, or None to read from the primary."""
+        with self._lock:
+            start = next(self._next)
+            for offset in range(len(self.replicas)):
+                replica = self.replicas[(start + offset) % len(self.replicas)]
+                if replica.healthy():
+                    replica.picks += 1
+                    return replica
+            self.primary_reads += 1
+            return None
+
+    def check(self) -> None:
+        for replica in self.replicas:
+            replica.check()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "replicas": [replica.stats() for replica in self.replicas],
+                "primary_reads": self.primary_reads,
+            }
+
+    def dispose(self) -> None:
+        for replica in self.replicas:
+            replica.dispose()
+
+
+_replica_set: ReplicaSet | None = None
+_replica_set_lock = threading.Lock()
+
+
+def get_replica_set() -> ReplicaSet:
+    global _replica_set
+    if _replica_set is None:
+        with _replica_set_lock:
+            if _replica_set is None:
+                urls = [url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+                _replica_set = ReplicaSet(urls)
+    return _replica_set
+
+def reset_replica_set() -> None:
+    """Forget the replicas so the next use reads DATABASE_REPLICA_URLS again."""
+    global _replica_set
+    with _replica_set_lock:
+        replica_set, _replica_set = _replica_set, None
+    if replica_set is not None:
+        replica_set.dispose()
+
+
+class PrimaryPins:
+    """
+    Token subjects whose reads stay on the primary until REPLICA_STICKY_SECONDS
+    after their last write. The backend is anything with get(key) and
+    set(key, value, ttl); create_app installs one.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend
+
+    @staticmethod
+    def _key(subject: str) -> str:
+        return f"primary:user:{subject}"
+
+    def pin(self, subject: str) -> None:
+        if self.backend is not None:
+            self.backend.set(self._key(subject), b"1", settings.REPLICA_STICKY_SECONDS)
+
+    def pinned(self, subject: str) -> bool:
+        return self.backend is not None and self.backend.get(self._key(subject)) is not None
+
+    async def run(self, method, subject: str):
+        # the Redis backend is synchronous; keep it off the event loop
+        if getattr(self.backend, "blocking", False):
+            return await anyio.to_thread.run_sync(method, subject)
+        return method(subject)
+
+primary_pins = PrimaryPins()
+
+
+def bearer_subject(headers) -> str | None:
+    scheme, _, token = (headers.get("authorization") or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return verify_token(token)["sub"]
+    except HTTPException:
+        return None
+
+def wants_primary(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(PRIMARY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+def _pick(request: Request) -> Replica | None:
+    replica_set = get_replica_set()
+    if not replica_set.replicas or wants_primary(request):
+        return None
+    subject = bearer_subject(request.headers)
+    if subject is not None and primary_pins.pinned(subject):
+        return None
+    return replica_set.pick()
+
+async def _pick_async(request: Request) -> Replica | None:
+    replica_set = get_replica_set()
+    if not replica_set.replicas or wants_primary(request):
+        return None
+    subject = bearer_subject(request.headers)
+    if subject is not None and await primary_pins.run(primary_pins.pinned, subject):
+        return None
+    return replica_set.pick()
+
+def get_read_session(request: Request, primary: Session = Depends(get_session)):
+    # the primary session never connects unless it is the one used
+    replica = _pick(request)
+    if replica is None:
+        yield primary
+        return
+    with Session(replica.engine) as session:
+        yield session
+
+async def get_async_read_session(request: Request, primary: AsyncSession = Depends(get_async_session)):
+    replica = await _pick_async(request)
+    if replica is None:
+        yield primary
+        return
+    async with AsyncSession(replica.async_engine, expire_on_commit=False) as session:
+        yield session
+
+
+class ReplicaMonitor(threading.Thread):
+    """Measures the replay lag of every replica each REPLICA_LAG_CHECK_INTERVAL seconds."""
+
+    def __init__(self, replica_set: ReplicaSet, interval: float):
+        super().__init__(name="replica-monitor", daemon=True)
+        self.replica_set = replica_set
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while True:
+            try:
+                self.replica_set.check()
+            except Exception:
+                logger.exception("replica lag check failed")
+            if self._stopped.wait(self.interval):
+                return
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+
+class ReadYourWritesMiddleware:
+    """Pins a client's reads to the primary for REPLICA_STICKY_SECONDS after each successful write."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            return await self.app(scope, receive, send)
+        subject = bearer_subject(Headers(scope=scope))
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                # pinned before the response goes out, so the client's next read sees it
+                if subject is not None:
+                    await primary_pins.run(primary_pins.pin, subject)
+                window = settings.REPLICA_STICKY_SECONDS
+                cookie = f"{PRIMARY_COOKIE}={time.time() + window:.3f}; Max-Age={int(window) + 1}; Path=/; HttpOnly; SameSite=lax"
+                if settings.IS_PROD_MODE:
+                    cookie += "; Secure"
+                message = {**message, "headers": [*message.get("headers", []), (b"set-cookie", cookie.encode("latin-1"))]}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,269 @@
+"""
+Production launcher: gunicorn with uvicorn workers, sized for the machine.
+
+    python -m src.server                 # serve
+    python -m src.server --check         # print the resolved plan and exit
+    python -m src.server --config path/to/server.toml
+
+Values missing from the config file (server.toml, or $SERVER_CONFIG) are
+derived from the CPU count and the Postgres connection budget:
+
+- workers: one per CPU, at least two so a worker being recycled never
+  leaves the socket without a listener
+- connections per engine and worker: an equal share of max_connections
+  minus superuser_reserved_connections and reserved_connections (left for
+  migrations, psql, replication), capped at SQLAlchemy's default of 15;
+  a third is kept open (pool_size), the rest is overflow
+- threads: one per sync connection; a sync endpoint holds its session for
+  the whole call, so more threads would only queue on the pool
+- bcrypt processes: the CPUs shared out between the workers
+
+Startup fails when workers x connections per worker exceed the budget.
+Workers are recycled after max_requests (+ random jitter so they do not all
+restart together): the worker stops accepting, finishes in-flight requests
+within graceful_timeout and is replaced while the others keep serving.
+SIGHUP rolls every worker the same way.
+"""
+import argparse
+import asyncio
+import dataclasses
+import importlib.util
+import json
+import logging
+import os
+import sys
+import tomllib
+from dataclasses import dataclass, field
+import psycopg2
+import uvicorn
+from gunicorn.app.base import BaseApplication
+from gunicorn.arbiter import Arbiter
+from sqlalchemy.engine import make_url
+from uvicorn.workers import UvicornWorker
+
+from src import settings
+from src.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = "server.toml"
+# SQLAlchemy's pool_size 5 + max_overflow 10
+MAX_CONNECTIONS_PER_ENGINE = 15
+# Postgres defaults, used when the server cannot be asked
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_SUPERUSER_RESERVED = 3
+ACCEPT_DRAIN_SECONDS = 0.1
+
+
+@dataclass(frozen=True)
+class ServerConfig:
+    bind: str = field(default_factory=lambda: f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}")
+    # None: derived, see the module docstring
+    workers: int | None = None
+    threads: int | None = None
+    db_pool_size: int | None = None
+    db_max_overflow: int | None = None
+    hasher_workers: int | None = None
+    timeout: int = 120
+    graceful_timeout: int = 30
+    keepalive: int = 5
+    max_requests: int = 10000
+    max_requests_jitter: int = 1000
+    preload: bool = True
+    # "auto" picks uvloop / httptools when installed
+    loop: str = "auto"
+    http: str = "auto"
+    # None: read max_connections and superuser_reserved_connections from the server
+    postgres_max_connections: int | None = None
+    reserved_connections: int = 10
+    log_level: str = "info"
+    metrics_dir: str = field(default_factory=lambda: os.getenv("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus"))
+
+    @classmethod
+    def load(cls, path: str, required: bool = False) -> "ServerConfig":
+        if not os.path.exists(path):
+            if required:
+                raise RuntimeError(f"server config {path} not found")
+            return cls()
+        with open(path, "rb") as stream:
+            values = tomllib.load(stream)
+        unknown = set(values) - {option.name for option in dataclasses.fields(cls)}
+        if unknown:
+            raise RuntimeError(f"unknown server options in {path}: {', '.join(sorted(unknown))}")
+        return cls(**values)
+
+
+@dataclass(frozen=True)
+class Plan:
+    workers: int
+    threads: int
+    db_pool_size: int
+    db_max_overflow: int
+    hasher_workers: int
+    connections_per_worker: int
+    connection_budget: int
+    loop: str
+    http: str
+
+
+def _available(choice: str, preferred: str, fallback: str) -> str:
+    if choice != "auto":
+        return choice
+    return preferred if importlib.util.find_spec(preferred) is not None else fallback
+
+def resolve(
+    config: ServerConfig,
+    cpus: int,
+    max_connections: int,
+    superuser_reserved: int,
+    app_settings: Settings,
+) -> Plan:
+    workers = config.workers or max(cpus, 2)
+    engines = 2 if app_settings.USE_ASYNC_DB else 1
+    listeners = 1 if app_settings.USER_CACHE_NOTIFY else 0
+    budget = max_connections - superuser_reserved - config.reserved_connections
+
+    share = min((budget // workers - listeners) // engines, MAX_CONNECTIONS_PER_ENGINE)
+    pool_size = config.db_pool_size if config.db_pool_size is not None else max(share // 3, 1)
+    max_overflow = config.db_max_overflow if config.db_max_overflow is not None else max(share - pool_size, 0)
+    per_worker = engines * (pool_size + max_overflow) + listeners
+    if workers * per_worker > budget:
+        raise RuntimeError(
+            f"{workers} workers x {per_worker} connections = {workers * per_worker} exceeds the budget of "
+            f"{budget} (max_connections {max_connections} - {superuser_reserved} superuser reserved - "
+            f"{config.reserved_connections} reserved)"
+        )
+    return Plan(
+        workers=workers,
+        threads=config.threads or pool_size + max_overflow,
+        db_pool_size=pool_size,
+        db_max_overflow=max_overflow,
+        hasher_workers=config.hasher_workers or max(cpus // workers, 1),
+        connections_per_worker=per_worker,
+        connection_budget=budget,
+        loop=_available(config.loop, "uvloop", "asyncio"),
+        http=_available(config.http, "httptools", "h11"),
+    )
+
+def postgres_limits(database_url: str) -> tuple[int, int]:
+    """max_connections and superuser_reserved_connections of the server, or the Postgres defaults if it is down."""
+    dsn = make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+    try:
+        conn = psycopg2.connect(dsn, connect_timeout=5)
+    except psycopg2.OperationalError as exc:
+        logger.warning("cannot read max_connections, assuming %d: %s", DEFAULT_MAX_CONNECTIONS, exc)
+        return DEFAULT_MAX_CONNECTIONS, DEFAULT_SUPERUSER_RESERVED
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT current_setting('max_connections')::int, current_setting('superuser_reserved_connections')::int"
+            )
+            return cursor.fetchone()
+    finally:
+        conn.close()
+
+
+class DrainingServer(uvicorn.Server):
+    async def shutdown(self, sockets=None):
+        # stop accepting first, then give connections accepted just before that a
+        # moment to send their request: uvicorn closes connections without one as
+        # idle, which the client sees as an empty reply
+        for server in self.servers:
+            server.close()
+        await asyncio.sleep(ACCEPT_DRAIN_SECONDS)
+        await super().shutdown(sockets)
+
+
+class Worker(UvicornWorker):
+    async def _serve(self) -> None:
+        self.config.app = self.wsgi
+        server = DrainingServer(config=self.config)
+        self._install_sigquit_handler()
+        await server.serve(sockets=self.sockets)
+        if not server.started:
+            sys.exit(Arbiter.WORKER_BOOT_ERROR)
+
+def worker_class(loop: str, http: str, graceful_timeout: int):
+    config = {"loop": loop, "http": http, "timeout_graceful_shutdown": graceful_timeout}
+    return type("Worker", (Worker,), {"CONFIG_KWARGS": config})
+
+def child_exit(server, worker):
+    # drop the dead worker's live gauges from the aggregated /metrics
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+
+def _prepare_metrics_dir(path: str) -> None:
+    # shared by the workers so /metrics aggregates all of them; must start empty,
+    # and must be set before prometheus_client is imported
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):
+        if name.endswith(".db"):
+            os.remove(os.path.join(path, name))
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+
+
+class Server(BaseApplication):
+    def __init__(self, options: dict, app_settings: Settings):
+        self.options = options
+        self.app_settings = app_settings
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from src.main import create_app
+        return create_app(self.app_settings)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Run the API under gunicorn, sized for this machine")
+    parser.add_argument("--config", default=None, help=f"TOML file (default: $SERVER_CONFIG or {DEFAULT_CONFIG})")
+    parser.add_argument("--check", action="store_true", help="print the resolved plan and exit")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+    path = args.config or os.getenv("SERVER_CONFIG")
+    config = ServerConfig.load(path or DEFAULT_CONFIG, required=path is not None)
+    app_settings = settings.get_settings()
+    app_settings.validate()
+    if config.postgres_max_connections is not None:
+        limits = config.postgres_max_connections, DEFAULT_SUPERUSER_RESERVED
+    else:
+        limits = postgres_limits(app_settings.DATABASE_URL)
+    plan = resolve(config, os.cpu_count() or 1, *limits, app_settings)
+    if args.check:
+        print(json.dumps(dataclasses.asdict(plan), indent=2))
+        return
+    logger.info("server plan: %s", json.dumps(dataclasses.asdict(plan)))
+
+    if app_settings.METRICS_ENABLED:
+        _prepare_metrics_dir(config.metrics_dir)
+    app_settings = app_settings.replace(
+        DB_POOL_SIZE=plan.db_pool_size,
+        DB_MAX_OVERFLOW=plan.db_max_overflow,
+        THREADPOOL_SIZE=plan.threads,
+        PASSWORD_HASHER_WORKERS=plan.hasher_workers,
+    )
+    Server(
+        {
+            "bind": config.bind,
+            "workers": plan.workers,
+            "worker_class": worker_class(plan.loop, plan.http, config.graceful_timeout),
+            "timeout": config.timeout,
+            "graceful_timeout": config.graceful_timeout,
+            "keepalive": config.keepalive,
+            "max_requests": config.max_requests,
+            "max_requests_jitter": config.max_requests_jitter,
+            "preload_app": config.preload,
+            "loglevel": config.log_level,
+            "child_exit": child_exit,
+        },
+        app_settings,
+    ).run()
+
+
+if __name__ == "__main__":
+    main()
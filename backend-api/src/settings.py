@@ -1,18 +1,152 @@
+"""
+Application settings: one typed, immutable Settings object.
+
+Values come from the environment (or .env.$ENV / .env through decouple) the
+first time a setting is read, not at import. create_app(settings) installs
+an explicit Settings instead. Modules keep reading `settings.NAME`, which
+resolves against the installed object.
+"""
 import os
-from decouple import Config, RepositoryEnv
+import threading
+from dataclasses import MISSING, dataclass, field, fields, replace
+from decouple import Config, RepositoryEnv, config as default_config, strtobool
 
 ENV = os.getenv("ENV", "dev")
 ENV_FILE = f".env.{ENV}"
 
-if os.path.exists(ENV_FILE):
-    config = Config(RepositoryEnv(ENV_FILE))
-else:
-    from decouple import config as config_default
-    config = config_default
 
-DATABASE_URL = config("DATABASE_URL")
-IS_PROD_MODE = config("IS_PROD_MODE")
-TEST_USE_DATABASE_URL = config("TEST_DATABASE_URL", default=None)
+@dataclass(frozen=True)
+class Settings:
+    DATABASE_URL: str | None = None
+    IS_PROD_MODE: bool = False
+    # signs access/refresh tokens and session cookies
+    AUTHJWT_SECRET_KEY: str | None = None
+    TEST_USE_DATABASE_URL: str | None = field(default=None, metadata={"env": "TEST_DATABASE_URL"})
+    # serve the task and user routes from async endpoints on an AsyncEngine
+    USE_ASYNC_DB: bool = False
+    ASYNC_DATABASE_URL: str | None = None
+    # connections per engine and worker: pool_size kept open, max_overflow more on demand (src/server.py derives both)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    # AnyIO threads for sync endpoints per worker; 0 keeps AnyIO's default of 40
+    THREADPOOL_SIZE: int = 0
+    # streaming replicas for read-only routes, comma separated; empty serves every read from the primary
+    DATABASE_REPLICA_URLS: str = ""
+    # replicas further behind than this are skipped; lag is measured every REPLICA_LAG_CHECK_INTERVAL seconds
+    REPLICA_MAX_LAG_SECONDS: float = 2
+    REPLICA_LAG_CHECK_INTERVAL: float = 1
+    # reads stay on the primary this long after a client's write (read-your-writes); keep it above the max lag
+    REPLICA_STICKY_SECONDS: float = 5
+    # bcrypt work factor; changing it rehashes passwords transparently on next login
+    BCRYPT_ROUNDS: int = 12
+    # processes used for bcrypt, and how many hash jobs may wait for one before 503
+    PASSWORD_HASHER_WORKERS: int = field(default_factory=lambda: os.cpu_count() or 1)
+    PASSWORD_HASHER_MAX_QUEUE: int = 32
+    # per-worker cache of users resolved by get_current_user; size 0 disables it
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL: float = 60
+    # broadcast invalidations to the other workers through Postgres LISTEN/NOTIFY
+    USER_CACHE_NOTIFY: bool = False
+    # verified JWT payloads kept per worker until the token's exp; size 0 disables it
+    TOKEN_CACHE_SIZE: int = 10000
+    # retry task searches without full-text hits as pg_trgm similarity matches (needs the extension)
+    TASK_SEARCH_TRIGRAM: bool = False
+    # cache for task read responses: "none", "memory" (per worker) or "redis" (shared)
+    RESPONSE_CACHE_BACKEND: str = "none"
+    RESPONSE_CACHE_URL: str = "redis://localhost:6379/0"
+    RESPONSE_CACHE_TTL: float = 30
+    RESPONSE_CACHE_SIZE: int = 10000
+    # build task responses from row tuples and TypeAdapter.dump_json instead of ORM objects + response_model
+    FAST_TASK_SERIALIZATION: bool = False
+    # seconds between in-process purges of used and expired password resets; 0 leaves it to the CLI
+    PASSWORD_RESET_PURGE_INTERVAL: float = 0
+    # outbound email: "console" prints messages (dev), "smtp" sends them through SMTP_HOST
+    EMAIL_BACKEND: str = "console"
+    EMAIL_FROM: str = "no-reply@localhost"
+    SMTP_HOST: str = "localhost"
+    SMTP_PORT: int = 25
+    SMTP_USERNAME: str | None = None
+    SMTP_PASSWORD: str | None = None
+    SMTP_STARTTLS: bool = False
+    # drain the email outbox from a thread in each worker; otherwise run `python -m src.users.outbox`.
+    # Unset: on unless IS_PROD_MODE, so dev prints password emails without a separate process
+    EMAIL_OUTBOX_WORKER: bool | None = None
+    EMAIL_OUTBOX_POLL_INTERVAL: float = 2
+    EMAIL_OUTBOX_BATCH_SIZE: int = 50
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = 8
+    # per-IP/per-email limits on login, register and password resets: "memory" (per worker), "redis" (shared) or "none"
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_URL: str = "redis://localhost:6379/0"
+    RATE_LIMIT_SIZE: int = 100000
+    # request, pool, bcrypt and JWT metrics at /metrics (see src/metrics.py for multi-worker setup)
+    METRICS_ENABLED: bool = True
+    # bearer token for the /health/* diagnostics (caches, hasher, replicas, ...); unset hides them
+    HEALTH_DETAILS_TOKEN: str | None = None
+    # log every statement (SQLAlchemy echo); development only
+    SQL_ECHO: bool = False
+    # statements slower than this are logged; 0 disables
+    SQL_SLOW_QUERY_MS: float = 500
+    # attach an EXPLAIN (ANALYZE, BUFFERS) sample: runs the query again and the plan can show literal values
+    SQL_SLOW_QUERY_EXPLAIN: bool = False
+    SQL_SLOW_QUERY_EXPLAIN_INTERVAL: float = 300
+    # share of requests that get a per-request query log with N+1 detection, or on demand via X-Profile-SQL
+    SQL_PROFILE_SAMPLE_RATE: float = 0
+    SQL_PROFILE_HEADER: bool = False
+    SQL_N_PLUS_ONE_THRESHOLD: int = 5
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        config = Config(RepositoryEnv(ENV_FILE)) if os.path.exists(ENV_FILE) else default_config
+        values = {}
+        for setting in fields(cls):
+            env = setting.metadata.get("env", setting.name)
+            if setting.type in (bool, int, float):
+                default = setting.default if setting.default is not MISSING else setting.default_factory()
+                values[setting.name] = config(env, cast=setting.type, default=default)
+            elif setting.type == bool | None:
+                # unset stays None, for settings whose default depends on others
+                values[setting.name] = config(env, cast=lambda value: None if value in (None, "") else strtobool(value), default=setting.default)
+            else:
+                values[setting.name] = config(env, default=setting.default)
+        return cls(**values)
+
+    def replace(self, **changes) -> "Settings":
+        return replace(self, **changes)
+
+    def validate(self) -> None:
+        """Settings the app cannot serve without; checked by create_app, not at import."""
+        missing = [name for name in ("DATABASE_URL", "AUTHJWT_SECRET_KEY") if not getattr(self, name)]
+        if missing:
+            raise RuntimeError(f"missing required settings: {', '.join(missing)}")
+
+
+_NAMES = frozenset(setting.name for setting in fields(Settings))
+_current: Settings | None = None
+_lock = threading.Lock()
+
+
+def get_settings() -> Settings:
+    global _current
+    if _current is None:
+        with _lock:
+            if _current is None:
+                _current = Settings.from_env()
+    return _current
+
+def configure(settings: Settings) -> Settings:
+    global _current
+    with _lock:
+        _current = settings
+        # drop values pinned on the module (e.g. by monkeypatch) so the new object wins
+        for name in _NAMES:
+            globals().pop(name, None)
+    return settings
+
+def __getattr__(name: str):
+    if name in _NAMES:
+        return getattr(get_settings(), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 if __name__ == "__main__":
-    print("IS_PROD_MODE =", IS_PROD_MODE)
\ No newline at end of file
+    print("IS_PROD_MODE =", get_settings().IS_PROD_MODE)
@@ -0,0 +1,198 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, Query, Request
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.db import get_async_session, get_session_factory
+from src.models import Priority, User
+from src.users.helpers import get_current_user_async
+from . import routes
+from .export import ExportFormat
+from .pagination import SortDirection, TaskSort
+from .response_cache import get_async_cached_read_session, response_cache, task_scope, user_scope
+from .schemas import (
+    PaginatedTaskSchema,
+    TaskBulkCreateSchema,
+    TaskBulkDeleteSchema,
+    TaskBulkResponseSchema,
+    TaskBulkUpdateSchema,
+    TaskCountersSchema,
+    TaskCreateSchema,
+    TaskReadSchema,
+    TaskUpdateSchema,
+    TASKS_MAX_PAGE_SIZE,
+)
+
+router = APIRouter()
+
+"""
+Async variants of the task routes, enabled with USE_ASYNC_DB.
+Each endpoint awaits the sync route body through AsyncSession.run_sync, so the
+query logic lives in one place while the I/O runs on the event loop (asyncpg)
+instead of occupying a threadpool slot.
+"""
+
+async def _run(session: AsyncSession, route, **kwargs):
+    async with response_cache.deferred_invalidation():
+        return await session.run_sync(lambda sync_session: route(session=sync_session, **kwargs))
+
+
+@router.get("/tasks", response_model=PaginatedTaskSchema)
+async def get_tasks(
+    session: AsyncSession = Depends(get_async_session),
+    session_factory = Depends(get_session_factory),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=TASKS_MAX_PAGE_SIZE),
+    cursor: str | None = Query(None),
+    include_total: bool = Query(False),
+    user_id: int | None = Query(None),
+    is_completed: bool | None = Query(None),
+    priority: Priority | None = Query(None),
+    due_from: datetime | None = Query(None),
+    due_to: datetime | None = Query(None),
+    stream: bool = Query(False),
+    stream_format: ExportFormat = Query(ExportFormat.NDJSON, alias="format"),
+):
+    # streaming reads through its own sync session, see export.iter_batches
+    return await _run(
+        session,
+        routes.get_tasks,
+        session_factory=session_factory,
+        offset=offset,
+        limit=limit,
+        cursor=cursor,
+        include_total=include_total,
+        user_id=user_id,
+        is_completed=is_completed,
+        priority=priority,
+        due_from=due_from,
+        due_to=due_to,
+        stream=stream,
+        stream_format=stream_format,
+    )
+
+@router.get("/tasks/user", response_model=PaginatedTaskSchema)
+async def get_user_tasks(
+    request: Request,
+    current_user: User = Depends(get_current_user_async),
+    session: AsyncSession = Depends(get_async_cached_read_session),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=100),
+    is_completed: bool | None = Query(None),
+    priority: Priority | None = Query(None),
+    due_from: datetime | None = Query(None),
+    due_to: datetime | None = Query(None),
+    overdue: bool = Query(False),
+    sort: TaskSort = Query(TaskSort.CREATED_AT),
+    direction: SortDirection = Query(SortDirection.ASC),
+    cursor: str | None = Query(None),
+    include_total: bool = Query(True),
+):
+    return await response_cache.fetch_async(
+        "tasks.user",
+        [user_scope(current_user.id)],
+        request,
+        lambda: _run(
+            session,
+            routes.user_tasks_entry,
+            request=request,
+            current_user=current_user,
+            offset=offset,
+            limit=limit,
+            is_completed=is_completed,
+            priority=priority,
+            due_from=due_from,
+            due_to=due_to,
+            overdue=overdue,
+            sort=sort,
+            direction=direction,
+            cursor=cursor,
+            include_total=include_total,
+        ),
+        bypass=overdue,
+    )
+
+@router.get("/tasks/user/search", response_model=PaginatedTaskSchema)
+async def search_user_tasks(
+    q: str = Query(min_length=1, max_length=200),
+    current_user: User = Depends(get_current_user_async),
+    session: AsyncSession = Depends(get_async_session),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=100),
+):
+    return await _run(
+        session,
+        routes.search_user_tasks,
+        q=q,
+        current_user=current_user,
+        offset=offset,
+        limit=limit,
+    )
+
+@router.get("/tasks/user/stats", response_model=TaskCountersSchema)
+async def get_user_task_stats(
+    current_user: User = Depends(get_current_user_async),
+    session: AsyncSession = Depends(get_async_session),
+):
+    return await _run(session, routes.get_user_task_stats, current_user=current_user)
+
+@router.post("/tasks/bulk", response_model=TaskBulkResponseSchema)
+async def create_tasks_bulk(
+    payload: TaskBulkCreateSchema,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_current_user_async)
+):
+    return await _run(session, routes.create_tasks_bulk, payload=payload, current_user=current_user)
+
+@router.patch("/tasks/bulk", response_model=TaskBulkResponseSchema)
+async def update_tasks_bulk(
+    payload: TaskBulkUpdateSchema,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_current_user_async)
+):
+    return await _run(session, routes.update_tasks_bulk, payload=payload, current_user=current_user)
+
+@router.delete("/tasks/bulk", response_model=TaskBulkResponseSchema)
+async def delete_tasks_bulk(
+    payload: TaskBulkDeleteSchema,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_current_user_async)
+):
+    return await _run(session, routes.delete_tasks_bulk, payload=payload, current_user=current_user)
+
+@router.get("/tasks/{task_id}", response_model=TaskReadSchema)
+async def get_task(
+    task_id: int,
+    request: Request,
+    session: AsyncSession = Depends(get_async_cached_read_session),
+):
+    return await response_cache.fetch_async(
+        "tasks.get",
+        [task_scope(task_id)],
+        request,
+        lambda: _run(session, routes.task_entry, request=request, task_id=task_id),
+    )
+
+@router.post("/tasks", response_model=TaskReadSchema)
+async def create_task(
+    payload: TaskCreateSchema,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_current_user_async)
+):
+    return await _run(session, routes.create_task, payload=payload, current_user=current_user)
+
+@router.patch("/tasks/{task_id}", response_model=TaskReadSchema)
+async def update_task(
+    task_id: int,
+    payload: TaskUpdateSchema,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_current_user_async)
+):
+    return await _run(session, routes.update_task, task_id=task_id, payload=payload, current_user=current_user)
+
+@router.delete("/tasks/{task_id}", response_model=TaskReadSchema)
+async def delete_task(
+    task_id: int,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_current_user_async)
+):
+    return await _run(session, routes.delete_task, task_id=task_id, current_user=current_user)
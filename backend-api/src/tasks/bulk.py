@@ -0,0 +1,48 @@
+from datetime import datetime
+from sqlalchemy import Integer, cast, column, func, update, values
+
+from src.models import Priority, Task
+
+PATCH_FIELDS = ("title", "description", "due_date", "priority", "is_completed")
+
+INVALID_PRIORITY_ERR = {
+    "code": "VALIDATION_ERROR",
+    "message": "Priority must be one of LOW, MEDIUM, HIGH."
+}
+DUPLICATE_ITEM_ERR = {
+    "code": "DUPLICATE",
+    "message": "This task appears more than once in the request."
+}
+BULK_TASK_NOT_FOUND_ERR = {
+    "code": "NOT FOUND",
+    "message": "Task is not found or you do not have permission to change it."
+}
+
+
+def is_valid_priority(value) -> bool:
+    return value is None or value in Priority.__members__
+
+def bulk_update_statement(user_id: int, patches: list[dict]):
+    """
+    One UPDATE ... FROM (VALUES ...) RETURNING for every patch. A NULL in a
+    patch column keeps the current value, mirroring update_task where None
+    means "not provided".
+    """
+    columns = Task.__table__.c
+    patch = values(
+        column("id", Integer),
+        *(column(field, columns[field].type) for field in PATCH_FIELDS),
+        name="patch",
+    ).data([(p["id"], *(p.get(field) for field in PATCH_FIELDS)) for p in patches])
+
+    # VALUES columns holding only NULLs are typed as text by Postgres, so cast back
+    assignments = {
+        field: func.coalesce(cast(patch.c[field], columns[field].type), columns[field])
+        for field in PATCH_FIELDS
+    }
+    return (
+        update(Task)
+        .where(Task.id == patch.c.id, Task.user_id == user_id)
+        .values(**assignments, updated_at=datetime.now())
+        .returning(Task)
+    )
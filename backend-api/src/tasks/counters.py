@@ -0,0 +1,138 @@
+import argparse
+from sqlalchemy import func, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlmodel import Session, select
+
+from src.models import Priority, Task, TaskCounter
+
+COUNTER_COLUMNS = ("total", "completed", "low", "medium", "high")
+PRIORITY_COLUMNS = {
+    Priority.LOW: "low",
+    Priority.MEDIUM: "medium",
+    Priority.HIGH: "high",
+}
+
+
+def task_delta(task: Task, sign: int = 1) -> dict[str, int]:
+    delta = dict.fromkeys(COUNTER_COLUMNS, 0)
+    delta["total"] = sign
+    if task.is_completed:
+        delta["completed"] = sign
+    delta[PRIORITY_COLUMNS[Priority(task.priority)]] = sign
+    return delta
+
+def merge_deltas(*deltas: dict[str, int]) -> dict[str, int]:
+    merged = dict.fromkeys(COUNTER_COLUMNS, 0)
+    for delta in deltas:
+        for column, value in delta.items():
+            merged[column] += value
+    return merged
+
+def _add_to_counters(stmt):
+    return stmt.on_conflict_do_update(
+        index_elements=[TaskCounter.user_id],
+        set_={
+            **{column: getattr(TaskCounter, column) + stmt.excluded[column] for column in COUNTER_COLUMNS},
+            "version": TaskCounter.version + 1,
+        },
+    )
+
+def apply_counter_delta(session: Session, user_id: int, delta: dict[str, int]) -> None:
+    """
+    Add delta to the user's counters row in the caller's transaction and bump
+    its version. Call it for every task write, even when the delta is empty,
+    so cached list ETags go stale.
+    """
+    values = merge_deltas(delta)
+    session.exec(_add_to_counters(pg_insert(TaskCounter).values(user_id=user_id, version=1, **values)))
+
+def _counter_flags_sql(prefix: str) -> dict[str, str]:
+    """SQL expressions counting one task row (the SQL side of task_delta)."""
+    return {
+        "total": "1",
+        "completed": f"{prefix}is_completed::int",
+        **{column: f"({prefix}priority = '{level.value}')::int" for level, column in PRIORITY_COLUMNS.items()},
+    }
+
+def counters_cte_sql(source: str, new: str | None = None, old: str | None = None) -> str:
+    """
+    A data-modifying CTE named "counters" that applies, for every row of the
+    CTE source, the counter difference between its new and old column values
+    (new/old are column prefixes; leave one out for inserts and deletes).
+    Used by the single-statement writes in writes.py.
+    """
+    new_flags = _counter_flags_sql(new) if new is not None else None
+    old_flags = _counter_flags_sql(old) if old is not None else None
+    deltas = []
+    for column in COUNTER_COLUMNS:
+        expression = new_flags[column] if new_flags else "0"
+        if old_flags:
+            expression = f"{expression} - {old_flags[column]}"
+        deltas.append(expression)
+    updates = ", ".join(f"{column} = task_counters.{column} + excluded.{column}" for column in COUNTER_COLUMNS)
+    return f"""counters AS (
+    INSERT INTO task_counters (user_id, {", ".join(COUNTER_COLUMNS)}, version)
+    SELECT user_id, {", ".join(deltas)}, 1 FROM {source}
+    ON CONFLICT (user_id) DO UPDATE SET {updates}, version = task_counters.version + 1
+)"""
+
+def get_counters(session: Session, user_id: int) -> TaskCounter | None:
+    return session.get(TaskCounter, user_id)
+
+def get_counters_version(session: Session, user_id: int) -> int | None:
+    return session.exec(select(TaskCounter.version).where(TaskCounter.user_id == user_id)).first()
+
+def count_from_counters(counters: TaskCounter, is_completed: bool | None) -> int:
+    if is_completed is None:
+        return counters.total
+    if is_completed:
+        return counters.completed
+    return counters.total - counters.completed
+
+def rebuild_counters(session: Session, user_id: int | None = None) -> int:
+    """Recompute task_counters from the tasks table. Returns the number of rows written."""
+    aggregate = (
+        select(
+            Task.user_id,
+            func.count(),
+            func.count().filter(Task.is_completed),
+            func.count().filter(Task.priority == Priority.LOW),
+            func.count().filter(Task.priority == Priority.MEDIUM),
+            func.count().filter(Task.priority == Priority.HIGH),
+        )
+        .where(Task.user_id.is_not(None))
+        .group_by(Task.user_id)
+    )
+    # rows are reset and upserted rather than deleted, so versions only ever
+    # grow and an ETag issued before the rebuild can never match again
+    reset = update(TaskCounter).values(
+        **dict.fromkeys(COUNTER_COLUMNS, 0),
+        version=TaskCounter.version + 1,
+    )
+    if user_id is not None:
+        aggregate = aggregate.where(Task.user_id == user_id)
+        reset = reset.where(TaskCounter.user_id == user_id)
+
+    session.exec(reset)
+    stmt = pg_insert(TaskCounter).from_select(["user_id", *COUNTER_COLUMNS], aggregate)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[TaskCounter.user_id],
+        set_={column: stmt.excluded[column] for column in COUNTER_COLUMNS},
+    )
+    result = session.exec(stmt)
+    session.commit()
+    return result.rowcount
+
+
+if __name__ == "__main__":
+    from src.db import engine
+
+    parser = argparse.ArgumentParser(description="Task counters maintenance")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    rebuild = subcommands.add_parser("rebuild", help="rebuild task_counters from tasks")
+    rebuild.add_argument("--user-id", type=int, default=None)
+    args = parser.parse_args()
+
+    with Session(engine) as session:
+        written = rebuild_counters(session, user_id=args.user_id)
+    print(f"Rebuilt task counters for {written} user(s).")
@@ -0,0 +1,38 @@
+import hashlib
+from datetime import datetime
+from fastapi import Request, Response, status
+
+# revalidate on every use, but let the browser keep the body for a 304
+CACHE_CONTROL = "private, no-cache"
+
+
+def _etag(*parts) -> str:
+    digest = hashlib.sha256(":".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+def list_etag(user_id: int, version: int, request: Request) -> str:
+    """A task list is fully determined by the user's counters version and the query string."""
+    query = "&".join(f"{key}={value}" for key, value in sorted(request.query_params.multi_items()))
+    return _etag("list", user_id, version, request.url.path, query)
+
+def task_etag(task_id: int, updated_at: datetime) -> str:
+    return _etag("task", task_id, updated_at.isoformat())
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match uses the weak comparison, so a W/ prefix is ignored."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = (candidate.strip() for candidate in header.split(","))
+    return etag in (candidate.removeprefix("W/") for candidate in candidates)
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+def not_modified(etag: str) -> Response:
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    set_etag(response, etag)
+    return response
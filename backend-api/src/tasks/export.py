@@ -0,0 +1,94 @@
+import csv
+import io
+import json
+from datetime import datetime
+from enum import Enum
+from typing import Callable, Iterator
+from sqlmodel import Session, select
+
+from src.models import Priority, Task
+from .schemas import TaskReadSchema
+
+EXPORT_FIELDS = list(TaskReadSchema.model_fields)
+# rows fetched per round trip from the server-side cursor, and per chunk written out
+EXPORT_BATCH_SIZE = 2000
+
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv",
+}
+
+
+def task_filters(
+    user_id: int | None = None,
+    is_completed: bool | None = None,
+    priority: Priority | None = None,
+    due_from: datetime | None = None,
+    due_to: datetime | None = None,
+    overdue: bool = False,
+) -> list:
+    filters = []
+    if user_id is not None:
+        filters.append(Task.user_id == user_id)
+    if is_completed is not None:
+        filters.append(Task.is_completed == is_completed)
+    if priority is not None:
+        filters.append(Task.priority == priority)
+    if due_from is not None:
+        filters.append(Task.due_date >= due_from)
+    if due_to is not None:
+        filters.append(Task.due_date < due_to)
+    if overdue:
+        filters.extend([Task.is_completed == False, Task.due_date < datetime.now()])
+    return filters
+
+def export_statement(filters: list):
+    columns = [getattr(Task, field) for field in EXPORT_FIELDS]
+    return select(*columns).where(*filters).order_by(Task.created_at, Task.id)
+
+def iter_batches(session_factory: Callable[[], Session], stmt) -> Iterator[list]:
+    """Yield row batches from a server-side cursor so memory stays flat."""
+    with session_factory() as session:
+        result = session.exec(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for batch in result.partitions():
+            yield batch
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _csv_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+def iter_ndjson(batches: Iterator[list]) -> Iterator[bytes]:
+    for batch in batches:
+        lines = [json.dumps(dict(zip(EXPORT_FIELDS, row)), default=_json_default) for row in batch]
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+def iter_csv(batches: Iterator[list]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for batch in batches:
+        writer.writerows([_csv_value(value) for value in row] for row in batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+def stream_tasks(session_factory: Callable[[], Session], stmt, export_format: ExportFormat) -> Iterator[bytes]:
+    batches = iter_batches(session_factory, stmt)
+    if export_format == ExportFormat.CSV:
+        return iter_csv(batches)
+    return iter_ndjson(batches)
@@ -0,0 +1,58 @@
+import base64
+import json
+from datetime import datetime
+from enum import Enum
+from fastapi import HTTPException, status
+
+from src.models import Task
+
+INVALID_CURSOR_ERR = {
+    "code": "INVALID CURSOR",
+    "message": "The pagination cursor is invalid."
+}
+CURSOR_SORT_ERR = {
+    "code": "INVALID CURSOR",
+    "message": "Cursor pagination is only supported when sorting by created_at."
+}
+
+
+class TaskSort(str, Enum):
+    CREATED_AT = "created_at"
+    DUE_DATE = "due_date"
+    PRIORITY = "priority"
+
+class SortDirection(str, Enum):
+    ASC = "asc"
+    DESC = "desc"
+
+SORT_COLUMNS = {
+    TaskSort.CREATED_AT: Task.created_at,
+    TaskSort.DUE_DATE: Task.due_date,
+    # the Postgres priority enum orders by declaration (LOW < MEDIUM < HIGH),
+    # so this sorts by urgency rather than alphabetically
+    TaskSort.PRIORITY: Task.priority,
+}
+
+
+def encode_cursor(created_at: datetime, task_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), task_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, task_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(task_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=INVALID_CURSOR_ERR)
+
+def order_by_clause(sort: TaskSort, direction: SortDirection) -> list:
+    """Sort column plus id as a tiebreaker; tasks without a due date always come last."""
+    column = SORT_COLUMNS[sort]
+    if direction == SortDirection.DESC:
+        clause = [column.desc(), Task.id.desc()]
+    else:
+        clause = [column.asc(), Task.id.asc()]
+    if sort == TaskSort.DUE_DATE:
+        clause[0] = clause[0].nulls_last()
+    return clause
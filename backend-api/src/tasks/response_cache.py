@@ -0,0 +1,304 @@
+import asyncio
+import hashlib
+import threading
+import uuid
+from collections import defaultdict
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, NamedTuple
+import anyio
+from fastapi import Depends, Request, Response
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src import settings
+from src.cache import TTLCache
+from src.db import get_async_session, get_session
+from src.replicas import get_async_read_session, get_read_session
+from .etags import etag_matches, not_modified, set_etag
+
+# generation tokens outlive the entries keyed on them; losing one only costs misses
+GENERATION_TTL = 24 * 60 * 60
+
+# scopes invalidated by sync route code running on the event loop, see deferred_invalidation
+_deferred_scopes: ContextVar[list[str] | None] = ContextVar("deferred_scopes", default=None)
+
+
+class CachedResponse(NamedTuple):
+    etag: str | None
+    body: bytes
+
+    def encode(self) -> bytes:
+        return (self.etag or "").encode("ascii") + b"\n" + self.body
+
+    @classmethod
+    def decode(cls, raw: bytes) -> "CachedResponse":
+        etag, _, body = raw.partition(b"\n")
+        return cls(etag.decode("ascii") or None, body)
+
+    def to_response(self, request: Request) -> Response:
+        if self.etag is not None and etag_matches(request, self.etag):
+            return not_modified(self.etag)
+        response = Response(content=self.body, media_type="application/json")
+        if self.etag is not None:
+            set_etag(response, self.etag)
+        return response
+
+
+class MemoryBackend:
+    """
+    Per-worker LRU. Invalidations only reach the worker that handled the
+    write, so with several workers the others serve stale pages until the TTL.
+    """
+
+    blocking = False
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._generation_lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        return self._cache.get(key)
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._cache.set(key, value, ttl=ttl)
+
+    def generation(self, scope: str) -> str:
+        with self._generation_lock:
+            token = self._cache.get(scope)
+            if token is None:
+                token = uuid.uuid4().hex
+                self._cache.set(scope, token, ttl=GENERATION_TTL)
+            return token
+
+    def bump(self, scopes: list[str]) -> None:
+        for scope in scopes:
+            self._cache.set(scope, uuid.uuid4().hex, ttl=GENERATION_TTL)
+
+
+class RedisBackend:
+    """
+    Shared by every worker, so invalidation is immediate everywhere. The
+    client is synchronous; the async routes call it from a worker thread.
+    """
+
+    blocking = True
+
+    def __init__(self, url: str, client=None):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self._client = client
+
+    def get(self, key: str) -> bytes | None:
+        return self._client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._client.set(key, value, px=int(ttl * 1000))
+
+    def generation(self, scope: str) -> str:
+        # SET NX so concurrent first readers agree on one token
+        self._client.set(scope, uuid.uuid4().hex, nx=True, ex=GENERATION_TTL)
+        token = self._client.get(scope)
+        return token.decode("ascii") if token is not None else uuid.uuid4().hex
+
+    def bump(self, scopes: list[str]) -> None:
+        pipeline = self._client.pipeline(transaction=False)
+        for scope in scopes:
+            pipeline.set(scope, uuid.uuid4().hex, ex=GENERATION_TTL)
+        pipeline.execute()
+
+
+class ResponseCache:
+    """
+    Serialized responses keyed by route, the generation tokens of the scopes
+    they depend on (a user's task list, a single task) and the query string.
+    Write routes call invalidate() after committing, which swaps the tokens so
+    every dependent entry becomes unreachable at once. A read that raced the
+    write stored its result under the old token, so it can never be served.
+
+    Concurrent misses for the same key are collapsed into one computation per
+    worker (single flight).
+    """
+
+    def __init__(self, backend: MemoryBackend | RedisBackend | None, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._flights: dict[str, list] = {}
+        self._async_flights: dict[str, list] = {}
+        self._counts: dict[str, list[int]] = defaultdict(lambda: [0, 0])
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    def key(self, route: str, scopes: list[str], request: Request) -> str:
+        generations = [self.backend.generation(scope) for scope in scopes]
+        query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+        digest = hashlib.sha256("|".join([*scopes, *generations, query]).encode("utf-8")).hexdigest()
+        return f"response:{route}:{digest[:32]}"
+
+    def _lookup(self, route: str, key: str, count: bool = True) -> CachedResponse | None:
+        raw = self.backend.get(key)
+        if count:
+            with self._lock:
+                self._counts[route][0 if raw is not None else 1] += 1
+        return CachedResponse.decode(raw) if raw is not None else None
+
+    def _store(self, key: str, result):
+        if isinstance(result, CachedResponse):
+            self.backend.set(key, result.encode(), self.ttl)
+        return result
+
+    @contextmanager
+    def _single_flight(self, key: str):
+        with self._lock:
+            flight = self._flights.setdefault(key, [threading.Lock(), 0])
+            flight[1] += 1
+        try:
+            with flight[0]:
+                yield
+        finally:
+            with self._lock:
+                flight[1] -= 1
+                if not flight[1]:
+                    del self._flights[key]
+
+    @asynccontextmanager
+    async def _single_flight_async(self, key: str):
+        # only touched from the event loop thread, so no extra locking needed
+        flight = self._async_flights.setdefault(key, [asyncio.Lock(), 0])
+        flight[1] += 1
+        try:
+            async with flight[0]:
+                yield
+        finally:
+            flight[1] -= 1
+            if not flight[1]:
+                del self._async_flights[key]
+
+    def fetch(
+        self,
+        route: str,
+        scopes: list[str],
+        request: Request,
+        compute: Callable[[], CachedResponse | Response],
+        bypass: bool = False,
+    ):
+        """
+        Serve the cached response or compute and store it. compute() may return
+        a plain Response (e.g. a 304) which is passed through uncached. bypass
+        is for responses that depend on the clock, which no write invalidates.
+        """
+        if not self.enabled or bypass:
+            return _respond(request, compute())
+        key = self.key(route, scopes, request)
+        if (entry := self._lookup(route, key)) is not None:
+            return entry.to_response(request)
+        with self._single_flight(key):
+            if (entry := self._lookup(route, key, count=False)) is None:
+                entry = self._store(key, compute())
+        return _respond(request, entry)
+
+    async def _offload(self, func, *args):
+        if self.backend.blocking:
+            return await anyio.to_thread.run_sync(func, *args)
+        return func(*args)
+
+    async def fetch_async(
+        self,
+        route: str,
+        scopes: list[str],
+        request: Request,
+        compute: Callable[[], Awaitable[CachedResponse | Response]],
+        bypass: bool = False,
+    ):
+        # a threading lock here would block the event loop and the request holding it
+        if not self.enabled or bypass:
+            return _respond(request, await compute())
+        key = await self._offload(self.key, route, scopes, request)
+        if (entry := await self._offload(self._lookup, route, key)) is not None:
+            return entry.to_response(request)
+        async with self._single_flight_async(key):
+            if (entry := await self._offload(self._lookup, route, key, False)) is None:
+                entry = await self._offload(self._store, key, await compute())
+        return _respond(request, entry)
+
+    def invalidate(self, user_id: int | None = None, task_ids=()) -> None:
+        if not self.enabled:
+            return
+        scopes = [task_scope(task_id) for task_id in task_ids]
+        if user_id is not None:
+            scopes.append(user_scope(user_id))
+        if not scopes:
+            return
+        deferred = _deferred_scopes.get()
+        if deferred is not None:
+            deferred.extend(scopes)
+        else:
+            self.backend.bump(scopes)
+
+    @asynccontextmanager
+    async def deferred_invalidation(self):
+        """
+        For sync route code run on the event loop (AsyncSession.run_sync):
+        invalidate() calls inside the block are collected and applied when it
+        exits, from a worker thread if the backend blocks.
+        """
+        deferred = []
+        token = _deferred_scopes.set(deferred)
+        try:
+            yield
+        finally:
+            _deferred_scopes.reset(token)
+            if deferred and self.enabled:
+                await self._offload(self.backend.bump, deferred)
+
+    def stats(self) -> dict:
+        with self._lock:
+            routes = {}
+            for route, (hits, misses) in self._counts.items():
+                lookups = hits + misses
+                routes[route] = {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_ratio": hits / lookups if lookups else 0.0,
+                }
+        return {"backend": type(self.backend).__name__ if self.enabled else None, "routes": routes}
+
+
+def _respond(request: Request, result: CachedResponse | Response) -> Response:
+    return result.to_response(request) if isinstance(result, CachedResponse) else result
+
+def user_scope(user_id: int) -> str:
+    return f"generation:user:{user_id}"
+
+def task_scope(task_id: int) -> str:
+    return f"generation:task:{task_id}"
+
+def get_cached_read_session(request: Request, primary: Session = Depends(get_session)):
+    # a miss computed on a lagging replica right after a write would be stored
+    # under the new generation and served to everyone until the TTL, so misses
+    # are filled from the primary; replicas serve these routes when caching is off
+    if response_cache.enabled:
+        yield primary
+        return
+    yield from get_read_session(request, primary)
+
+async def get_async_cached_read_session(request: Request, primary: AsyncSession = Depends(get_async_session)):
+    if response_cache.enabled:
+        yield primary
+        return
+    async for session in get_async_read_session(request, primary):
+        yield session
+
+def build_backend(name: str):
+    if name == "memory":
+        return MemoryBackend(maxsize=settings.RESPONSE_CACHE_SIZE, ttl=settings.RESPONSE_CACHE_TTL)
+    if name == "redis":
+        return RedisBackend(settings.RESPONSE_CACHE_URL)
+    return None
+
+# create_app installs the RESPONSE_CACHE_BACKEND backend; disabled until then
+response_cache = ResponseCache(None, ttl=0)
@@ -1,9 +1,57 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status, Response
+import io
+from datetime import datetime
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile, status, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, func, insert, tuple_
 from sqlmodel import Session, select
-from src.db import get_session
-from src.models import Task, User
+from src import settings
+from src.db import get_session, get_session_factory
+from src.models import Priority, Task, User
 from src.users.helpers import get_current_user
-from .schemas import PaginatedTaskSchema, TaskCreateSchema, TaskReadSchema, TaskUpdateSchema
+from .bulk import (
+    BULK_TASK_NOT_FOUND_ERR,
+    DUPLICATE_ITEM_ERR,
+    INVALID_PRIORITY_ERR,
+    bulk_update_statement,
+    is_valid_priority,
+)
+from .counters import (
+    apply_counter_delta,
+    count_from_counters,
+    get_counters,
+    get_counters_version,
+    merge_deltas,
+    task_delta,
+)
+from .etags import etag_matches, list_etag, not_modified, task_etag
+from .export import MEDIA_TYPES, ExportFormat, export_statement, stream_tasks, task_filters
+from .importer import import_tasks
+from .pagination import (
+    CURSOR_SORT_ERR,
+    SortDirection,
+    TaskSort,
+    decode_cursor,
+    encode_cursor,
+    order_by_clause,
+)
+from .response_cache import CachedResponse, get_cached_read_session, response_cache, task_scope, user_scope
+from .search import search_statement, trigram_statement
+from .serialization import dump_page, dump_task, select_task_rows
+from .writes import create_task_statement, delete_task_statement, update_task_statement
+from .schemas import (
+    PaginatedTaskSchema,
+    TaskBulkCreateSchema,
+    TaskBulkDeleteSchema,
+    TaskBulkResponseSchema,
+    TaskBulkResultSchema,
+    TaskBulkUpdateSchema,
+    TaskCountersSchema,
+    TaskCreateSchema,
+    TaskImportReportSchema,
+    TaskReadSchema,
+    TaskUpdateSchema,
+    TASKS_MAX_PAGE_SIZE,
+)
 
 router = APIRouter()
 
@@ -18,53 +66,386 @@ NO_PERMISSION_ERR = {
     "code": "FORBIDDEN", 
     "message": "You do not have permission to read/update/delete this task."
 }
+IMPORT_ENCODING_ERR = {
+    "code": "VALIDATION_ERROR",
+    "message": "Import files must be UTF-8 encoded."
+}
+
+def _paginate_tasks(
+    session: Session,
+    filters: list,
+    offset: int,
+    limit: int,
+    cursor: str | None,
+    total: int | None,
+    sort: TaskSort = TaskSort.CREATED_AT,
+    direction: SortDirection = SortDirection.ASC,
+    fast: bool = False,
+) -> PaginatedTaskSchema | dict:
+    """With fast=True the page is a plain dict of row tuples for serialization.dump_page."""
+    # (created_at, id) gives a stable order served by ix_tasks_user_id_created_at_id
+    # for one user's tasks and by ix_tasks_created_at_id across users, so cursor
+    # pages are index range scans instead of growing OFFSET skips.
+    base_q = select_task_rows() if fast else select(Task)
+    base_q = base_q.where(*filters).order_by(*order_by_clause(sort, direction))
+    if cursor is not None:
+        if sort != TaskSort.CREATED_AT:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=CURSOR_SORT_ERR)
+        after = tuple_(*decode_cursor(cursor))
+        position = tuple_(Task.created_at, Task.id)
+        base_q = base_q.where(position < after if direction == SortDirection.DESC else position > after)
+        offset = None
+    else:
+        base_q = base_q.offset(offset)
+
+    # fetch one extra row to know whether another page exists without counting
+    rows = session.exec(base_q.limit(limit + 1)).all()
+    has_next = len(rows) > limit
+    paginated_tasks = rows[:limit]
+    next_cursor = None
+    if has_next and sort == TaskSort.CREATED_AT:
+        last = paginated_tasks[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+
+    page = dict(
+        items=paginated_tasks,
+        total=total,
+        limit=limit,
+        offset=offset,
+        has_next=has_next,
+        next_cursor=next_cursor,
+    )
+    return page if fast else PaginatedTaskSchema(**page)
+
+@router.get("/tasks", response_model=PaginatedTaskSchema)
+def get_tasks(
+    session: Session = Depends(get_session),
+    session_factory = Depends(get_session_factory),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=TASKS_MAX_PAGE_SIZE),
+    cursor: str | None = Query(None),
+    include_total: bool = Query(False),
+    user_id: int | None = Query(None),
+    is_completed: bool | None = Query(None),
+    priority: Priority | None = Query(None),
+    due_from: datetime | None = Query(None),
+    due_to: datetime | None = Query(None),
+    stream: bool = Query(False),
+    stream_format: ExportFormat = Query(ExportFormat.NDJSON, alias="format"),
+):
+    """
+    Paginated task listing across all users. With stream=true every matching
+    task is written out as NDJSON/CSV from a server-side cursor instead, which
+    ignores the paging parameters.
+    """
+    filters = task_filters(user_id, is_completed, priority, due_from, due_to)
+    if stream:
+        return StreamingResponse(
+            stream_tasks(session_factory, export_statement(filters), stream_format),
+            media_type=MEDIA_TYPES[stream_format],
+        )
+
+    total = None
+    if include_total:
+        total = session.exec(select(func.count()).select_from(Task).where(*filters)).one()
+    if settings.FAST_TASK_SERIALIZATION:
+        page = _paginate_tasks(session, filters, offset, limit, cursor, total, fast=True)
+        return Response(content=dump_page(page), media_type="application/json")
+    return _paginate_tasks(session, filters, offset, limit, cursor, total)
+
+def user_tasks_entry(
+    session: Session,
+    request: Request,
+    current_user: User,
+    offset: int,
+    limit: int,
+    is_completed: bool | None,
+    priority: Priority | None,
+    due_from: datetime | None,
+    due_to: datetime | None,
+    overdue: bool,
+    sort: TaskSort,
+    direction: SortDirection,
+    cursor: str | None,
+    include_total: bool,
+) -> CachedResponse | Response:
+    # users without a counters row have never written a task; they get no ETag.
+    # Neither do overdue lists, which change as due dates pass without any write
+    etag = None
+    version = None if overdue else get_counters_version(session, current_user.id)
+    if version is not None:
+        etag = list_etag(current_user.id, version, request)
+        if etag_matches(request, etag):
+            return not_modified(etag)
 
-@router.get("/tasks", response_model=list[TaskReadSchema])
-def get_tasks(session: Session = Depends(get_session)):
-    tasks = session.exec(select(Task)).all()
-    return tasks
+    filters = task_filters(current_user.id, is_completed, priority, due_from, due_to, overdue)
+
+    total = None
+    if include_total:
+        # counters only break totals down by completion
+        counters = None
+        if priority is None and due_from is None and due_to is None and not overdue:
+            counters = get_counters(session, current_user.id)
+        if counters is not None:
+            total = count_from_counters(counters, is_completed)
+        else:
+            total = session.exec(select(func.count()).select_from(Task).where(*filters)).one()
+
+    if settings.FAST_TASK_SERIALIZATION:
+        page = _paginate_tasks(session, filters, offset, limit, cursor, total, sort, direction, fast=True)
+        return CachedResponse(etag, dump_page(page))
+    page = _paginate_tasks(session, filters, offset, limit, cursor, total, sort, direction)
+    return CachedResponse(etag, page.model_dump_json().encode("utf-8"))
 
 @router.get("/tasks/user", response_model=PaginatedTaskSchema)
 def get_user_tasks(
+    request: Request,
     current_user: User = Depends(get_current_user), 
-    session: Session = Depends(get_session),
-    offset: int = Query(1, ge=1),
+    session: Session = Depends(get_cached_read_session),
+    offset: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
     is_completed: bool | None = Query(None),
-): 
-    base_q = select(Task).where(Task.user_id == current_user.id)
-    all_tasks = session.exec(base_q).all()
-    total = len(all_tasks)
-
-    if is_completed is not None:
-        base_q = base_q.where(Task.is_completed == is_completed)
+    priority: Priority | None = Query(None),
+    due_from: datetime | None = Query(None),
+    due_to: datetime | None = Query(None),
+    overdue: bool = Query(False),
+    sort: TaskSort = Query(TaskSort.CREATED_AT),
+    direction: SortDirection = Query(SortDirection.ASC),
+    cursor: str | None = Query(None),
+    include_total: bool = Query(True),
+):
+    return response_cache.fetch(
+        "tasks.user",
+        [user_scope(current_user.id)],
+        request,
+        lambda: user_tasks_entry(
+            session,
+            request,
+            current_user,
+            offset=offset,
+            limit=limit,
+            is_completed=is_completed,
+            priority=priority,
+            due_from=due_from,
+            due_to=due_to,
+            overdue=overdue,
+            sort=sort,
+            direction=direction,
+            cursor=cursor,
+            include_total=include_total,
+        ),
+        bypass=overdue,
+    )
 
-    limited_q = base_q.offset(offset).limit(limit)
-    paginated_tasks = session.exec(limited_q).all()
-    
-    has_next = (offset + len(paginated_tasks)) < total
+@router.get("/tasks/user/search", response_model=PaginatedTaskSchema)
+def search_user_tasks(
+    q: str = Query(min_length=1, max_length=200),
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=100),
+):
+    stmt = search_statement(current_user.id, q)
+    rows = session.exec(stmt.offset(offset).limit(limit + 1)).all()
+    # only fall back when the full-text query matches nothing at all, so later
+    # pages of a trigram search keep using trigram
+    if not rows and settings.TASK_SEARCH_TRIGRAM:
+        if offset == 0 or not session.exec(select(stmt.exists())).one():
+            stmt = trigram_statement(current_user.id, q)
+            rows = session.exec(stmt.offset(offset).limit(limit + 1)).all()
 
-    result = PaginatedTaskSchema(
-        items=paginated_tasks,
-        total=total,
+    return PaginatedTaskSchema(
+        items=rows[:limit],
         limit=limit,
         offset=offset,
-        has_next=has_next,
+        has_next=len(rows) > limit,
     )
 
-    return result
+@router.get("/tasks/user/stats", response_model=TaskCountersSchema)
+def get_user_task_stats(
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    counters = get_counters(session, current_user.id)
+    if counters is None:
+        return TaskCountersSchema()
+    return counters
 
 
+def _bulk_response(results: list[TaskBulkResultSchema]) -> TaskBulkResponseSchema:
+    results.sort(key=lambda result: result.index)
+    succeeded = sum(result.ok for result in results)
+    return TaskBulkResponseSchema(results=results, succeeded=succeeded, failed=len(results) - succeeded)
+
+@router.get("/tasks/user/export")
+def export_user_tasks(
+    current_user: User = Depends(get_current_user),
+    session_factory = Depends(get_session_factory),
+    export_format: ExportFormat = Query(ExportFormat.NDJSON, alias="format"),
+    is_completed: bool | None = Query(None),
+    due_from: datetime | None = Query(None),
+    due_to: datetime | None = Query(None),
+):
+    filters = task_filters(current_user.id, is_completed, due_from=due_from, due_to=due_to)
+    return StreamingResponse(
+        stream_tasks(session_factory, export_statement(filters), export_format),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="tasks.{export_format.value}"'},
+    )
+
+@router.post("/tasks/bulk", response_model=TaskBulkResponseSchema)
+def create_tasks_bulk(
+    payload: TaskBulkCreateSchema,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    results = []
+    indexes, rows = [], []
+    for index, item in enumerate(payload.items):
+        if not is_valid_priority(item.priority):
+            results.append(TaskBulkResultSchema(index=index, ok=False, error=INVALID_PRIORITY_ERR))
+            continue
+        task = Task(
+            **item.model_dump(exclude={'user_id', 'priority'}),
+            priority=Priority(item.priority),
+            user_id=current_user.id,
+        )
+        indexes.append(index)
+        rows.append(task.model_dump(exclude={'id'}))
+
+    if rows:
+        # executemany + RETURNING is sent as batched multi-row INSERT ... VALUES ... RETURNING
+        stmt = insert(Task).returning(Task, sort_by_parameter_order=True)
+        tasks = session.exec(stmt, params=rows).scalars().all()
+        apply_counter_delta(session, current_user.id, merge_deltas(*(task_delta(task) for task in tasks)))
+        session.commit()
+        response_cache.invalidate(current_user.id)
+        for index, task in zip(indexes, tasks):
+            results.append(TaskBulkResultSchema(index=index, id=task.id, ok=True, task=task))
+    return _bulk_response(results)
+
+@router.patch("/tasks/bulk", response_model=TaskBulkResponseSchema)
+def update_tasks_bulk(
+    payload: TaskBulkUpdateSchema,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    ids = [item.id for item in payload.items]
+    owned = {
+        row.id: row
+        for row in session.exec(
+            select(Task.id, Task.is_completed, Task.priority)
+            .where(Task.user_id == current_user.id, Task.id.in_(ids))
+            .with_for_update()
+        ).all()
+    }
+
+    results, patches, seen = [], {}, set()
+    for index, item in enumerate(payload.items):
+        if item.id in seen:
+            results.append(TaskBulkResultSchema(index=index, id=item.id, ok=False, error=DUPLICATE_ITEM_ERR))
+        elif item.id not in owned:
+            results.append(TaskBulkResultSchema(index=index, id=item.id, ok=False, error=BULK_TASK_NOT_FOUND_ERR))
+        elif not is_valid_priority(item.priority):
+            results.append(TaskBulkResultSchema(index=index, id=item.id, ok=False, error=INVALID_PRIORITY_ERR))
+        else:
+            patches[item.id] = (index, item.model_dump())
+        seen.add(item.id)
+
+    if patches:
+        stmt = bulk_update_statement(current_user.id, [patch for _, patch in patches.values()])
+        tasks = session.exec(stmt).scalars().all()
+        apply_counter_delta(session, current_user.id, merge_deltas(
+            *(task_delta(owned[task.id], -1) for task in tasks),
+            *(task_delta(task) for task in tasks),
+        ))
+        session.commit()
+        response_cache.invalidate(current_user.id, [task.id for task in tasks])
+        for task in tasks:
+            index, _ = patches[task.id]
+            results.append(TaskBulkResultSchema(index=index, id=task.id, ok=True, task=task))
+    return _bulk_response(results)
+
+@router.delete("/tasks/bulk", response_model=TaskBulkResponseSchema)
+def delete_tasks_bulk(
+    payload: TaskBulkDeleteSchema,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    # ownership check and delete in a single statement
+    deleted = session.exec(
+        delete(Task)
+        .where(Task.user_id == current_user.id, Task.id.in_(payload.ids))
+        .returning(Task.id, Task.is_completed, Task.priority)
+    ).all()
+    if deleted:
+        apply_counter_delta(session, current_user.id, merge_deltas(*(task_delta(row, -1) for row in deleted)))
+        session.commit()
+        response_cache.invalidate(current_user.id, [row.id for row in deleted])
+
+    deleted_ids = {row.id for row in deleted}
+    results, seen = [], set()
+    for index, task_id in enumerate(payload.ids):
+        if task_id in seen:
+            results.append(TaskBulkResultSchema(index=index, id=task_id, ok=False, error=DUPLICATE_ITEM_ERR))
+        elif task_id in deleted_ids:
+            results.append(TaskBulkResultSchema(index=index, id=task_id, ok=True))
+        else:
+            results.append(TaskBulkResultSchema(index=index, id=task_id, ok=False, error=BULK_TASK_NOT_FOUND_ERR))
+        seen.add(task_id)
+    return _bulk_response(results)
+
+@router.post("/tasks/import", response_model=TaskImportReportSchema)
+def import_user_tasks(
+    file: UploadFile = File(...),
+    import_format: ExportFormat | None = Query(None, alias="format"),
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    if import_format is None:
+        is_csv = (file.filename or "").endswith(".csv") or file.content_type == "text/csv"
+        import_format = ExportFormat.CSV if is_csv else ExportFormat.NDJSON
+    stream = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    try:
+        report = import_tasks(session, current_user.id, stream, import_format)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=IMPORT_ENCODING_ERR)
+    if report.imported:
+        response_cache.invalidate(current_user.id)
+    return report
+
+def task_entry(session: Session, request: Request, task_id: int) -> CachedResponse | Response:
+    if settings.FAST_TASK_SERIALIZATION:
+        # one query serves both the ETag check and the body
+        row = session.exec(select_task_rows().where(Task.id == task_id)).first()
+        if row is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=TASK_NOT_FOUND_ERR)
+        etag = task_etag(row.id, row.updated_at)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        return CachedResponse(etag, dump_task(row))
+
+    updated_at = session.exec(select(Task.updated_at).where(Task.id == task_id)).first()
+    if updated_at is not None and etag_matches(request, task_etag(task_id, updated_at)):
+        return not_modified(task_etag(task_id, updated_at))
 
-@router.get("/tasks/{task_id}", response_model=TaskReadSchema)
-def get_task(task_id:int, session: Session=Depends(get_session)):
     task = session.get(Task, task_id)
     if not task:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
             detail=TASK_NOT_FOUND_ERR
         )
-    return task
+    body = TaskReadSchema.model_validate(task).model_dump_json().encode("utf-8")
+    return CachedResponse(task_etag(task.id, task.updated_at), body)
+
+@router.get("/tasks/{task_id}", response_model=TaskReadSchema)
+def get_task(task_id:int, request: Request, session: Session=Depends(get_cached_read_session)):
+    return response_cache.fetch(
+        "tasks.get",
+        [task_scope(task_id)],
+        request,
+        lambda: task_entry(session, request, task_id),
+    )
 
 @router.post("/tasks", response_model=TaskReadSchema)
 def create_task(
@@ -72,47 +453,42 @@ def create_task(
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
+    if not is_valid_priority(payload.priority):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=INVALID_PRIORITY_ERR)
     task = Task(
-        **payload.model_dump(exclude={'user_id'}),
+        **payload.model_dump(exclude={'user_id', 'priority'}),
+        priority=Priority(payload.priority),
         user_id=current_user.id,
     )
-    session.add(task)
+    row = session.exec(create_task_statement, params=task.model_dump(exclude={'id'})).one()
     session.commit()
-    session.refresh(task)
-    return task
+    response_cache.invalidate(current_user.id)
+    return row._asdict()
+
+def _missing_task_error(session: Session, task_id: int) -> HTTPException:
+    # only reached when the write matched nothing: tell "gone" from "not yours"
+    exists = session.exec(select(Task.id).where(Task.id == task_id)).first() is not None
+    if exists:
+        return HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=NO_PERMISSION_ERR)
+    return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=TASK_NOT_FOUND_ERR)
 
 @router.patch("/tasks/{task_id}", response_model=TaskReadSchema)
 def update_task(task_id:int, payload:TaskUpdateSchema, session: Session=Depends(get_session), current_user: User = Depends(get_current_user)):
-    task = session.get(Task, task_id)
-    if not task:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=TASK_NOT_FOUND_ERR)
-    if current_user.id != task.user_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=NO_PERMISSION_ERR)
-    
-    if payload.title is not None:
-        task.title = payload.title
-    if payload.description is not None:
-        task.description = payload.description
-    if payload.due_date is not None:
-        task.due_date = payload.due_date
-    if payload.priority is not None:
-        task.priority = payload.priority
-    if payload.is_completed is not None:
-        task.is_completed = payload.is_completed
-
-    session.add(task)
+    if not is_valid_priority(payload.priority):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=INVALID_PRIORITY_ERR)
+    params = {**payload.model_dump(), "task_id": task_id, "user_id": current_user.id, "updated_at": datetime.now()}
+    row = session.exec(update_task_statement, params=params).first()
+    if row is None:
+        raise _missing_task_error(session, task_id)
     session.commit()
-    session.refresh(task)
-    return task
+    response_cache.invalidate(current_user.id, [task_id])
+    return row._asdict()
 
 @router.delete("/tasks/{task_id}", response_model=TaskReadSchema)
 def delete_task(task_id: int, session: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
-    task = session.get(Task, task_id)
-    if not task:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=TASK_NOT_FOUND_ERR)
-    if current_user.id != task.user_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=NO_PERMISSION_ERR)
-    
-    session.delete(task)
+    row = session.exec(delete_task_statement, params={"task_id": task_id, "user_id": current_user.id}).first()
+    if row is None:
+        raise _missing_task_error(session, task_id)
     session.commit()
+    response_cache.invalidate(current_user.id, [task_id])
     return Response(status_code=status.HTTP_204_NO_CONTENT)
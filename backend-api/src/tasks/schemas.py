@@ -4,6 +4,9 @@ from sqlmodel import Field, SQLModel
 
 from src.models import Priority
 
+BULK_MAX_ITEMS = 500
+TASKS_MAX_PAGE_SIZE = 1000
+
 
 class TaskCreateSchema(SQLModel):
     title: str
@@ -36,7 +39,65 @@ class TaskReadSchema(SQLModel):
 
 class PaginatedTaskSchema(SQLModel):
     items: List[TaskReadSchema]
-    total: int
+    total: Optional[int] = None
     limit: int
-    offset: int
-    has_next: bool
\ No newline at end of file
+    offset: Optional[int] = None
+    has_next: bool
+    next_cursor: Optional[str] = None
+
+
+class TaskCountersSchema(SQLModel):
+    total: int = 0
+    completed: int = 0
+    low: int = 0
+    medium: int = 0
+    high: int = 0
+
+
+
+class TaskBulkCreateSchema(SQLModel):
+    items: List[TaskCreateSchema] = Field(min_length=1, max_length=BULK_MAX_ITEMS)
+
+
+class TaskBulkUpdateItemSchema(TaskUpdateSchema):
+    id: int
+
+
+class TaskBulkUpdateSchema(SQLModel):
+    items: List[TaskBulkUpdateItemSchema] = Field(min_length=1, max_length=BULK_MAX_ITEMS)
+
+
+class TaskBulkDeleteSchema(SQLModel):
+    ids: List[int] = Field(min_length=1, max_length=BULK_MAX_ITEMS)
+
+
+class TaskBulkErrorSchema(SQLModel):
+    code: str
+    message: str
+
+
+class TaskBulkResultSchema(SQLModel):
+    index: int
+    id: Optional[int] = None
+    ok: bool
+    task: Optional[TaskReadSchema] = None
+    error: Optional[TaskBulkErrorSchema] = None
+
+
+class TaskBulkResponseSchema(SQLModel):
+    results: List[TaskBulkResultSchema]
+    succeeded: int
+    failed: int
+
+
+
+class TaskImportErrorSchema(SQLModel):
+    line: int
+    message: str
+
+
+class TaskImportReportSchema(SQLModel):
+    imported: int
+    failed: int
+    errors: List[TaskImportErrorSchema]
+    errors_truncated: bool = False
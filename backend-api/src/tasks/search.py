@@ -0,0 +1,38 @@
+from sqlalchemy import cast, func, literal, or_
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlmodel import select
+
+from src.models import TASK_SEARCH_CONFIG, Task
+
+search_vector = Task.__table__.c.search_vector
+
+
+def search_statement(user_id: int, q: str):
+    """
+    Full-text match on title (weight A) and description (weight B) using
+    websearch syntax ("quoted phrases", -exclusions, or). The @@ predicate is
+    served by the GIN index on tasks.search_vector.
+    """
+    query = func.websearch_to_tsquery(cast(TASK_SEARCH_CONFIG, REGCONFIG), q)
+    return (
+        select(Task)
+        .where(Task.user_id == user_id, search_vector.op("@@")(query))
+        .order_by(func.ts_rank(search_vector, query).desc(), Task.id)
+    )
+
+def trigram_statement(user_id: int, q: str):
+    """
+    Prefix/typo matches through pg_trgm word similarity (q <% column), served
+    by the gin_trgm_ops indexes the search migration creates when pg_trgm is
+    available.
+    """
+    score = func.greatest(
+        func.word_similarity(q, Task.title),
+        func.coalesce(func.word_similarity(q, Task.description), 0),
+    )
+    return (
+        select(Task)
+        .where(Task.user_id == user_id, or_(literal(q).op("<%")(Task.title), literal(q).op("<%")(Task.description)))
+        .order_by(score.desc(), Task.id)
+    )
+
@@ -0,0 +1,53 @@
+"""
+Fast path for task responses (FAST_TASK_SERIALIZATION): rows are selected as
+plain tuples, so no ORM instances or identity map entries are created, and
+dumped straight to JSON bytes by compiled TypeAdapters. The TypedDicts mirror
+TaskReadSchema/PaginatedTaskSchema field for field and in the same order, so
+the bytes match what response_model produces.
+"""
+from datetime import datetime
+from typing import Optional
+from typing_extensions import TypedDict
+from pydantic import TypeAdapter
+from sqlmodel import select
+
+from src.models import Priority, Task
+
+
+class TaskRow(TypedDict):
+    id: int
+    title: str
+    description: Optional[str]
+    due_date: Optional[datetime]
+    priority: Priority
+    is_completed: bool
+    created_at: datetime
+    updated_at: datetime
+    user_id: Optional[int]
+
+class TaskPage(TypedDict):
+    items: list[TaskRow]
+    total: Optional[int]
+    limit: int
+    offset: Optional[int]
+    has_next: bool
+    next_cursor: Optional[str]
+
+TASK_FIELDS = tuple(TaskRow.__annotations__)
+TASK_COLUMNS = tuple(getattr(Task, field) for field in TASK_FIELDS)
+
+task_adapter = TypeAdapter(TaskRow)
+page_adapter = TypeAdapter(TaskPage)
+
+
+def select_task_rows():
+    return select(*TASK_COLUMNS)
+
+def row_to_dict(row) -> TaskRow:
+    return dict(zip(TASK_FIELDS, row))
+
+def dump_task(row) -> bytes:
+    return task_adapter.dump_json(row_to_dict(row))
+
+def dump_page(page: dict) -> bytes:
+    return page_adapter.dump_json({**page, "items": [row_to_dict(row) for row in page["items"]]})
@@ -0,0 +1,68 @@
+"""
+Single-task writes as one statement each: the write itself with RETURNING,
+plus the task_counters upsert as a data-modifying CTE. With the commit that
+is two round trips per write instead of a SELECT, the write, the counters
+upsert, the commit and a refresh SELECT.
+
+The statements are fixed SQL text rather than Core constructs: SQLAlchemy
+cannot cache the compiled form of INSERT ... ON CONFLICT, and recompiling a
+statement this size on every request costs more than the round trips saved.
+"""
+from sqlalchemy import text
+
+from src.models import Task
+from .counters import counters_cte_sql
+from .serialization import TASK_FIELDS
+
+_COLUMNS = [Task.__table__.c[field] for field in TASK_FIELDS]
+_RETURNING = ", ".join(f"tasks.{field}" for field in TASK_FIELDS)
+_SELECT = ", ".join(TASK_FIELDS)
+
+CREATE_TASK_SQL = f"""
+WITH inserted AS (
+    INSERT INTO tasks (title, description, due_date, priority, is_completed, created_at, updated_at, user_id)
+    VALUES (:title, :description, :due_date, CAST(:priority AS priority), :is_completed, :created_at, :updated_at, :user_id)
+    RETURNING {_RETURNING}
+),
+{counters_cte_sql("inserted", new="")}
+SELECT {_SELECT} FROM inserted
+"""
+
+# the FOR UPDATE CTE locks the row and reads its latest version before the
+# update, so the old values used for the counters delta cannot be stale;
+# NULL parameters keep the current value, as in the bulk update
+UPDATE_TASK_SQL = f"""
+WITH old AS (
+    SELECT id, is_completed, priority FROM tasks
+    WHERE id = :task_id AND user_id = :user_id
+    FOR UPDATE
+),
+updated AS (
+    UPDATE tasks SET
+        title = COALESCE(CAST(:title AS varchar), tasks.title),
+        description = COALESCE(CAST(:description AS varchar), tasks.description),
+        due_date = COALESCE(CAST(:due_date AS timestamp), tasks.due_date),
+        priority = COALESCE(CAST(:priority AS priority), tasks.priority),
+        is_completed = COALESCE(CAST(:is_completed AS boolean), tasks.is_completed),
+        updated_at = :updated_at
+    FROM old
+    WHERE tasks.id = old.id
+    RETURNING {_RETURNING}, old.is_completed AS old_is_completed, old.priority AS old_priority
+),
+{counters_cte_sql("updated", new="", old="old_")}
+SELECT {_SELECT} FROM updated
+"""
+
+DELETE_TASK_SQL = f"""
+WITH deleted AS (
+    DELETE FROM tasks
+    WHERE id = :task_id AND user_id = :user_id
+    RETURNING {_RETURNING}
+),
+{counters_cte_sql("deleted", old="")}
+SELECT {_SELECT} FROM deleted
+"""
+
+create_task_statement = text(CREATE_TASK_SQL).columns(*_COLUMNS)
+update_task_statement = text(UPDATE_TASK_SQL).columns(*_COLUMNS)
+delete_task_statement = text(DELETE_TASK_SQL).columns(*_COLUMNS)
@@ -0,0 +1,178 @@
+from datetime import datetime
+from typing import Annotated
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.db import get_async_session
+from src.replicas import get_async_read_session
+from src.models import PasswordReset, User
+from src.users.cache import invalidate_user_async
+from src.users.csrf import csrf_protect
+from src.users.helpers import (
+    create_raw_token,
+    get_current_user_async,
+    hash_reset_token,
+    verify_token,
+)
+from src.users.hasher import password_hasher
+from src.users.ratelimit import (
+    forgot_password_rate_limit,
+    login_rate_limit,
+    register_rate_limit,
+    reset_password_rate_limit,
+)
+from src.users.resets import outstanding_resets_update
+from src.users.schemas import (
+    TokenSchema,
+    UserCreateSchema,
+    UserInSchema,
+    UserReadSchema,
+    ForgotPasswordRequestSchema,
+    PasswordResetRequestSchema
+)
+from .routes import (
+    INVALID_REFRESH_TOKEN_ERR,
+    INVALID_TOKEN_ERR,
+    NO_REFRESH_TOKEN_ERR,
+    PASSWORD_RESET_ERR,
+    REFRESH_TOKEN_NAME,
+    USER_CONFLICT_ERR,
+    USER_NOT_FOUND_ERR,
+    USER_UNAUTH_ERR,
+    _issue_tokens,
+    _reset_email,
+)
+
+router = APIRouter()
+
+"""
+Async variants of the user routes, enabled with USE_ASYNC_DB.
+Routes that never touch the database (e.g. logout) are served by the sync router.
+"""
+
+
+@router.get("/", response_model=list[UserReadSchema])
+async def get_users(session: AsyncSession = Depends(get_async_read_session)):
+    users = (await session.exec(select(User))).all()
+    return users
+
+@router.get("/{user_id}", response_model=UserReadSchema)
+async def get_user(user_id: int, session: AsyncSession = Depends(get_async_session)):
+    user = await session.get(User, user_id)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=USER_NOT_FOUND_ERR)
+    return user
+
+@router.delete("/{user_id}")
+async def delete_user(user_id: int, session: AsyncSession = Depends(get_async_session)):
+    user = await session.get(User, user_id)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=USER_NOT_FOUND_ERR)
+    await session.delete(user)
+    await invalidate_user_async(session, user.id)
+    await session.commit()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+@router.post("/register", response_model=UserReadSchema, dependencies=[Depends(register_rate_limit)])
+async def register_user(payload: UserCreateSchema, session: AsyncSession = Depends(get_async_session)):
+    existing_user = (await session.exec(select(User).where(User.email == payload.email))).first()
+    if existing_user:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=USER_CONFLICT_ERR)
+    hashed_password = await password_hasher.hash(payload.password)
+    user = User(email=payload.email, hashed_password=hashed_password)
+    session.add(user)
+    await session.commit()
+    await session.refresh(user)
+    return user
+
+@router.post("/login", response_model=TokenSchema, dependencies=[Depends(login_rate_limit)])
+async def login_user(
+    payload: UserInSchema,
+    response: Response,
+    session: AsyncSession = Depends(get_async_session),
+):
+    user = (await session.exec(select(User).where(User.email == payload.email))).first()
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=USER_UNAUTH_ERR)
+    valid, new_hash = await password_hasher.verify_and_update(payload.password, user.hashed_password)
+    if not valid:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=USER_UNAUTH_ERR)
+    if new_hash:
+        user.hashed_password = new_hash
+        session.add(user)
+        await invalidate_user_async(session, user.id)
+        await session.commit()
+    return _issue_tokens(response, user)
+
+@router.post("/refresh", response_model=TokenSchema, dependencies=[Depends(csrf_protect)])
+async def refresh_tokens(
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_async_session)
+):
+    refresh_token = request.cookies.get(REFRESH_TOKEN_NAME)
+    if not refresh_token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=NO_REFRESH_TOKEN_ERR)
+    try:
+        payload = verify_token(refresh_token)
+        email = payload.get("sub")
+        if not email:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=INVALID_TOKEN_ERR)
+        user = (await session.exec(select(User).where(User.email == email))).first()
+        if not user:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=USER_NOT_FOUND_ERR)
+        return _issue_tokens(response, user)
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=INVALID_REFRESH_TOKEN_ERR)
+
+@router.post("/verify", response_model=UserReadSchema)
+async def verify_user(current_user: Annotated[User, Depends(get_current_user_async)]):
+    return current_user
+
+@router.post("/forgot-password", dependencies=[Depends(forgot_password_rate_limit)])
+async def forgot_password(
+    payload: ForgotPasswordRequestSchema,
+    request: Request,
+    session: AsyncSession = Depends(get_async_session)
+):
+    user = (await session.exec(select(User).where(User.email == payload.email))).first()
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=USER_NOT_FOUND_ERR)
+    raw_token = create_raw_token()
+    await session.exec(outstanding_resets_update(user.id))
+    session.add_all([
+        PasswordReset(user_id=user.id, hashed_token=hash_reset_token(raw_token)),
+        _reset_email(request, user.email, raw_token),
+    ])
+    await session.commit()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+@router.post("/reset-password", response_model=TokenSchema, dependencies=[Depends(reset_password_rate_limit)])
+async def reset_password(
+    payload: PasswordResetRequestSchema,
+    session: AsyncSession = Depends(get_async_session)
+):
+    hashed_token = hash_reset_token(payload.token)
+    new_ps = (await session.exec(
+        select(PasswordReset).where(
+            (PasswordReset.hashed_token == hashed_token) &
+            (PasswordReset.used == False) &
+            (PasswordReset.expires_at > datetime.now())
+        )
+    )).first()
+    if not new_ps:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=PASSWORD_RESET_ERR)
+    user = await session.get(User, new_ps.user_id)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=USER_NOT_FOUND_ERR)
+
+    user.hashed_password = await password_hasher.hash(payload.new_password)
+    new_ps.used = True
+    session.add_all([user, new_ps])
+    await invalidate_user_async(session, user.id)
+    await session.commit()
+
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,98 @@
+import logging
+import select as selectors
+import threading
+import psycopg2
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+
+from src import settings
+from src.cache import TTLCache
+from src.models import User
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "user_cache_invalidate"
+
+# sized from USER_CACHE_SIZE / USER_CACHE_TTL by create_app; disabled until then
+user_cache = TTLCache(maxsize=0, ttl=0)
+
+
+def get_cached_user(user_id: int) -> User | None:
+    snapshot = user_cache.get(user_id)
+    if snapshot is None:
+        return None
+    # hand out a fresh detached instance so requests never share ORM state
+    return User(**snapshot)
+
+def cache_user(user: User) -> None:
+    user_cache.set(user.id, user.model_dump())
+
+def _notify_statement(user_id: int):
+    return text("SELECT pg_notify(:channel, :payload)").bindparams(
+        channel=INVALIDATION_CHANNEL, payload=str(user_id)
+    )
+
+def _evict_after_commit(session, user_id: int) -> None:
+    # a request reading between the eviction and the commit still sees the old
+    # row and caches it again, so evict once more when the commit is done
+    event.listen(session, "after_commit", lambda _: user_cache.pop(user_id), once=True)
+
+def invalidate_user(session, user_id: int) -> None:
+    """
+    Drop the user from this worker's cache, now and again once the caller's
+    session commits. With USER_CACHE_NOTIFY the other workers are told too;
+    NOTIFY is transactional, so it is delivered on that same commit.
+    """
+    user_cache.pop(user_id)
+    _evict_after_commit(session, user_id)
+    if settings.USER_CACHE_NOTIFY:
+        session.exec(_notify_statement(user_id))
+
+async def invalidate_user_async(session, user_id: int) -> None:
+    user_cache.pop(user_id)
+    _evict_after_commit(session.sync_session, user_id)
+    if settings.USER_CACHE_NOTIFY:
+        await session.exec(_notify_statement(user_id))
+
+
+class InvalidationListener(threading.Thread):
+    """LISTENs on a dedicated connection and evicts users invalidated by other workers."""
+
+    def __init__(self, database_url: str, poll_interval: float = 5.0):
+        super().__init__(name="user-cache-listener", daemon=True)
+        self.dsn = make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self.poll_interval = poll_interval
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                self._listen()
+            except psycopg2.Error:
+                logger.exception("user cache listener lost its connection, retrying")
+                # anything could have been missed while disconnected
+                user_cache.clear()
+                self._stopped.wait(self.poll_interval)
+
+    def _listen(self) -> None:
+        conn = psycopg2.connect(self.dsn)
+        try:
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {INVALIDATION_CHANNEL}")
+            while not self._stopped.is_set():
+                ready, _, _ = selectors.select([conn], [], [], self.poll_interval)
+                if not ready:
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    try:
+                        user_cache.pop(int(notify.payload))
+                    except ValueError:
+                        user_cache.clear()
+        finally:
+            conn.close()
+
+    def stop(self) -> None:
+        self._stopped.set()
@@ -1,2 +1,10 @@
-def send_password_change_email(to_email: str, confirm_url: str) -> None:
-    print(f"[DEV EMAIL] To: {to_email}\nClick to confirm password change: {confirm_url}")
\ No newline at end of file
+from src.models import OutboxEmail
+
+
+def password_change_email(to_email: str, confirm_url: str) -> OutboxEmail:
+    """Outbox row for the reset link; add it in the same transaction as the PasswordReset."""
+    return OutboxEmail(
+        to_email=to_email,
+        subject="Reset your password",
+        body=f"Click to confirm password change: {confirm_url}",
+    )
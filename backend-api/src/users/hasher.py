@@ -0,0 +1,133 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from src import settings
+from src.metrics import PASSWORD_HASH_QUEUE_SECONDS, PASSWORD_HASH_REJECTED, PASSWORD_HASH_SECONDS
+
+HASHER_BUSY_EXCEPTION = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail={
+        "code": "SERVICE UNAVAILABLE",
+        "message": "Too many authentication requests, please retry shortly."
+    },
+    headers={"Retry-After": "1"},
+)
+
+
+@lru_cache
+def build_context(rounds: int) -> CryptContext:
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+
+def _timed(fn, *args):
+    # runs in the pool process; monotonic clocks are system-wide so the
+    # parent can subtract its submit time from started to get queue wait
+    started = time.monotonic()
+    result = fn(*args)
+    return result, started, time.monotonic() - started
+
+def _hash(password: str, rounds: int) -> str:
+    return build_context(rounds).hash(password)
+
+def _verify_and_update(password: str, hashed_password: str, rounds: int) -> tuple[bool, str | None]:
+    return build_context(rounds).verify_and_update(password, hashed_password)
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a dedicated process pool so hashing neither holds the GIL
+    of the serving worker nor competes with it for a threadpool slot: the
+    auth routes are async and await it, so queued jobs hold no thread.
+    At most workers + max_queue jobs are admitted; the rest get a 503.
+    Limits left as None follow the PASSWORD_HASHER_* and BCRYPT_ROUNDS settings.
+    """
+
+    def __init__(self, workers: int | None = None, max_queue: int | None = None, rounds: int | None = None):
+        self._workers = workers
+        self._max_queue = max_queue
+        self._rounds = rounds
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+        self._hash_time_total = 0.0
+
+    @property
+    def workers(self) -> int:
+        return settings.PASSWORD_HASHER_WORKERS if self._workers is None else self._workers
+
+    @property
+    def max_queue(self) -> int:
+        return settings.PASSWORD_HASHER_MAX_QUEUE if self._max_queue is None else self._max_queue
+
+    @property
+    def rounds(self) -> int:
+        return settings.BCRYPT_ROUNDS if self._rounds is None else self._rounds
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    async def _submit(self, operation: str, fn, *args):
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self._rejected += 1
+                PASSWORD_HASH_REJECTED.inc()
+                raise HASHER_BUSY_EXCEPTION
+            self._pending += 1
+        submitted = time.monotonic()
+        try:
+            loop = asyncio.get_running_loop()
+            result, started, elapsed = await loop.run_in_executor(self._get_executor(), _timed, fn, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+        wait = max(started - submitted, 0.0)
+        with self._lock:
+            self._completed += 1
+            self._queue_wait_total += wait
+            self._queue_wait_max = max(self._queue_wait_max, wait)
+            self._hash_time_total += elapsed
+        PASSWORD_HASH_QUEUE_SECONDS.observe(wait)
+        PASSWORD_HASH_SECONDS.labels(operation).observe(elapsed)
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._submit("hash", _hash, password, self.rounds)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> tuple[bool, str | None]:
+        """Returns (valid, new_hash); new_hash is set when the stored cost differs from BCRYPT_ROUNDS."""
+        return await self._submit("verify", _verify_and_update, password, hashed_password, self.rounds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            completed = self._completed
+            return {
+                "pending": self._pending,
+                "completed": completed,
+                "rejected": self._rejected,
+                "queue_wait_seconds_total": self._queue_wait_total,
+                "queue_wait_seconds_max": self._queue_wait_max,
+                "queue_wait_seconds_avg": self._queue_wait_total / completed if completed else 0.0,
+                "hash_seconds_total": self._hash_time_total,
+                "hash_seconds_avg": self._hash_time_total / completed if completed else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# the bcrypt processes start on the first hash, in the worker, never in a --preload master
+password_hasher = PasswordHasher()
@@ -1,25 +1,31 @@
 from datetime import datetime, timedelta, timezone
-from passlib.context import CryptContext
 import hashlib
+import time
 import jwt
 from jwt.exceptions import InvalidTokenError, ExpiredSignatureError
-from decouple import config
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 import secrets
 
-from src.db import get_session
+from src import settings
+from src.cache import TTLCache
+from src.db import get_async_session, get_session
+from src.metrics import JWT_CACHE_HITS, JWT_SECONDS
 from src.models import User
+from src.users.cache import cache_user, get_cached_user
+from src.users.hasher import build_context
 
 
-SECRET_KEY = config("AUTHJWT_SECRET_KEY")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 15
 REFRESH_TOKEN_EXPIRE_MINUTE = 60*24*3
 SESSION_COOKIE_EXPIRE_MINUTE = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# token digest -> decoded payload; entries expire at the token's own exp.
+# Sized from TOKEN_CACHE_SIZE by create_app; disabled until then
+token_cache = TTLCache(maxsize=0, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 CREDENTIALS_EXCEPTION = HTTPException(
@@ -50,23 +56,25 @@ TOKEN_INVALID_EXCEPTION= HTTPException(
 )
 
 def hash_password(password: str):
-    return pwd_context.hash(password)
+    return build_context(settings.BCRYPT_ROUNDS).hash(password)
    
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return build_context(settings.BCRYPT_ROUNDS).verify(plain_password, hashed_password)
 
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    with JWT_SECONDS.labels("encode").time():
+        encoded_jwt = jwt.encode(to_encode, settings.AUTHJWT_SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 def create_refresh_token(data: dict):
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(minutes=REFRESH_TOKEN_EXPIRE_MINUTE)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    with JWT_SECONDS.labels("encode").time():
+        encoded_jwt = jwt.encode(to_encode, settings.AUTHJWT_SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 def create_tokens(data: dict) -> tuple[str, str]:
@@ -75,13 +83,22 @@ def create_tokens(data: dict) -> tuple[str, str]:
     return access_token, refresh_token
 
 def decode_token(token: str):
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    digest = hashlib.sha256(token.encode("utf-8")).digest()
+    payload = token_cache.get(digest)
+    if payload is not None:
+        JWT_CACHE_HITS.inc()
         return payload
-    except InvalidTokenError:
-        raise TOKEN_INVALID_EXCEPTION
+    try:
+        with JWT_SECONDS.labels("decode").time():
+            payload = jwt.decode(token, settings.AUTHJWT_SECRET_KEY, algorithms=[ALGORITHM])
     except ExpiredSignatureError:
         raise TOKEN_EXPIRY_EXCEPTION
+    except InvalidTokenError:
+        raise TOKEN_INVALID_EXCEPTION
+    ttl = payload.get("exp", 0) - time.time()
+    if ttl > 0:
+        token_cache.set(digest, payload, ttl=ttl)
+    return payload
 
 def verify_token(token: str):
     payload = decode_token(token)
@@ -92,17 +109,41 @@ def verify_token(token: str):
 
 def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)):
     payload = verify_token(token)
-    email = payload.get("sub")
-    user = session.exec(select(User).where(User.email == email)).first()
+    user_id = payload.get("uid")
+    if user_id is not None:
+        user = get_cached_user(user_id)
+        if user is not None:
+            return user
+        user = session.get(User, user_id)
+    else:
+        # tokens issued before the uid claim existed
+        user = session.exec(select(User).where(User.email == payload.get("sub"))).first()
+    if user is None:
+        raise CREDENTIALS_EXCEPTION
+    cache_user(user)
+    return user
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), session: AsyncSession = Depends(get_async_session)):
+    payload = verify_token(token)
+    user_id = payload.get("uid")
+    if user_id is not None:
+        user = get_cached_user(user_id)
+        if user is not None:
+            return user
+        user = await session.get(User, user_id)
+    else:
+        user = (await session.exec(select(User).where(User.email == payload.get("sub")))).first()
     if user is None:
         raise CREDENTIALS_EXCEPTION
+    cache_user(user)
     return user
 
 def create_session_cookie(data: dict):
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(minutes=SESSION_COOKIE_EXPIRE_MINUTE)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    with JWT_SECONDS.labels("encode").time():
+        encoded_jwt = jwt.encode(to_encode, settings.AUTHJWT_SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 def create_raw_token():
@@ -0,0 +1,248 @@
+"""
+Delivery worker for the email outbox. Request handlers only insert
+OutboxEmail rows in their own transaction; this drains them in batches over
+one long-lived SMTP connection, retrying failures with exponential backoff.
+
+A batch is claimed in one UPDATE over a FOR UPDATE SKIP LOCKED subquery,
+which counts the attempt and leases the rows long enough to send them all,
+and each email's outcome is committed right after its send. Any number of
+workers (a thread per app worker, or `python -m src.users.outbox`) can run
+at once without sending an email twice; a worker that dies mid-batch
+leaves its unsent emails to be retried once the lease runs out.
+
+The body of a password email carries the reset token in clear, so it is
+blanked as soon as the row is sent or given up on, and purge_outbox deletes
+those rows once they are OUTBOX_RETENTION old.
+"""
+import argparse
+import logging
+import smtplib
+import threading
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from typing import Callable
+from sqlalchemy import text, update
+from sqlmodel import Session, select
+
+from src import settings
+from src.models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_BASE = 30
+BACKOFF_MAX = 60 * 60
+# per email of a claimed batch; well above the SMTP timeout, reconnect included
+CLAIM_TIMEOUT = timedelta(seconds=30)
+OUTBOX_RETENTION = timedelta(days=1)
+PURGE_BATCH_SIZE = 1000
+
+# sent and abandoned rows; kept for a day so failures can be looked into
+PURGE_BATCH_SQL = text(
+    """
+    DELETE FROM email_outbox
+    WHERE id IN (
+        SELECT id FROM email_outbox
+        WHERE next_attempt_at IS NULL AND created_at < :before
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+    """
+)
+
+
+class ConsoleTransport:
+    def send(self, message: EmailMessage) -> None:
+        print(f"[DEV EMAIL] To: {message['To']}\n{message.get_content()}")
+
+    def close(self) -> None:
+        pass
+
+
+class SmtpTransport:
+    """Keeps one SMTP connection open across batches and reconnects when it drops."""
+
+    def __init__(self, host: str, port: int, username: str | None = None, password: str | None = None,
+                 starttls: bool = False, timeout: float = 10):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self._smtp: smtplib.SMTP | None = None
+
+    def _connect(self) -> smtplib.SMTP:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            smtp.starttls()
+        if self.username:
+            smtp.login(self.username, self.password or "")
+        return smtp
+
+    def send(self, message: EmailMessage) -> None:
+        if self._smtp is None:
+            self._smtp = self._connect()
+        try:
+            self._smtp.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            # idle connections get dropped by the server; retry once on a fresh one
+            self._smtp = self._connect()
+            self._smtp.send_message(message)
+
+    def close(self) -> None:
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except smtplib.SMTPException:
+                pass
+            self._smtp = None
+
+
+def build_transport():
+    if settings.EMAIL_BACKEND == "smtp":
+        return SmtpTransport(
+            settings.SMTP_HOST,
+            settings.SMTP_PORT,
+            username=settings.SMTP_USERNAME,
+            password=settings.SMTP_PASSWORD,
+            starttls=settings.SMTP_STARTTLS,
+        )
+    return ConsoleTransport()
+
+def backoff(attempts: int) -> timedelta:
+    return timedelta(seconds=min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX))
+
+def to_message(email: OutboxEmail) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = settings.EMAIL_FROM
+    message["To"] = email.to_email
+    message["Subject"] = email.subject
+    message.set_content(email.body)
+    return message
+
+def _claim(session_factory: Callable[[], Session], batch_size: int) -> list[OutboxEmail]:
+    now = datetime.now()
+    due = (
+        select(OutboxEmail.id)
+        .where(OutboxEmail.next_attempt_at <= now)
+        .order_by(OutboxEmail.next_attempt_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    with session_factory() as session:
+        emails = session.exec(
+            update(OutboxEmail)
+            .where(OutboxEmail.id.in_(due))
+            .values(attempts=OutboxEmail.attempts + 1, next_attempt_at=now + CLAIM_TIMEOUT * batch_size)
+            .returning(OutboxEmail)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        # detach before the commit expires them
+        session.expunge_all()
+        session.commit()
+    return sorted(emails, key=lambda email: email.id)
+
+def _record(session_factory: Callable[[], Session], email_id: int, **values) -> None:
+    with session_factory() as session:
+        session.exec(update(OutboxEmail).where(OutboxEmail.id == email_id).values(**values))
+        session.commit()
+
+def deliver_batch(
+    session_factory: Callable[[], Session],
+    transport,
+    batch_size: int | None = None,
+    max_attempts: int | None = None,
+) -> int:
+    """Send one batch of due emails. Returns how many rows were claimed."""
+    batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+    max_attempts = max_attempts or settings.EMAIL_OUTBOX_MAX_ATTEMPTS
+    emails = _claim(session_factory, batch_size)
+    for email in emails:
+        try:
+            transport.send(to_message(email))
+        except Exception as exc:
+            values = {"last_error": str(exc)[:500]}
+            if email.attempts >= max_attempts:
+                values.update(next_attempt_at=None, body="")
+                logger.error("giving up on outbox email %s after %d attempts: %s", email.id, email.attempts, exc)
+            else:
+                values["next_attempt_at"] = datetime.now() + backoff(email.attempts)
+                logger.warning("outbox email %s failed, retrying: %s", email.id, exc)
+            if not isinstance(exc, (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused)):
+                # the connection is in an unknown state; start the next send on a fresh one
+                transport.close()
+        else:
+            values = {"sent_at": datetime.now(), "next_attempt_at": None, "last_error": None, "body": ""}
+        _record(session_factory, email.id, **values)
+    return len(emails)
+
+def purge_outbox(session_factory: Callable[[], Session], batch_size: int = PURGE_BATCH_SIZE) -> int:
+    """Delete sent and abandoned emails older than OUTBOX_RETENTION. Returns the number of rows deleted."""
+    purged = 0
+    while True:
+        with session_factory() as session:
+            params = {"before": datetime.now() - OUTBOX_RETENTION, "batch_size": batch_size}
+            deleted = session.exec(PURGE_BATCH_SQL, params=params).rowcount
+            session.commit()
+        purged += deleted
+        if deleted < batch_size:
+            return purged
+
+
+class OutboxWorker(threading.Thread):
+    """Drains the outbox, back to back while batches come back full, else every poll_interval seconds."""
+
+    def __init__(self, session_factory: Callable[[], Session], transport, poll_interval: float,
+                 batch_size: int | None = None):
+        super().__init__(name="email-outbox", daemon=True)
+        self.session_factory = session_factory
+        self.transport = transport
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        try:
+            while not self._stopped.is_set():
+                try:
+                    claimed = deliver_batch(self.session_factory, self.transport, batch_size=self.batch_size)
+                except Exception:
+                    logger.exception("email outbox delivery failed")
+                    claimed = 0
+                if claimed < self.batch_size:
+                    self._stopped.wait(self.poll_interval)
+        finally:
+            self.transport.close()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+
+if __name__ == "__main__":
+    from src.db import get_session_factory
+
+    parser = argparse.ArgumentParser(description="Deliver queued emails")
+    parser.add_argument("--once", action="store_true", help="send one batch and exit")
+    parser.add_argument("--purge", action="store_true", help="delete old sent and abandoned emails and exit")
+    parser.add_argument("--batch-size", type=int, default=settings.EMAIL_OUTBOX_BATCH_SIZE)
+    parser.add_argument("--poll-interval", type=float, default=settings.EMAIL_OUTBOX_POLL_INTERVAL)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.purge:
+        print(f"Purged {purge_outbox(get_session_factory())} email(s).")
+        raise SystemExit
+    transport = build_transport()
+    if args.once:
+        try:
+            print(f"Claimed {deliver_batch(get_session_factory(), transport, batch_size=args.batch_size)} email(s).")
+        finally:
+            transport.close()
+    else:
+        worker = OutboxWorker(get_session_factory(), transport, args.poll_interval, batch_size=args.batch_size)
+        worker.start()
+        try:
+            worker.join()
+        except KeyboardInterrupt:
+            worker.stop()
+            worker.join()
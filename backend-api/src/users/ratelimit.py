@@ -0,0 +1,171 @@
+"""
+Sliding-window rate limits for the auth endpoints, keyed by client IP and by
+the email in the request body. Applied as route dependencies, which FastAPI
+resolves before the endpoint's session is used, so a rejected request costs
+no database query and no bcrypt work.
+
+Each key keeps two fixed-window counters; the previous window is weighted by
+how much of it still overlaps the sliding window. That is O(1) time and
+memory per key, and maps onto plain INCR/GET in Redis.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import NamedTuple
+from fastapi import HTTPException, Request, status
+
+from src import settings
+
+RATE_LIMITED_ERR = {
+    "code": "RATE_LIMITED",
+    "message": "Too many requests, try again later.",
+}
+
+
+class Limit(NamedTuple):
+    requests: int
+    window: float
+
+
+def retry_after(previous: int, current: int, limit: Limit, elapsed: float) -> float:
+    """Seconds until one more request fits, or 0 if it fits now."""
+    weight = 1 - elapsed / limit.window
+    if previous * weight + current + 1 <= limit.requests:
+        return 0.0
+    if current + 1 > limit.requests:
+        # wait for the next window, then for this one to slide out far enough
+        overlap = 1 - (limit.requests - 1) / current if current else 0.0
+        return limit.window - elapsed + max(overlap, 0.0) * limit.window
+    needed = 1 - (limit.requests - 1 - current) / previous
+    return max(needed * limit.window - elapsed, 0.0)
+
+
+class MemoryBackend:
+    """Per-worker counters in a bounded LRU; with N workers the effective limit is up to N times higher."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict[str, list] = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def hit(self, key: str, limit: Limit) -> float:
+        now = time.time()
+        window = int(now // limit.window)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < window - 1:
+                entry = [window, 0, 0]
+            elif entry[0] == window - 1:
+                entry = [window, entry[2], 0]
+            wait = retry_after(entry[1], entry[2], limit, now - window * limit.window)
+            if not wait:
+                entry[2] += 1
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return wait
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class RedisBackend:
+    """Counters shared by every worker."""
+
+    def __init__(self, url: str, client=None):
+        if client is None:
+            import redis.asyncio
+            client = redis.asyncio.Redis.from_url(url)
+        self._client = client
+
+    async def hit(self, key: str, limit: Limit) -> float:
+        now = time.time()
+        window = int(now // limit.window)
+        current_key = f"ratelimit:{key}:{window}"
+        # count first and take it back if rejected: INCR is atomic, a GET then INCR is not
+        pipeline = self._client.pipeline(transaction=False)
+        pipeline.incr(current_key)
+        pipeline.expire(current_key, math.ceil(limit.window * 2))
+        pipeline.get(f"ratelimit:{key}:{window - 1}")
+        current, _, previous = await pipeline.execute()
+        wait = retry_after(int(previous or 0), current - 1, limit, now - window * limit.window)
+        if wait:
+            await self._client.decr(current_key)
+        return wait
+
+    def clear(self) -> None:
+        pass
+
+
+class RateLimiter:
+    def __init__(self, backend: MemoryBackend | RedisBackend | None):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._rejected: dict[str, int] = defaultdict(int)
+
+    async def check(self, name: str, keys: list[tuple[str, Limit]]) -> None:
+        if self.backend is None:
+            return
+        wait = 0.0
+        for key, limit in keys:
+            wait = max(wait, await self.backend.hit(f"{name}:{key}", limit))
+        if wait:
+            with self._lock:
+                self._rejected[name] += 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=RATE_LIMITED_ERR,
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+
+    def clear(self) -> None:
+        if self.backend is not None:
+            self.backend.clear()
+        with self._lock:
+            self._rejected.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": type(self.backend).__name__ if self.backend is not None else None,
+                "rejected": dict(self._rejected),
+            }
+
+
+def build_backend(name: str):
+    if name == "memory":
+        return MemoryBackend(maxsize=settings.RATE_LIMIT_SIZE)
+    if name == "redis":
+        return RedisBackend(settings.RATE_LIMIT_URL)
+    return None
+
+# create_app installs the RATE_LIMIT_BACKEND backend; disabled until then
+rate_limiter = RateLimiter(None)
+
+
+async def _body_email(request: Request) -> str | None:
+    # FastAPI has already read and parsed the body; request.json() returns the cached copy
+    try:
+        body = await request.json()
+    except ValueError:
+        return None
+    email = body.get("email") if isinstance(body, dict) else None
+    return email.strip().lower() if isinstance(email, str) else None
+
+def rate_limit(name: str, per_ip: Limit | None = None, per_email: Limit | None = None):
+    async def dependency(request: Request) -> None:
+        keys = []
+        if per_ip is not None and request.client is not None:
+            keys.append((f"ip:{request.client.host}", per_ip))
+        if per_email is not None and (email := await _body_email(request)) is not None:
+            keys.append((f"email:{email}", per_email))
+        await rate_limiter.check(name, keys)
+    return dependency
+
+login_rate_limit = rate_limit("login", per_ip=Limit(30, 60), per_email=Limit(10, 300))
+register_rate_limit = rate_limit("register", per_ip=Limit(10, 3600))
+forgot_password_rate_limit = rate_limit("forgot-password", per_ip=Limit(10, 3600), per_email=Limit(3, 3600))
+reset_password_rate_limit = rate_limit("reset-password", per_ip=Limit(20, 3600))
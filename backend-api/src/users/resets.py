@@ -0,0 +1,152 @@
+import argparse
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Callable
+from sqlalchemy import text, update
+from sqlmodel import Session
+
+from src.metrics import PASSWORD_RESETS_BYTES, PASSWORD_RESETS_PURGED, PASSWORD_RESETS_ROWS
+from src.models import PasswordReset
+from src.users.outbox import purge_outbox
+
+logger = logging.getLogger(__name__)
+
+PURGE_BATCH_SIZE = 1000
+
+# each batch is its own short transaction; SKIP LOCKED keeps concurrent purges
+# (one per worker) and in-flight resets from ever waiting on each other
+PURGE_BATCH_SQL = text(
+    """
+    DELETE FROM password_resets
+    WHERE id IN (
+        SELECT id FROM password_resets
+        WHERE used OR expires_at < :now
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+    """
+)
+TABLE_STATS_SQL = text(
+    """
+    SELECT pg_total_relation_size('password_resets'), reltuples::bigint
+    FROM pg_class WHERE oid = 'password_resets'::regclass
+    """
+)
+
+
+class PurgeStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.purged = 0
+        self.last_purged = 0
+        self.last_duration = 0.0
+        self.last_run_at: datetime | None = None
+
+    def record(self, purged: int, duration: float) -> None:
+        with self._lock:
+            self.runs += 1
+            self.purged += purged
+            self.last_purged = purged
+            self.last_duration = duration
+            self.last_run_at = datetime.now()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "runs": self.runs,
+                "purged": self.purged,
+                "last_purged": self.last_purged,
+                "last_duration": self.last_duration,
+                "last_rows_per_second": self.last_purged / self.last_duration if self.last_duration else 0.0,
+                "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            }
+
+purge_stats = PurgeStats()
+
+
+def outstanding_resets_update(user_id: int):
+    """Marks every unused reset of the user as used; run before issuing a new one."""
+    return (
+        update(PasswordReset)
+        .where(PasswordReset.user_id == user_id, PasswordReset.used == False)
+        .values(used=True)
+    )
+
+def purge_password_resets(
+    session_factory: Callable[[], Session],
+    batch_size: int = PURGE_BATCH_SIZE,
+    pause: float = 0.0,
+) -> int:
+    """Delete used and expired resets in batches. Returns the number of rows deleted."""
+    started = time.perf_counter()
+    purged = 0
+    while True:
+        with session_factory() as session:
+            deleted = session.exec(PURGE_BATCH_SQL, params={"now": datetime.now(), "batch_size": batch_size}).rowcount
+            session.commit()
+        purged += deleted
+        if deleted < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    purge_stats.record(purged, time.perf_counter() - started)
+    PASSWORD_RESETS_PURGED.inc(purged)
+    with session_factory() as session:
+        stats = table_stats(session)
+    PASSWORD_RESETS_ROWS.set(stats["estimated_rows"])
+    PASSWORD_RESETS_BYTES.set(stats["table_bytes"])
+    return purged
+
+def table_stats(session: Session) -> dict:
+    # planner estimates, so this stays cheap however large the table grows
+    size_bytes, estimated_rows = session.exec(TABLE_STATS_SQL).one()
+    # reltuples is -1 until the table is first vacuumed or analyzed
+    return {"table_bytes": size_bytes, "estimated_rows": max(estimated_rows, 0)}
+
+def password_reset_stats(session: Session) -> dict:
+    return {**table_stats(session), "purge": purge_stats.snapshot()}
+
+
+class PurgeScheduler(threading.Thread):
+    """Runs purge_password_resets and purge_outbox every interval seconds in the background."""
+
+    def __init__(self, session_factory: Callable[[], Session], interval: float):
+        super().__init__(name="password-reset-purge", daemon=True)
+        self.session_factory = session_factory
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            try:
+                purged = purge_password_resets(self.session_factory)
+                if purged:
+                    logger.info("purged %d password resets", purged)
+            except Exception:
+                logger.exception("password reset purge failed")
+            try:
+                purged = purge_outbox(self.session_factory)
+                if purged:
+                    logger.info("purged %d outbox emails", purged)
+            except Exception:
+                logger.exception("email outbox purge failed")
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+
+if __name__ == "__main__":
+    from src.db import engine
+
+    parser = argparse.ArgumentParser(description="Password reset maintenance")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    purge = subcommands.add_parser("purge", help="delete used and expired password resets")
+    purge.add_argument("--batch-size", type=int, default=PURGE_BATCH_SIZE)
+    purge.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+    args = parser.parse_args()
+
+    purged = purge_password_resets(lambda: Session(engine), batch_size=args.batch_size, pause=args.pause)
+    print(f"Purged {purged} password reset(s) in {purge_stats.last_duration:.2f}s.")
@@ -1,10 +1,12 @@
 from datetime import datetime 
 from typing import Annotated
 from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import Session, select
-from decouple import config as decouple_config
 
+from src import settings
 from src.db import get_session
+from src.replicas import get_read_session
 from src.users.helpers import (
     REFRESH_TOKEN_EXPIRE_MINUTE,
     SESSION_COOKIE_EXPIRE_MINUTE,
@@ -12,11 +14,10 @@ from src.users.helpers import (
     create_session_cookie,
     create_tokens, 
     get_current_user, 
-    hash_password,
     hash_reset_token, 
-    verify_password, 
     verify_token
 )
+from src.users.hasher import password_hasher
 from src.users.schemas import (
     TokenSchema, 
     UserCreateSchema, 
@@ -26,15 +27,22 @@ from src.users.schemas import (
     PasswordResetRequestSchema
 )
 from src.models import PasswordReset, User
+from src.users.cache import invalidate_user
 from src.users.csrf import create_csrf_token, csrf_protect
-from .email_sender import send_password_change_email 
+from src.users.ratelimit import (
+    forgot_password_rate_limit,
+    login_rate_limit,
+    register_rate_limit,
+    reset_password_rate_limit,
+)
+from src.users.resets import outstanding_resets_update
+from .email_sender import password_change_email
 
 router = APIRouter()
 
 REFRESH_TOKEN_NAME = 'refresh_token'
 CSRF_TOKEN_NAME = 'csrf_token'
 SESSION_COOKIE_NAME = "session"
-IS_PROD_MODE = decouple_config("IS_PROD_MODE", cast=bool, default=False)
 
 USER_NOT_FOUND_ERR = {"code": "NOT FOUND", "message": "User is not found."}
 USER_CONFLICT_ERR = {
@@ -67,7 +75,7 @@ def _set_refresh_cookie(response: Response, refresh_token: str) -> None:
         REFRESH_TOKEN_NAME,
         refresh_token,
         httponly=True,
-        secure=IS_PROD_MODE,
+        secure=settings.IS_PROD_MODE,
         samesite="lax",
         path="/api/users/refresh",
         max_age=REFRESH_TOKEN_EXPIRE_MINUTE * 60,
@@ -78,7 +86,7 @@ def _set_csrf_cookie(response: Response, csrf_token: str) -> None:
         CSRF_TOKEN_NAME,
         csrf_token,
         httponly=False,
-        secure=IS_PROD_MODE,
+        secure=settings.IS_PROD_MODE,
         samesite="lax",
         path="/",
     )
@@ -88,14 +96,30 @@ def _set_session_cookie(response: Response, session_jwt: str) -> None:
         SESSION_COOKIE_NAME,
         session_jwt,
         httponly=True,
-        secure=IS_PROD_MODE,
+        secure=settings.IS_PROD_MODE,
         samesite="lax",
         path="/",
         max_age=SESSION_COOKIE_EXPIRE_MINUTE * 60,
     )
 
+def _issue_tokens(response: Response, user: User) -> TokenSchema:
+    claims = {"sub": user.email, "uid": user.id}
+    access_token, refresh_token = create_tokens(data=claims)
+    csrf_token = create_csrf_token()
+    session_cookie = create_session_cookie(data=claims)
+    _set_refresh_cookie(response, refresh_token)
+    _set_csrf_cookie(response, csrf_token)
+    _set_session_cookie(response, session_cookie)
+    return TokenSchema(access_token=access_token)
+
+def _reset_email(request: Request, email: str, raw_token: str):
+    # delivered by the outbox worker (src/users/outbox.py), never inside the request
+    base = request.headers.get("origin", "http://localhost:3000")
+    url = f"{base}/reset-password?token={raw_token}"
+    return password_change_email(email, url)
+
 @router.get("/", response_model=list[UserReadSchema])
-def get_users(session: Session=Depends(get_session)):
+def get_users(session: Session=Depends(get_read_session)):
     users = session.exec(select(User)).all()
     return users
 
@@ -115,37 +139,53 @@ def delete_user(user_id:int, session: Session=Depends(get_session)):
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=USER_NOT_FOUND_ERR)
     session.delete(user)
+    invalidate_user(session, user.id)
     session.commit()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
-@router.post("/register", response_model=UserReadSchema)
-def register_user(payload: UserCreateSchema, session: Session = Depends(get_session)):
-    existing_user = session.exec(select(User).where(User.email == payload.email)).first()
-    if existing_user:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=USER_CONFLICT_ERR)
-    user = User(email=payload.email, hashed_password=hash_password(payload.password))
+# the auth routes are async so a request waiting on bcrypt holds no threadpool
+# slot; their queries run in the threadpool between the awaits
+
+def _user_by_email(session: Session, email: str) -> User | None:
+    return session.exec(select(User).where(User.email == email)).first()
+
+def _create_user(session: Session, user: User) -> User:
     session.add(user)
     session.commit()
     session.refresh(user)
     return user
 
-@router.post("/login", response_model=TokenSchema)
-def login_user(
+def _save_password(session: Session, user: User, *others) -> None:
+    session.add_all([user, *others])
+    invalidate_user(session, user.id)
+    session.commit()
+
+@router.post("/register", response_model=UserReadSchema, dependencies=[Depends(register_rate_limit)])
+async def register_user(payload: UserCreateSchema, session: Session = Depends(get_session)):
+    existing_user = await run_in_threadpool(_user_by_email, session, payload.email)
+    if existing_user:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=USER_CONFLICT_ERR)
+    hashed_password = await password_hasher.hash(payload.password)
+    user = User(email=payload.email, hashed_password=hashed_password)
+    return await run_in_threadpool(_create_user, session, user)
+
+@router.post("/login", response_model=TokenSchema, dependencies=[Depends(login_rate_limit)])
+async def login_user(
         payload: UserInSchema,
         response: Response,
         session: Session = Depends(get_session),
     ):
-    user = session.exec(select(User).where(User.email == payload.email)).first()
-    if not user or not verify_password(payload.password, user.hashed_password):
+    user = await run_in_threadpool(_user_by_email, session, payload.email)
+    if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=USER_UNAUTH_ERR)
-    access_token, refresh_token = create_tokens(data={"sub": user.email})
-    csrf_token = create_csrf_token()
-    session_cookie = create_session_cookie(data={"sub": user.email}) 
-    _set_refresh_cookie(response, refresh_token)
-    _set_csrf_cookie(response, csrf_token)
-    _set_session_cookie(response, session_cookie)
-    return TokenSchema(access_token=access_token)
+    valid, new_hash = await password_hasher.verify_and_update(payload.password, user.hashed_password)
+    if not valid:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=USER_UNAUTH_ERR)
+    if new_hash:
+        user.hashed_password = new_hash
+        await run_in_threadpool(_save_password, session, user)
+    return _issue_tokens(response, user)
 
 @router.post("/refresh", response_model=TokenSchema, dependencies=[Depends(csrf_protect)])
 def refresh_tokens(
@@ -166,13 +206,7 @@ def refresh_tokens(
         user = session.exec(select(User).where(User.email == email)).first()
         if not user:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=USER_NOT_FOUND_ERR)
-        access_token, new_refresh_token = create_tokens(data={"sub": user.email})
-        csrf_token = create_csrf_token()
-        session_cookie = create_session_cookie(data={"sub": user.email}) 
-        _set_refresh_cookie(response, new_refresh_token)
-        _set_csrf_cookie(response, csrf_token)
-        _set_session_cookie(response, session_cookie)
-        return TokenSchema(access_token=access_token)
+        return _issue_tokens(response, user)
     except HTTPException:
         raise
     except Exception:
@@ -187,27 +221,27 @@ def logout_user(response:Response):
     response.delete_cookie(
         REFRESH_TOKEN_NAME,
         httponly=True,
-        secure=IS_PROD_MODE,
+        secure=settings.IS_PROD_MODE,
         samesite='lax',
         path="/api/users/refresh",
     )
     response.delete_cookie(
         CSRF_TOKEN_NAME,
         httponly=False,
-        secure=IS_PROD_MODE,
+        secure=settings.IS_PROD_MODE,
         samesite="lax",
         path="/"
     )
     response.delete_cookie(
         SESSION_COOKIE_NAME, 
         httponly=True, 
-        secure=IS_PROD_MODE, 
+        secure=settings.IS_PROD_MODE, 
         samesite="lax", 
         path="/", 
     )
     return
 
-@router.post("/forgot-password")
+@router.post("/forgot-password", dependencies=[Depends(forgot_password_rate_limit)])
 def forgot_password(
     payload: ForgotPasswordRequestSchema,
     request: Request,
@@ -217,44 +251,44 @@ def forgot_password(
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=USER_NOT_FOUND_ERR)
     raw_token = create_raw_token()
+    session.exec(outstanding_resets_update(user.id))
     reset_ps = PasswordReset(
         user_id=user.id,
         hashed_token=hash_reset_token(raw_token),
     )
-    session.add(reset_ps)
+    session.add_all([reset_ps, _reset_email(request, user.email, raw_token)])
     session.commit()
 
-    base = request.headers.get("origin", "http://localhost:3000")
-    url = f"{base}/reset-password?token={raw_token}"
-    send_password_change_email(user.email, url)  
-
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
-@router.post("/reset-password", response_model=TokenSchema)
-def reset_password(
-    payload: PasswordResetRequestSchema,
-    session: Session = Depends(get_session)
-):
-    hashed_token = hash_reset_token(payload.token)
-    new_ps = session.exec(
+def _valid_reset(session: Session, token: str) -> tuple[PasswordReset | None, User | None]:
+    reset = session.exec(
         select(PasswordReset).where(
-            (PasswordReset.hashed_token == hashed_token) &
+            (PasswordReset.hashed_token == hash_reset_token(token)) &
             (PasswordReset.used == False) &
             (PasswordReset.expires_at > datetime.now())
         )
     ).first()
+    if not reset:
+        return None, None
+    return reset, session.get(User, reset.user_id)
+
+@router.post("/reset-password", response_model=TokenSchema, dependencies=[Depends(reset_password_rate_limit)])
+async def reset_password(
+    payload: PasswordResetRequestSchema,
+    session: Session = Depends(get_session)
+):
+    new_ps, user = await run_in_threadpool(_valid_reset, session, payload.token)
     if not new_ps:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=PASSWORD_RESET_ERR
         )
-    user = session.get(User, new_ps.user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=USER_NOT_FOUND_ERR)
     
-    user.hashed_password = hash_password(payload.new_password)
+    user.hashed_password = await password_hasher.hash(payload.new_password)
     new_ps.used = True
-    session.add_all([user, new_ps])
-    session.commit()
+    await run_in_threadpool(_save_password, session, user, new_ps)
 
-    return Response(status_code=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -4,10 +4,13 @@ from fastapi.testclient import TestClient
 from sqlmodel import Session, SQLModel, create_engine
 from decouple import config as decouple_config
 
-from src.db import get_session as real_get_session
+from src import settings
+from src.db import get_session as real_get_session, get_session_factory
 from src.main import app
 from src.models import User, Task
+from src.users.cache import user_cache
 from src.users.helpers import create_access_token, hash_password
+from src.users.ratelimit import rate_limiter
 
 
 TEST_DATABASE_URL = decouple_config("TEST_DATABASE_URL")
@@ -45,13 +48,18 @@ def db_session(engine):
         connection.close()
 
 @pytest.fixture
-def client(db_session):
+def client(db_session, monkeypatch):
+    # the lifespan's outbox worker would poll DATABASE_URL, not the test database
+    monkeypatch.setattr(settings, "EMAIL_OUTBOX_WORKER", False)
     def _override_get_session():
         yield db_session
     app.dependency_overrides[real_get_session] = _override_get_session
+    app.dependency_overrides[get_session_factory] = lambda: (lambda: Session(bind=db_session.connection()))
     with TestClient(app) as c:
         yield c
     app.dependency_overrides.clear()
+    user_cache.clear()
+    rate_limiter.clear()
 
 @pytest.fixture
 def test_user(db_session):
@@ -78,7 +86,7 @@ def test_task(db_session, test_user):
 
 @pytest.fixture
 def auth_headers(test_user):
-    access_token = create_access_token(data={"sub": test_user.email})
+    access_token = create_access_token(data={"sub": test_user.email, "uid": test_user.id})
     return {"Authorization": f"Bearer {access_token}"}
 
 @pytest.fixture
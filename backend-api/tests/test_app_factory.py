@@ -0,0 +1,37 @@
+import subprocess
+import sys
+import pytest
+from fastapi.testclient import TestClient
+
+from src import settings
+from src.db import dispose_engines
+from src.main import create_app
+
+
+def test_import_has_no_side_effects():
+    probe = (
+        "import src.main, src.db, src.settings, src.users.hasher; "
+        "assert not src.db._engines; "
+        "assert src.settings._current is None; "
+        "assert src.users.hasher.password_hasher._executor is None"
+    )
+    subprocess.run([sys.executable, "-c", probe], check=True)
+
+def test_create_app_rejects_incomplete_settings():
+    current = settings.get_settings()
+    with pytest.raises(RuntimeError, match="AUTHJWT_SECRET_KEY"):
+        create_app(current.replace(AUTHJWT_SECRET_KEY=None))
+    assert settings.get_settings() is current
+
+def test_create_app_uses_the_given_settings():
+    current = settings.get_settings()
+    try:
+        app = create_app(current.replace(USE_ASYNC_DB=True))
+        assert settings.USE_ASYNC_DB
+        modules = {getattr(route, "endpoint", None).__module__ for route in app.routes if hasattr(route, "endpoint")}
+        assert "src.tasks.async_routes" in modules
+        with TestClient(app) as client:
+            assert client.get("/health").json() == {"ok": True}
+    finally:
+        settings.configure(current)
+        dispose_engines()
@@ -0,0 +1,60 @@
+import asyncio
+import httpx
+from fastapi import FastAPI, status
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.db import get_async_session, to_async_url
+from src.tasks.async_routes import router as async_tasks_router
+from src.users.async_routes import router as async_users_router
+
+
+def _async_app():
+    app = FastAPI()
+    app.include_router(async_tasks_router, prefix="/api")
+    app.include_router(async_users_router, prefix="/api/users")
+    return app
+
+async def _async_task_flow(database_url):
+    engine = create_async_engine(to_async_url(database_url), poolclass=NullPool)
+    app = _async_app()
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+
+        async def _override_get_async_session():
+            async with AsyncSession(
+                bind=connection, join_transaction_mode="create_savepoint", expire_on_commit=False
+            ) as session:
+                yield session
+        app.dependency_overrides[get_async_session] = _override_get_async_session
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            credentials = {"email": "async@test.com", "password": "Async_1234"}
+            res = await client.post("/api/users/register", json=credentials)
+            assert res.status_code == status.HTTP_200_OK, res.text
+            res = await client.post("/api/users/login", json=credentials)
+            assert res.status_code == status.HTTP_200_OK, res.text
+            headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+            res = await client.post("/api/tasks", headers=headers, json={"title": "Async task"})
+            assert res.status_code == status.HTTP_200_OK, res.text
+            task_id = res.json()["id"]
+
+            res = await client.patch(f"/api/tasks/{task_id}", headers=headers, json={"is_completed": True})
+            assert res.json()["is_completed"] is True
+
+            res = await client.get("/api/tasks/user", headers=headers, params={"offset": 0})
+            data = res.json()
+            assert data["total"] == 1
+            assert [item["id"] for item in data["items"]] == [task_id]
+
+            res = await client.delete(f"/api/tasks/{task_id}", headers=headers)
+            assert res.status_code == status.HTTP_204_NO_CONTENT
+
+        await transaction.rollback()
+    await engine.dispose()
+
+def test_async_task_routes(database_url):
+    asyncio.run(_async_task_flow(database_url))
@@ -0,0 +1,77 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import anyio
+from anyio import to_thread
+from fastapi import HTTPException, status
+
+from src import settings
+from src.users.hasher import PasswordHasher, password_hasher
+
+
+def test_hasher_rejects_when_queue_is_full():
+    hasher = PasswordHasher(workers=1, max_queue=0, rounds=4)
+
+    async def burst():
+        return await asyncio.gather(
+            hasher.hash("first_1234"), hasher.hash("second_1234"), return_exceptions=True
+        )
+    try:
+        results = asyncio.run(burst())
+    finally:
+        hasher.shutdown()
+
+    rejected = [r for r in results if isinstance(r, HTTPException)]
+    assert len(rejected) == 1
+    assert rejected[0].status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert hasher.stats()["rejected"] == 1
+    assert hasher.stats()["completed"] == 1
+
+def test_login_rehashes_when_cost_changes(client, db_session, test_user, monkeypatch):
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 4)
+    res = client.post(
+        "/api/users/login",
+        json={"email": test_user.email, "password": "test_1234"},
+    )
+    assert res.status_code == status.HTTP_200_OK, res.text
+    db_session.refresh(test_user)
+    assert test_user.hashed_password.startswith("$2b$04$")
+
+def test_saturated_hasher_leaves_threads_for_other_routes(client, test_user, test_task, monkeypatch):
+    released = threading.Event()
+
+    async def queued_verify(password, hashed_password):
+        # a bcrypt job stuck behind a full queue
+        while not released.is_set():
+            await anyio.sleep(0.01)
+        return True, None
+
+    def shrink_threadpool(tokens):
+        limiter = to_thread.current_default_thread_limiter()
+        previous, limiter.total_tokens = limiter.total_tokens, tokens
+        return previous
+
+    monkeypatch.setattr(password_hasher, "verify_and_update", queued_verify)
+    previous = client.portal.call(shrink_threadpool, 2)
+    # unblocks the logins even if they starve the request under test
+    timer = threading.Timer(2, released.set)
+    timer.start()
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            logins = [
+                pool.submit(client.post, "/api/users/login", json={"email": test_user.email, "password": "test_1234"})
+                for _ in range(8)
+            ]
+            time.sleep(0.3)
+            started = time.perf_counter()
+            res = client.get(f"/api/tasks/{test_task.id}")
+            elapsed = time.perf_counter() - started
+            released.set()
+            assert all(login.result().status_code == status.HTTP_200_OK for login in logins)
+    finally:
+        timer.cancel()
+        released.set()
+        client.portal.call(shrink_threadpool, previous)
+    assert res.status_code == status.HTTP_200_OK
+    assert elapsed < 1
@@ -0,0 +1,74 @@
+import asyncio
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session
+
+from src import settings
+from src.db import to_async_url
+from src.metrics import POOL_CHECKOUT_WAIT, TimedAsyncQueuePool, instrument_engine
+from src.models import PasswordReset
+from src.users.resets import purge_password_resets
+
+
+@pytest.fixture(scope="module", autouse=True)
+def instrumented(engine):
+    # the app's engine is instrumented at import; tests run on their own
+    instrument_engine(engine, "test")
+
+def _sample(body: str, name: str, **labels) -> float:
+    wanted = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    for line in body.splitlines():
+        if line.startswith(f"{name}{{{wanted}}} "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+def test_metrics_record_latency_and_queries_per_route(client, auth_headers, test_task):
+    route = "/api/tasks/{task_id}"
+    before = client.get("/metrics").text
+    for _ in range(2):
+        assert client.get(f"/api/tasks/{test_task.id}", headers=auth_headers).status_code == 200
+    assert client.get("/api/tasks/0", headers=auth_headers).status_code == 404
+    after = client.get("/metrics").text
+
+    count = lambda body, status: _sample(body, "http_request_duration_seconds_count", method="GET", route=route, status=status)
+    assert count(after, "200") - count(before, "200") == 2
+    assert count(after, "404") - count(before, "404") == 1
+    queries = lambda body: _sample(body, "http_request_db_queries_sum", route=route)
+    assert queries(after) - queries(before) >= 3
+    assert 'route="/api/tasks/1"' not in after
+    assert "db_pool_checked_out" in after
+
+def test_async_pool_records_checkout_wait(database_url):
+    async_engine = create_async_engine(to_async_url(database_url), poolclass=TimedAsyncQueuePool)
+    before = POOL_CHECKOUT_WAIT.labels("async")._sum.get()
+
+    async def query():
+        async with async_engine.connect() as conn:
+            assert (await conn.execute(text("SELECT 1"))).scalar_one() == 1
+        await async_engine.dispose()
+
+    asyncio.run(query())
+    assert POOL_CHECKOUT_WAIT.labels("async")._sum.get() > before
+
+def test_health_details_need_the_token(client, monkeypatch):
+    assert client.get("/health").status_code == 200
+    assert client.get("/health/password-resets").status_code == 404
+
+    monkeypatch.setattr(settings, "HEALTH_DETAILS_TOKEN", "s3cret")
+    assert client.get("/health/user-cache").status_code == 401
+    assert client.get("/health/user-cache", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    res = client.get("/health/password-resets", headers={"Authorization": "Bearer s3cret"})
+    assert res.status_code == 200
+    assert set(res.json()) == {"table_bytes", "estimated_rows", "purge"}
+
+def test_purge_exports_password_reset_gauges(client, db_session, test_user):
+    purged = lambda body: next(float(line.split()[1]) for line in body.splitlines() if line.startswith("password_resets_purged_total "))
+    before = purged(client.get("/metrics").text)
+    db_session.add(PasswordReset(user_id=test_user.id, hashed_token="used", used=True))
+    db_session.commit()
+    purge_password_resets(lambda: Session(bind=db_session.connection()))
+
+    body = client.get("/metrics").text
+    assert purged(body) == before + 1
+    assert "password_resets_bytes " in body and "password_resets_rows " in body
@@ -0,0 +1,166 @@
+import smtplib
+import socket
+from datetime import datetime, timedelta
+import pytest
+from aiosmtpd.controller import Controller
+from sqlalchemy import event
+from sqlmodel import Session, select
+
+from src.models import OutboxEmail
+from src.users.outbox import OUTBOX_RETENTION, SmtpTransport, deliver_batch, purge_outbox
+
+
+class Inbox:
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        return "250 OK"
+
+
+@pytest.fixture
+def smtp_server():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    inbox = Inbox()
+    controller = Controller(inbox, hostname="127.0.0.1", port=port)
+    controller.start()
+    yield controller, inbox
+    controller.stop()
+
+@pytest.fixture
+def session_factory(db_session):
+    return lambda: Session(bind=db_session.connection())
+
+
+def test_forgot_password_is_delivered_by_the_outbox(client, db_session, session_factory, test_user, smtp_server):
+    controller, inbox = smtp_server
+    assert client.post("/api/users/forgot-password", json={"email": test_user.email}).status_code == 204
+    assert inbox.messages == []
+
+    transport = SmtpTransport(controller.hostname, controller.port)
+    try:
+        assert deliver_batch(session_factory, transport) == 1
+        assert deliver_batch(session_factory, transport) == 0
+    finally:
+        transport.close()
+
+    assert [message.rcpt_tos for message in inbox.messages] == [[test_user.email]]
+    assert b"/reset-password?token=" in inbox.messages[0].content
+    email = db_session.exec(select(OutboxEmail)).one()
+    assert email.sent_at is not None and email.next_attempt_at is None
+    assert email.body == ""
+
+
+class FailingTransport:
+    def send(self, message):
+        raise smtplib.SMTPServerDisconnected("connection refused")
+
+    def close(self):
+        pass
+
+def test_failed_delivery_backs_off_then_gives_up(db_session, session_factory):
+    db_session.add(OutboxEmail(to_email="someone@test.com", subject="hi", body="hello"))
+    db_session.commit()
+
+    assert deliver_batch(session_factory, FailingTransport(), max_attempts=2) == 1
+    email = db_session.exec(select(OutboxEmail)).one()
+    assert email.attempts == 1 and email.next_attempt_at > datetime.now()
+    assert deliver_batch(session_factory, FailingTransport(), max_attempts=2) == 0
+
+    email.next_attempt_at = datetime.now()
+    db_session.add(email)
+    db_session.commit()
+    assert deliver_batch(session_factory, FailingTransport(), max_attempts=2) == 1
+    db_session.refresh(email)
+    assert email.attempts == 2 and email.next_attempt_at is None and email.sent_at is None
+    assert email.last_error == "connection refused"
+    assert email.body == ""
+
+
+def test_purge_outbox_deletes_old_finished_emails(db_session, session_factory):
+    old = datetime.now() - OUTBOX_RETENTION - timedelta(minutes=1)
+    emails = [
+        OutboxEmail(to_email="sent@test.com", subject="hi", body="", sent_at=old, created_at=old),
+        OutboxEmail(to_email="abandoned@test.com", subject="hi", body="", created_at=old),
+        OutboxEmail(to_email="recent@test.com", subject="hi", body="", sent_at=datetime.now()),
+        OutboxEmail(to_email="pending@test.com", subject="hi", body="hello", next_attempt_at=old, created_at=old),
+    ]
+    db_session.add_all(emails)
+    db_session.commit()
+    # an explicit None on insert falls back to the column default
+    for email in emails[:3]:
+        email.next_attempt_at = None
+    db_session.add_all(emails)
+    db_session.commit()
+
+    assert purge_outbox(session_factory, batch_size=1) == 2
+    remaining = db_session.exec(select(OutboxEmail.to_email).order_by(OutboxEmail.to_email)).all()
+    assert remaining == ["pending@test.com", "recent@test.com"]
+
+
+def test_a_batch_is_claimed_in_one_statement(db_session, session_factory):
+    db_session.add_all([OutboxEmail(to_email=f"user{index}@test.com", subject="hi", body="hello") for index in range(3)])
+    db_session.commit()
+    statements = []
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    connection = db_session.connection()
+    event.listen(connection, "before_cursor_execute", capture)
+    try:
+        assert deliver_batch(session_factory, FlakyTransport("", OSError())) == 3
+    finally:
+        event.remove(connection, "before_cursor_execute", capture)
+    assert len([statement for statement in statements if "FOR UPDATE SKIP LOCKED" in statement]) == 1
+    # one claim plus one outcome per email
+    assert len([statement for statement in statements if statement.startswith("UPDATE email_outbox")]) == 4
+
+
+class FlakyTransport:
+    def __init__(self, error_for: str, error: BaseException):
+        self.error_for = error_for
+        self.error = error
+        self.sent = []
+
+    def send(self, message):
+        if message["To"] == self.error_for:
+            raise self.error
+        self.sent.append(message["To"])
+
+    def close(self):
+        pass
+
+def test_an_unexpected_error_only_fails_its_own_email(db_session, session_factory):
+    db_session.add_all([
+        OutboxEmail(to_email=f"user{index}@test.com", subject="hi", body="hello",
+                    next_attempt_at=datetime.now() - timedelta(minutes=3 - index))
+        for index in range(3)
+    ])
+    db_session.commit()
+
+    transport = FlakyTransport("user1@test.com", UnicodeEncodeError("ascii", "é", 0, 1, "bad address"))
+    assert deliver_batch(session_factory, transport) == 3
+    assert transport.sent == ["user0@test.com", "user2@test.com"]
+    failed = db_session.exec(select(OutboxEmail).where(OutboxEmail.to_email == "user1@test.com")).one()
+    db_session.refresh(failed)
+    assert failed.attempts == 1 and failed.sent_at is None and "bad address" in failed.last_error
+
+def test_sends_before_a_crash_stay_recorded(db_session, session_factory):
+    db_session.add_all([
+        OutboxEmail(to_email="first@test.com", subject="hi", body="hello", next_attempt_at=datetime.now() - timedelta(minutes=1)),
+        OutboxEmail(to_email="second@test.com", subject="hi", body="hello"),
+    ])
+    db_session.commit()
+
+    with pytest.raises(KeyboardInterrupt):
+        deliver_batch(session_factory, FlakyTransport("second@test.com", KeyboardInterrupt()))
+    first, second = db_session.exec(select(OutboxEmail).order_by(OutboxEmail.id)).all()
+    db_session.refresh(first)
+    db_session.refresh(second)
+    assert first.sent_at is not None and first.body == ""
+    # counted and leased, so it is retried later and cannot crash the worker forever
+    assert second.attempts == 1 and second.next_attempt_at > datetime.now()
+    assert deliver_batch(session_factory, FlakyTransport("", OSError())) == 0
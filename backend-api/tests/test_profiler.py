@@ -0,0 +1,64 @@
+import logging
+import pytest
+from sqlalchemy import text
+from sqlmodel import select
+
+from src import settings
+from src.models import Task, User
+from src.profiler import fingerprint, profile, profile_engine
+
+
+@pytest.fixture(scope="module", autouse=True)
+def profiled(engine):
+    # the app's engines are profiled at import; tests run on their own
+    profile_engine(engine)
+
+def test_fingerprint_ignores_literals_and_parameters():
+    assert fingerprint("SELECT * FROM tasks\n WHERE id = %(id_1)s AND title = 'a''b' LIMIT 10") == \
+        fingerprint("SELECT * FROM tasks WHERE id = %(id_1)s AND title = 'x' LIMIT 20")
+    assert fingerprint("SELECT 1 WHERE id IN (1, 2, 3)") == fingerprint("SELECT 1 WHERE id IN (4, 5)")
+    assert "::bigint" in fingerprint("SELECT reltuples::bigint")
+
+def test_lazy_loads_in_a_loop_are_reported_as_n_plus_one(db_session, caplog, monkeypatch):
+    monkeypatch.setattr(settings, "SQL_N_PLUS_ONE_THRESHOLD", 5)
+    users = [User(email=f"profiled{i}@test.com", hashed_password="x") for i in range(5)]
+    db_session.add_all(users)
+    db_session.flush()
+    db_session.add_all(Task(title="t", user_id=user.id) for user in users)
+    db_session.commit()
+    db_session.expire_all()
+
+    with caplog.at_level(logging.INFO, logger="src.profiler"), profile("test") as current:
+        for user in db_session.exec(select(User).where(User.email.like("profiled%"))).all():
+            assert len(user.tasks) == 1
+
+    [repeat] = current.repeated(5)
+    assert repeat["count"] == 5 and "FROM tasks" in repeat["statement"]
+    assert any("possible N+1 in test" in record.message for record in caplog.records)
+
+def test_slow_queries_are_logged_with_a_plan(db_session, caplog, monkeypatch):
+    monkeypatch.setattr(settings, "SQL_SLOW_QUERY_MS", 5)
+    with caplog.at_level(logging.WARNING, logger="src.profiler.slow"):
+        db_session.exec(text("SELECT pg_sleep(0.01) WHERE :n > -1"), params={"n": 1})
+    [record] = [record for record in caplog.records if record.name == "src.profiler.slow"]
+    assert '"Plan"' not in record.message
+    caplog.clear()
+
+    monkeypatch.setattr(settings, "SQL_SLOW_QUERY_EXPLAIN", True)
+    with caplog.at_level(logging.WARNING, logger="src.profiler.slow"):
+        db_session.exec(text("SELECT pg_sleep(0.01) WHERE :n > 0"), params={"n": 1})
+        db_session.exec(text("SELECT pg_sleep(0.01) WHERE :n > 0"), params={"n": 2})
+
+    records = [record.message for record in caplog.records if record.name == "src.profiler.slow"]
+    assert len(records) == 2
+    # one EXPLAIN ANALYZE per fingerprint and interval
+    assert '"Plan"' in records[0] and '"plan"' not in records[1]
+    assert db_session.exec(text("SELECT 1")).scalar_one() == 1
+
+def test_profile_header_profiles_the_request(client, auth_headers, test_task, caplog, monkeypatch):
+    monkeypatch.setattr(settings, "SQL_PROFILE_HEADER", True)
+    with caplog.at_level(logging.INFO, logger="src.profiler"):
+        client.get(f"/api/tasks/{test_task.id}", headers=auth_headers)
+        assert not any("sql profile" in record.message for record in caplog.records)
+        client.get(f"/api/tasks/{test_task.id}", headers={**auth_headers, "X-Profile-SQL": "1"})
+    assert any(f"sql profile" in record.message and f"/api/tasks/{test_task.id}" in record.message for record in caplog.records)
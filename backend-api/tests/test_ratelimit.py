@@ -0,0 +1,60 @@
+import asyncio
+
+import fakeredis
+import pytest
+from sqlalchemy import event
+
+from src.users.ratelimit import Limit, MemoryBackend, RedisBackend, rate_limiter, retry_after
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request):
+    if request.param == "memory":
+        return MemoryBackend(maxsize=100)
+    return RedisBackend("redis://stand-in", client=fakeredis.FakeAsyncRedis())
+
+def test_backend_allows_up_to_the_limit(backend):
+    limit = Limit(3, 60)
+    waits = asyncio.run(_hits(backend, "login:ip:1.2.3.4", limit, 5))
+    assert waits[:3] == [0, 0, 0]
+    assert all(0 < wait <= 120 for wait in waits[3:])
+    # keys are independent
+    assert asyncio.run(_hits(backend, "login:ip:5.6.7.8", limit, 1)) == [0]
+
+async def _hits(backend, key, limit, count):
+    return [await backend.hit(key, limit) for _ in range(count)]
+
+def test_memory_backend_is_bounded():
+    backend = MemoryBackend(maxsize=2)
+    asyncio.run(_hits(backend, "a", Limit(1, 60), 1))
+    asyncio.run(_hits(backend, "b", Limit(1, 60), 1))
+    asyncio.run(_hits(backend, "c", Limit(1, 60), 1))
+    assert len(backend._data) == 2
+    assert asyncio.run(_hits(backend, "a", Limit(1, 60), 1)) == [0]
+
+def test_retry_after_weights_the_previous_window():
+    limit = Limit(10, 60)
+    assert retry_after(previous=10, current=0, limit=limit, elapsed=30) == 0
+    # 10 * (1 - 6/60) = 9 still in the window: one more fits only once 12 s have passed
+    assert retry_after(previous=10, current=1, limit=limit, elapsed=6) == pytest.approx(6)
+    assert retry_after(previous=0, current=10, limit=limit, elapsed=20) == pytest.approx(40 + 6)
+
+
+def test_login_is_rejected_before_touching_the_database(client, db_session, test_user):
+    payload = {"email": test_user.email.upper(), "password": "wrong"}
+    for _ in range(10):
+        assert client.post("/api/users/login", json=payload).status_code == 401
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db_session.connection(), "before_cursor_execute", listener)
+    try:
+        res = client.post("/api/users/login", json={"email": test_user.email, "password": "test_1234"})
+    finally:
+        event.remove(db_session.connection(), "before_cursor_execute", listener)
+
+    assert res.status_code == 429, res.text
+    assert int(res.headers["retry-after"]) > 0
+    assert res.json()["errors"]["code"] == "RATE_LIMITED"
+    assert statements == []
+    assert rate_limiter.stats()["rejected"] == {"login": 1}
@@ -0,0 +1,90 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from src import settings
+from src.db import dispose_engines, get_session, get_session_factory
+from src.main import create_app
+from src.replicas import PRIMARY_COOKIE, get_replica_set, reset_replica_set
+from src.tasks.response_cache import MemoryBackend, response_cache
+
+# the test database doubles as the replicas: a separate connection cannot see
+# the rows of the test's open transaction, like a replica that has not caught up
+
+
+@pytest.fixture
+def replica_set(monkeypatch, database_url):
+    monkeypatch.setattr(settings, "DATABASE_REPLICA_URLS", f"{database_url},{database_url}")
+    reset_replica_set()
+    replica_set = get_replica_set()
+    replica_set.check()
+    yield replica_set
+    reset_replica_set()
+
+@pytest.fixture
+def replica_client(db_session, database_url):
+    current = settings.get_settings()
+    app = create_app(current.replace(DATABASE_REPLICA_URLS=database_url))
+    app.dependency_overrides[get_session] = lambda: db_session
+    app.dependency_overrides[get_session_factory] = lambda: (lambda: Session(bind=db_session.connection()))
+    try:
+        with TestClient(app) as client:
+            get_replica_set().check()
+            yield client
+    finally:
+        settings.configure(current)
+        dispose_engines()
+        reset_replica_set()
+
+
+def test_reads_rotate_across_replicas(replica_set):
+    first, second = replica_set.replicas
+    assert [replica_set.pick() for _ in range(4)] == [first, second, first, second]
+
+def test_lagging_replicas_are_skipped(replica_set, monkeypatch):
+    first, second = replica_set.replicas
+    monkeypatch.setattr(first, "measure_lag", lambda: settings.REPLICA_MAX_LAG_SECONDS + 10)
+    replica_set.check()
+    assert [replica_set.pick() for _ in range(3)] == [second, second, second]
+
+    monkeypatch.setattr(second, "measure_lag", lambda: settings.REPLICA_MAX_LAG_SECONDS + 10)
+    replica_set.check()
+    assert replica_set.pick() is None
+    assert replica_set.stats()["primary_reads"] == 1
+
+def test_stale_lag_measurements_are_not_trusted(replica_set):
+    for replica in replica_set.replicas:
+        replica.checked_at -= 10 * settings.REPLICA_LAG_CHECK_INTERVAL
+    assert replica_set.pick() is None
+
+def test_reads_follow_the_primary_after_a_write(replica_client, test_user, auth_headers, test_task_payload):
+    emails = lambda: [user["email"] for user in replica_client.get("/api/users/").json()]
+    assert test_user.email not in emails()
+
+    res = replica_client.post("/api/tasks", json=test_task_payload, headers=auth_headers)
+    assert res.status_code < 400, res.text
+    assert PRIMARY_COOKIE in res.cookies
+    assert test_user.email in emails()
+
+def test_cache_misses_are_not_filled_from_a_lagging_replica(replica_client, auth_headers, test_task_payload, monkeypatch):
+    monkeypatch.setattr(response_cache, "backend", MemoryBackend(maxsize=100, ttl=60))
+    task = replica_client.post("/api/tasks", json=test_task_payload, headers=auth_headers).json()
+    # another client, not pinned to the primary, misses the cache right after the write
+    replica_client.cookies.clear()
+
+    for _ in range(2):
+        res = replica_client.get("/api/tasks/user", headers=auth_headers, params={"offset": 0})
+        assert [item["id"] for item in res.json()["items"]] == [task["id"]]
+        assert replica_client.get(f"/api/tasks/{task['id']}").status_code == 200
+    assert response_cache.stats()["routes"]["tasks.user"]["hits"] >= 1
+
+def test_bearer_clients_without_cookies_read_their_writes(replica_client, test_user, auth_headers, test_task_payload):
+    emails = lambda **kwargs: [user["email"] for user in replica_client.get("/api/users/", **kwargs).json()]
+    assert test_user.email not in emails(headers=auth_headers)
+
+    res = replica_client.post("/api/tasks", json=test_task_payload, headers=auth_headers)
+    assert res.status_code < 400, res.text
+    # an API client keeps no cookie jar: only the token ties the read to the write
+    replica_client.cookies.clear()
+    assert test_user.email in emails(headers=auth_headers)
+    assert test_user.email not in emails()
@@ -0,0 +1,125 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta
+
+import fakeredis
+import pytest
+from fastapi import status
+from starlette.requests import Request
+
+from src.tasks.response_cache import CachedResponse, MemoryBackend, RedisBackend, ResponseCache, response_cache
+
+
+def _request(query: str = "") -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/api/tasks/user", "query_string": query.encode(), "headers": []})
+
+@pytest.fixture(params=["memory", "redis"])
+def cache(request):
+    if request.param == "memory":
+        backend = MemoryBackend(maxsize=100, ttl=60)
+    else:
+        backend = RedisBackend("redis://stand-in", client=fakeredis.FakeRedis())
+    return ResponseCache(backend, ttl=60)
+
+def test_fetch_caches_until_invalidated(cache):
+    calls = []
+    def compute():
+        calls.append(1)
+        return CachedResponse('"v1"', b'{"items": []}')
+
+    for _ in range(3):
+        res = cache.fetch("tasks.user", ["generation:user:1"], _request("limit=5"), compute)
+        assert res.body == b'{"items": []}'
+        assert res.headers["etag"] == '"v1"'
+    assert len(calls) == 1
+
+    # other users and other query strings are separate entries
+    cache.fetch("tasks.user", ["generation:user:2"], _request("limit=5"), compute)
+    cache.fetch("tasks.user", ["generation:user:1"], _request("limit=6"), compute)
+    assert len(calls) == 3
+
+    cache.invalidate(user_id=1)
+    cache.fetch("tasks.user", ["generation:user:1"], _request("limit=5"), compute)
+    assert len(calls) == 4
+    assert cache.stats()["routes"]["tasks.user"] == {"hits": 2, "misses": 4, "hit_ratio": 2 / 6}
+
+def test_fetch_single_flight(cache):
+    calls = []
+    def compute():
+        calls.append(1)
+        time.sleep(0.05)
+        return CachedResponse(None, b"{}")
+
+    threads = [
+        threading.Thread(target=cache.fetch, args=("tasks.get", ["generation:task:1"], _request(), compute))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+
+def test_task_routes_use_response_cache(client, auth_headers, test_task_payload, monkeypatch):
+    monkeypatch.setattr(response_cache, "backend", MemoryBackend(maxsize=100, ttl=60))
+    task = client.post('/api/tasks', headers=auth_headers, json=test_task_payload).json()
+
+    before = response_cache.stats()["routes"].get("tasks.get", {}).get("hits", 0)
+    first = client.get(f'/api/tasks/{task["id"]}')
+    second = client.get(f'/api/tasks/{task["id"]}')
+    assert second.json() == first.json()
+    assert response_cache.stats()["routes"]["tasks.get"]["hits"] == before + 1
+
+    client.get('/api/tasks/user', headers=auth_headers, params={"offset": 0})
+    client.patch(f'/api/tasks/{task["id"]}', headers=auth_headers, json={"title": "Renamed"})
+    assert client.get(f'/api/tasks/{task["id"]}').json()["title"] == "Renamed"
+    res = client.get('/api/tasks/user', headers=auth_headers, params={"offset": 0})
+    assert res.status_code == status.HTTP_200_OK
+    assert [item["title"] for item in res.json()["items"]] == ["Renamed"]
+
+def test_overdue_list_follows_the_clock(client, auth_headers, test_task_payload, monkeypatch):
+    monkeypatch.setattr(response_cache, "backend", MemoryBackend(maxsize=100, ttl=60))
+    due_date = datetime.now() + timedelta(seconds=1)
+    client.post('/api/tasks', headers=auth_headers, json={**test_task_payload, "due_date": due_date.isoformat()})
+
+    res = client.get('/api/tasks/user', headers=auth_headers, params={"offset": 0, "overdue": True})
+    assert res.json()["items"] == []
+    assert "etag" not in res.headers
+
+    time.sleep(max((due_date - datetime.now()).total_seconds(), 0) + 0.1)
+    # no write in between, yet the task is now overdue
+    res = client.get('/api/tasks/user', headers={**auth_headers, "If-None-Match": "*"}, params={"offset": 0, "overdue": True})
+    assert res.status_code == status.HTTP_200_OK
+    assert [item["title"] for item in res.json()["items"]] == [test_task_payload["title"]]
+
+class ThreadRecordingRedis(fakeredis.FakeRedis):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threads = set()
+
+    def execute_command(self, *args, **kwargs):
+        self.threads.add(threading.get_ident())
+        return super().execute_command(*args, **kwargs)
+
+def test_async_paths_keep_redis_off_the_event_loop():
+    client = ThreadRecordingRedis()
+    cache = ResponseCache(RedisBackend("redis://stand-in", client=client), ttl=60)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return CachedResponse(None, b"{}")
+
+    async def scenario():
+        for _ in range(2):
+            await cache.fetch_async("tasks.user", ["generation:user:1"], _request(), compute)
+        async with cache.deferred_invalidation():
+            # what a sync route body run through AsyncSession.run_sync does after committing
+            cache.invalidate(user_id=1)
+            assert len(calls) == 1
+        await cache.fetch_async("tasks.user", ["generation:user:1"], _request(), compute)
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+    assert client.threads and threading.get_ident() not in client.threads
@@ -0,0 +1,35 @@
+import pytest
+
+from src import settings
+from src.server import ServerConfig, postgres_limits, resolve
+
+
+def test_plan_shares_the_connection_budget():
+    plan = resolve(ServerConfig(), cpus=8, max_connections=100, superuser_reserved=3, app_settings=settings.get_settings())
+    assert plan.workers == 8
+    # 87 connections / 8 workers -> 10 per worker: 3 kept open, 7 overflow
+    assert (plan.db_pool_size, plan.db_max_overflow) == (3, 7)
+    assert plan.threads == 10
+    assert plan.hasher_workers == 1
+    assert plan.workers * plan.connections_per_worker <= plan.connection_budget
+
+def test_plan_counts_the_async_engine_and_listener():
+    app_settings = settings.get_settings().replace(USE_ASYNC_DB=True, USER_CACHE_NOTIFY=True)
+    plan = resolve(ServerConfig(workers=2), cpus=1, max_connections=100, superuser_reserved=3, app_settings=app_settings)
+    assert plan.connections_per_worker == 2 * (plan.db_pool_size + plan.db_max_overflow) + 1
+    assert plan.workers * plan.connections_per_worker <= plan.connection_budget
+
+def test_plan_over_budget_is_rejected():
+    config = ServerConfig(workers=8, db_pool_size=10, db_max_overflow=5)
+    with pytest.raises(RuntimeError, match="exceeds the budget of 87"):
+        resolve(config, cpus=8, max_connections=100, superuser_reserved=3, app_settings=settings.get_settings())
+
+def test_config_file_rejects_unknown_options(tmp_path):
+    path = tmp_path / "server.toml"
+    path.write_text("workers = 3\nmax_request = 10\n")
+    with pytest.raises(RuntimeError, match="max_request"):
+        ServerConfig.load(str(path))
+
+def test_postgres_limits_reads_the_server(database_url):
+    max_connections, superuser_reserved = postgres_limits(database_url)
+    assert max_connections > superuser_reserved > 0
@@ -1,4 +1,20 @@
+import csv
+import io
+import json
+import re
+from datetime import datetime, timedelta
 from fastapi import status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import event, text
+from sqlmodel import select
+from src.models import Priority, Task, User
+from src.tasks.counters import get_counters, rebuild_counters
+from src.tasks.export import task_filters
+from src.tasks.pagination import SortDirection, TaskSort, encode_cursor
+from src.tasks.routes import _paginate_tasks
+from src.tasks.schemas import PaginatedTaskSchema, TaskReadSchema
+from src.tasks.serialization import TASK_FIELDS, dump_page
 
 
 def test_create_task(client, test_task_payload, auth_headers, test_user):
@@ -22,3 +38,349 @@ def test_create_task_unauthorized(client, test_task_payload):
         }
     )
     assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+def _seed_tasks(db_session, user, count, completed_every=0):
+    for i in range(count):
+        is_completed = bool(completed_every) and i % completed_every == 0
+        db_session.add(Task(title=f"Task {i}", user_id=user.id, is_completed=is_completed))
+    db_session.commit()
+
+def test_get_user_tasks_first_page_by_default(client, db_session, auth_headers, test_user):
+    _seed_tasks(db_session, test_user, 3)
+    res = client.get('/api/tasks/user', headers=auth_headers)
+    assert res.json()["offset"] == 0
+    assert [item["title"] for item in res.json()["items"]] == ["Task 0", "Task 1", "Task 2"]
+
+def test_get_user_tasks_total_respects_filter(client, db_session, auth_headers, test_user):
+    _seed_tasks(db_session, test_user, 6, completed_every=3)
+    res = client.get('/api/tasks/user', headers=auth_headers, params={"is_completed": True})
+    assert res.status_code == status.HTTP_200_OK
+    assert res.json()["total"] == 2
+
+    res = client.get('/api/tasks/user', headers=auth_headers, params={"include_total": False})
+    assert res.json()["total"] is None
+
+def test_get_user_tasks_cursor_pagination(client, db_session, auth_headers, test_user):
+    _seed_tasks(db_session, test_user, 5)
+    seen = []
+    params = {"limit": 2, "offset": 0, "cursor": None}
+    while True:
+        res = client.get('/api/tasks/user', headers=auth_headers, params={k: v for k, v in params.items() if v is not None})
+        assert res.status_code == status.HTTP_200_OK
+        data = res.json()
+        seen.extend(item["id"] for item in data["items"])
+        if not data["has_next"]:
+            assert data["next_cursor"] is None
+            break
+        params["cursor"] = data["next_cursor"]
+    assert len(seen) == 5
+    assert seen == sorted(seen)
+
+def test_get_tasks_filtered_and_bounded(client, db_session, test_user):
+    _seed_tasks(db_session, test_user, 5, completed_every=2)
+    res = client.get('/api/tasks', params={"user_id": test_user.id, "is_completed": True, "include_total": True})
+    assert res.status_code == status.HTTP_200_OK
+    data = res.json()
+    assert data["total"] == 3
+    assert all(item["is_completed"] for item in data["items"])
+
+    res = client.get('/api/tasks', params={"user_id": test_user.id, "limit": 2})
+    assert len(res.json()["items"]) == 2
+    assert res.json()["has_next"] is True
+
+    res = client.get('/api/tasks', params={"limit": 100000})
+    assert res.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_get_tasks_stream(client, db_session, test_user):
+    _seed_tasks(db_session, test_user, 3)
+    res = client.get('/api/tasks', params={"user_id": test_user.id, "priority": "MEDIUM", "stream": True})
+    assert res.status_code == status.HTTP_200_OK
+    assert res.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in res.text.splitlines()]
+    assert [row["title"] for row in rows] == ["Task 0", "Task 1", "Task 2"]
+
+def test_search_user_tasks(client, db_session, auth_headers, test_user):
+    db_session.add(Task(title="Buy groceries", description="milk and eggs", user_id=test_user.id))
+    db_session.add(Task(title="Call the bank", description="ask about groceries budget", user_id=test_user.id))
+    db_session.add(Task(title="Write report", user_id=test_user.id))
+    db_session.commit()
+
+    res = client.get('/api/tasks/user/search', headers=auth_headers, params={"q": "grocery"})
+    assert res.status_code == status.HTTP_200_OK
+    # title matches rank above description matches
+    assert [item["title"] for item in res.json()["items"]] == ["Buy groceries", "Call the bank"]
+
+    res = client.get('/api/tasks/user/search', headers=auth_headers, params={"q": "groceries -milk"})
+    assert [item["title"] for item in res.json()["items"]] == ["Call the bank"]
+
+    res = client.get('/api/tasks/user/search', headers=auth_headers, params={"q": "dentist"})
+    assert res.json()["items"] == []
+
+def test_get_user_tasks_filters_and_sort(client, db_session, auth_headers, test_user):
+    now = datetime.now()
+    db_session.add(Task(title="late", priority=Priority.LOW, due_date=now - timedelta(days=1), user_id=test_user.id))
+    db_session.add(Task(title="done", priority=Priority.HIGH, due_date=now - timedelta(days=2), is_completed=True, user_id=test_user.id))
+    db_session.add(Task(title="soon", priority=Priority.HIGH, due_date=now + timedelta(days=1), user_id=test_user.id))
+    db_session.add(Task(title="someday", priority=Priority.MEDIUM, user_id=test_user.id))
+    db_session.commit()
+
+    def titles(**params):
+        res = client.get('/api/tasks/user', headers=auth_headers, params={"offset": 0, **params})
+        assert res.status_code == status.HTTP_200_OK
+        return [item["title"] for item in res.json()["items"]]
+
+    assert titles(overdue=True) == ["late"]
+    assert titles(priority="HIGH", sort="due_date") == ["done", "soon"]
+    assert titles(due_from=now.isoformat(), sort="due_date") == ["soon"]
+    # urgency, not alphabetical order; ties broken by id
+    assert titles(sort="priority", direction="desc") == ["soon", "done", "someday", "late"]
+    # tasks without a due date sort last in both directions
+    assert titles(sort="due_date", direction="desc")[-1] == "someday"
+
+    res = client.get('/api/tasks/user', headers=auth_headers, params={"sort": "due_date", "cursor": "x"})
+    assert res.status_code == status.HTTP_400_BAD_REQUEST
+
+# 500 other users plus the test user with 5% of the rows; 30% completed,
+# a fifth HIGH priority, a quarter without a due date
+SEED_TASKS_SQL = text("""
+    INSERT INTO users (email, hashed_password, created_at)
+    SELECT 'seed' || n || '@test.com', 'x', now() FROM generate_series(1, 500) AS n;
+    INSERT INTO tasks (title, user_id, priority, is_completed, due_date, created_at, updated_at)
+    SELECT 'Task ' || n,
+           CASE WHEN n % 20 = 0 THEN :user_id ELSE (SELECT min(id) FROM users WHERE email LIKE 'seed%') + n % 500 END,
+           (ARRAY['LOW', 'MEDIUM', 'MEDIUM', 'MEDIUM', 'HIGH'])[1 + (n / 20) % 5]::priority,
+           (n / 20) % 10 < 3,
+           CASE WHEN (n / 20) % 4 = 0 THEN NULL ELSE now() + ((n / 20) % 365 - 180) * interval '1 day' END,
+           now() - n * interval '1 minute',
+           now()
+    FROM generate_series(1, 50000) AS n;
+    ANALYZE users;
+    ANALYZE tasks;
+""")
+
+def _indexes_used(session, filters, sort, direction, cursor=None) -> list[str]:
+    """Indexes in the plan of the statement _paginate_tasks sends."""
+    connection = session.connection()
+    statements = []
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(connection, "before_cursor_execute", capture)
+    try:
+        _paginate_tasks(session, filters, 0, 10, cursor, None, sort, direction)
+    finally:
+        event.remove(connection, "before_cursor_execute", capture)
+    [(statement, parameters)] = statements
+    plan = "\n".join(row[0] for row in connection.exec_driver_sql(f"EXPLAIN {statement}", parameters))
+    assert "Seq Scan" not in plan, plan
+    return re.findall(r"ix_tasks_\w+", plan)
+
+def test_user_task_queries_use_indexes(db_session, test_user):
+    db_session.connection().execute(SEED_TASKS_SQL, {"user_id": test_user.id})
+    now = datetime.now()
+    index_used = lambda *args: _indexes_used(db_session, *args)
+
+    due_range = {"due_from": now, "due_to": now + timedelta(days=7)}
+    cursor = encode_cursor(now - timedelta(days=3), 2 ** 31 - 1)
+    cases = [
+        ({}, "ix_tasks_user_id_created_at_id", "ix_tasks_user_id_due_date"),
+        ({"is_completed": False}, "ix_tasks_user_id_created_at_id", "ix_tasks_user_id_is_completed_due_date"),
+        ({"priority": Priority.HIGH}, "ix_tasks_user_id_created_at_id", "ix_tasks_user_id_priority_due_date"),
+        ({"overdue": True}, "ix_tasks_user_id_created_at_id", "ix_tasks_user_id_is_completed_due_date"),
+        (due_range, "ix_tasks_user_id_due_date", "ix_tasks_user_id_due_date"),
+    ]
+    for kwargs, by_created_at, by_due_date in cases:
+        filters = task_filters(test_user.id, **kwargs)
+        for direction in SortDirection:
+            for page_cursor in (None, cursor):
+                assert index_used(filters, TaskSort.CREATED_AT, direction, page_cursor) == [by_created_at], kwargs
+        assert index_used(filters, TaskSort.DUE_DATE, SortDirection.ASC) == [by_due_date], kwargs
+        index_used(filters, TaskSort.PRIORITY, SortDirection.DESC)
+
+def test_all_task_listing_uses_an_index(db_session, test_user):
+    db_session.connection().execute(SEED_TASKS_SQL, {"user_id": test_user.id})
+    cursor = encode_cursor(datetime.now() - timedelta(days=3), 2 ** 31 - 1)
+    for direction in SortDirection:
+        for page_cursor in (None, cursor):
+            used = _indexes_used(db_session, task_filters(), TaskSort.CREATED_AT, direction, page_cursor)
+            assert used == ["ix_tasks_created_at_id"]
+
+def test_fast_serialization_is_byte_compatible(client, db_session, auth_headers, test_user, monkeypatch):
+    db_session.add(Task(title="Say \"hi\" \\ <b>", description=None, due_date=datetime(2030, 1, 1, 9, 30), user_id=test_user.id))
+    db_session.add(Task(title="Plain", description="line\nbreak", priority=Priority.HIGH, is_completed=True, user_id=test_user.id))
+    db_session.commit()
+    task_id = db_session.exec(select(Task.id).where(Task.user_id == test_user.id)).first()
+
+    requests = [
+        ('/api/tasks', {"user_id": test_user.id, "include_total": True}),
+        ('/api/tasks/user', {"offset": 0, "limit": 1}),
+        (f'/api/tasks/{task_id}', {}),
+    ]
+    bodies = {}
+    for fast in (False, True):
+        monkeypatch.setattr("src.settings.FAST_TASK_SERIALIZATION", fast)
+        bodies[fast] = [client.get(url, headers=auth_headers, params=params).content for url, params in requests]
+    assert bodies[True] == bodies[False]
+
+def test_dump_page_matches_response_model_rendering():
+    assert TASK_FIELDS == tuple(TaskReadSchema.model_fields)
+    now = datetime(2026, 10, 18, 12, 0, 0, 123456)
+    row = (1, "Café ☕ \u2028", None, now, Priority.LOW, False, now, now, 7)
+    page = dict(items=[row], total=1, limit=10, offset=0, has_next=False, next_cursor=None)
+    schema = PaginatedTaskSchema(**{**page, "items": [dict(zip(TASK_FIELDS, row))]})
+    assert dump_page(page) == JSONResponse(jsonable_encoder(schema)).body
+
+def test_get_user_tasks_invalid_cursor(client, auth_headers):
+    res = client.get('/api/tasks/user', headers=auth_headers, params={"cursor": "not-a-cursor"})
+    assert res.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_task_counters_follow_writes(client, auth_headers, test_task_payload):
+    created = [
+        client.post('/api/tasks', headers=auth_headers, json={**test_task_payload, "priority": "HIGH"}).json()
+        for _ in range(3)
+    ]
+    client.patch(f'/api/tasks/{created[0]["id"]}', headers=auth_headers, json={"is_completed": True, "priority": "LOW"})
+    client.delete(f'/api/tasks/{created[1]["id"]}', headers=auth_headers)
+
+    res = client.get('/api/tasks/user/stats', headers=auth_headers)
+    assert res.status_code == status.HTTP_200_OK
+    assert res.json() == {"total": 2, "completed": 1, "low": 1, "medium": 0, "high": 1}
+
+    res = client.get('/api/tasks/user', headers=auth_headers, params={"is_completed": False})
+    assert res.json()["total"] == 1
+
+def test_task_etags(client, auth_headers, test_task_payload):
+    task = client.post('/api/tasks', headers=auth_headers, json=test_task_payload).json()
+
+    res = client.get('/api/tasks/user', headers=auth_headers)
+    etag = res.headers["etag"]
+    res = client.get('/api/tasks/user', headers={**auth_headers, "If-None-Match": etag})
+    assert res.status_code == status.HTTP_304_NOT_MODIFIED
+    assert res.content == b""
+    # a different query is a different representation
+    res = client.get('/api/tasks/user', headers={**auth_headers, "If-None-Match": etag}, params={"limit": 5})
+    assert res.status_code == status.HTTP_200_OK
+
+    res = client.get(f'/api/tasks/{task["id"]}')
+    task_tag = res.headers["etag"]
+    res = client.get(f'/api/tasks/{task["id"]}', headers={"If-None-Match": f"W/{task_tag}"})
+    assert res.status_code == status.HTTP_304_NOT_MODIFIED
+
+    client.patch(f'/api/tasks/{task["id"]}', headers=auth_headers, json={"title": "Renamed"})
+    res = client.get('/api/tasks/user', headers={**auth_headers, "If-None-Match": etag})
+    assert res.status_code == status.HTTP_200_OK
+    assert res.headers["etag"] != etag
+    res = client.get(f'/api/tasks/{task["id"]}', headers={"If-None-Match": task_tag})
+    assert res.status_code == status.HTTP_200_OK
+    assert res.json()["title"] == "Renamed"
+
+def test_single_task_writes_miss_path(client, db_session, auth_headers, test_user, test_task_payload):
+    other = User(email="other@example.com", hashed_password="x")
+    db_session.add(other)
+    db_session.commit()
+    foreign = Task(title="Not yours", user_id=other.id)
+    db_session.add(foreign)
+    db_session.commit()
+
+    for method in ("PATCH", "DELETE"):
+        res = client.request(method, f'/api/tasks/{foreign.id}', headers=auth_headers, json={"title": "x"})
+        assert res.status_code == status.HTTP_403_FORBIDDEN
+        res = client.request(method, '/api/tasks/999999999', headers=auth_headers, json={"title": "x"})
+        assert res.status_code == status.HTTP_404_NOT_FOUND
+
+    task = client.post('/api/tasks', headers=auth_headers, json=test_task_payload).json()
+    res = client.patch(f'/api/tasks/{task["id"]}', headers=auth_headers, json={"is_completed": True})
+    assert res.json()["title"] == task["title"]
+    assert res.json()["updated_at"] > task["updated_at"]
+
+def test_rebuild_counters(db_session, test_user):
+    _seed_tasks(db_session, test_user, 4, completed_every=2)
+    assert rebuild_counters(db_session, user_id=test_user.id) == 1
+    counters = get_counters(db_session, test_user.id)
+    assert (counters.total, counters.completed, counters.medium) == (4, 2, 4)
+
+def test_bulk_task_endpoints(client, db_session, auth_headers, test_user):
+    other = User(email="other@test.com", hashed_password="x")
+    db_session.add(other)
+    db_session.commit()
+    foreign = Task(title="Not mine", user_id=other.id)
+    db_session.add(foreign)
+    db_session.commit()
+
+    res = client.post('/api/tasks/bulk', headers=auth_headers, json={"items": [
+        {"title": "Bulk 1"},
+        {"title": "Bulk 2", "priority": "URGENT"},
+        {"title": "Bulk 3", "priority": "HIGH"},
+    ]})
+    assert res.status_code == status.HTTP_200_OK, res.text
+    data = res.json()
+    assert (data["succeeded"], data["failed"]) == (2, 1)
+    assert [r["ok"] for r in data["results"]] == [True, False, True]
+    ids = [r["id"] for r in data["results"] if r["ok"]]
+
+    res = client.patch('/api/tasks/bulk', headers=auth_headers, json={"items": [
+        {"id": ids[0], "is_completed": True},
+        {"id": ids[1], "title": "Renamed"},
+        {"id": foreign.id, "title": "Hijacked"},
+    ]})
+    data = res.json()
+    assert [r["ok"] for r in data["results"]] == [True, True, False]
+    assert data["results"][0]["task"]["is_completed"] is True
+    assert data["results"][0]["task"]["title"] == "Bulk 1"
+    assert data["results"][1]["task"]["title"] == "Renamed"
+    assert data["results"][1]["task"]["priority"] == "HIGH"
+    assert data["results"][2]["error"]["code"] == "NOT FOUND"
+
+    res = client.get('/api/tasks/user/stats', headers=auth_headers)
+    assert res.json() == {"total": 2, "completed": 1, "low": 0, "medium": 1, "high": 1}
+
+    res = client.request('DELETE', '/api/tasks/bulk', headers=auth_headers, json={"ids": [ids[0], foreign.id]})
+    data = res.json()
+    assert [r["ok"] for r in data["results"]] == [True, False]
+    assert db_session.get(Task, foreign.id) is not None
+    assert client.get('/api/tasks/user/stats', headers=auth_headers).json()["total"] == 1
+
+def test_export_user_tasks(client, db_session, auth_headers, test_user):
+    db_session.add_all([
+        Task(title="Due soon", user_id=test_user.id, due_date=datetime(2030, 1, 5)),
+        Task(title="Due later", user_id=test_user.id, due_date=datetime(2030, 3, 1)),
+        Task(title="Done, \"quoted\"", user_id=test_user.id, is_completed=True),
+    ])
+    db_session.commit()
+
+    res = client.get('/api/tasks/user/export', headers=auth_headers, params={"due_to": "2030-02-01T00:00:00"})
+    assert res.status_code == status.HTTP_200_OK
+    assert res.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in res.text.splitlines()]
+    assert [row["title"] for row in rows] == ["Due soon"]
+    assert rows[0]["due_date"] == "2030-01-05T00:00:00"
+
+    res = client.get('/api/tasks/user/export', headers=auth_headers, params={"format": "csv", "is_completed": True})
+    assert res.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(res.text)))
+    assert [row["title"] for row in rows] == ['Done, "quoted"']
+    assert rows[0]["priority"] == "MEDIUM"
+
+def test_import_user_tasks(client, auth_headers):
+    body = (
+        "title,description,priority,is_completed,due_date\n"
+        "Imported 1,,HIGH,true,2030-01-01T09:00:00\n"
+        "Imported 2,\"multi, part\",LOW,false,\n"
+        "Broken,,URGENT,false,\n"
+        "Bad date,,LOW,false,tomorrow\n"
+    )
+    res = client.post('/api/tasks/import', headers=auth_headers, files={"file": ("tasks.csv", body, "text/csv")})
+    assert res.status_code == status.HTTP_200_OK, res.text
+    report = res.json()
+    assert (report["imported"], report["failed"]) == (2, 2)
+    assert [error["line"] for error in report["errors"]] == [4, 5]
+
+    ndjson = '{"title": "From json", "priority": "MEDIUM"}\nnot json\n'
+    res = client.post('/api/tasks/import', headers=auth_headers, files={"file": ("tasks.ndjson", ndjson)})
+    assert (res.json()["imported"], res.json()["failed"]) == (1, 1)
+
+    stats = client.get('/api/tasks/user/stats', headers=auth_headers).json()
+    assert stats == {"total": 3, "completed": 1, "low": 1, "medium": 1, "high": 1}
+    titles = {item["title"]: item for item in client.get('/api/tasks/user', headers=auth_headers, params={"offset": 0}).json()["items"]}
+    assert titles["Imported 2"]["description"] == "multi, part"
+    assert titles["Imported 1"]["due_date"] == "2030-01-01T09:00:00"
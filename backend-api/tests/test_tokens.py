@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta, timezone
+import jwt
+import pytest
+from fastapi import HTTPException
+
+from src import settings
+from src.users.helpers import ALGORITHM, create_access_token, decode_token, token_cache
+
+
+def test_decode_token_memoizes_verified_tokens():
+    token = create_access_token({"sub": "cached@test.com", "uid": 1})
+    hits = token_cache.hits
+    assert decode_token(token)["sub"] == "cached@test.com"
+    assert decode_token(token)["sub"] == "cached@test.com"
+    assert token_cache.hits == hits + 1
+
+def test_decode_token_does_not_cache_rejected_tokens():
+    token = create_access_token({"sub": "tampered@test.com"})
+    size = len(token_cache)
+    with pytest.raises(HTTPException) as exc:
+        decode_token(token[:-2] + "xx")
+    assert exc.value.detail["message"] == "Token is invalid."
+    assert len(token_cache) == size
+
+def test_decode_token_reports_expiry():
+    expired = jwt.encode(
+        {"sub": "expired@test.com", "exp": datetime.now(timezone.utc) - timedelta(seconds=1)},
+        settings.AUTHJWT_SECRET_KEY,
+        algorithm=ALGORITHM,
+    )
+    with pytest.raises(HTTPException) as exc:
+        decode_token(expired)
+    assert exc.value.detail["message"] == "Token is expired."
@@ -1,3 +1,10 @@
+from datetime import datetime, timedelta
+from sqlmodel import Session, select
+
+from src.models import PasswordReset, User
+from src.users.cache import cache_user, invalidate_user, user_cache
+from src.users.resets import purge_password_resets, purge_stats
+
 
 def test_create_user(client):
     res = client.post(
@@ -17,4 +24,54 @@ def test_login_user(client, test_user):
     assert res.status_code == 200, res.text
     data = res.json()
     assert "access_token" in data
-    assert data.get("token_type") in (None, "bearer", "Bearer")
\ No newline at end of file
+    assert data.get("token_type") in (None, "bearer", "Bearer")
+
+def test_current_user_is_cached_until_deleted(client, auth_headers, test_user):
+    hits = user_cache.hits
+    assert client.post("/api/users/verify", headers=auth_headers).status_code == 200
+    assert client.post("/api/users/verify", headers=auth_headers).status_code == 200
+    assert user_cache.hits == hits + 1
+
+    assert client.delete(f"/api/users/{test_user.id}").status_code == 204
+    res = client.post("/api/users/verify", headers=auth_headers)
+    assert res.status_code == 401
+
+def test_forgot_password_supersedes_outstanding_resets(client, db_session, test_user):
+    for _ in range(2):
+        res = client.post("/api/users/forgot-password", json={"email": test_user.email})
+        assert res.status_code == 204, res.text
+
+    resets = db_session.exec(
+        select(PasswordReset).where(PasswordReset.user_id == test_user.id).order_by(PasswordReset.id)
+    ).all()
+    assert [reset.used for reset in resets] == [True, False]
+
+def test_purge_password_resets_in_batches(db_session, test_user):
+    now = datetime.now()
+    db_session.add_all(
+        [PasswordReset(user_id=test_user.id, hashed_token=f"used-{i}", used=True) for i in range(3)]
+        + [PasswordReset(user_id=test_user.id, hashed_token=f"expired-{i}", expires_at=now - timedelta(minutes=1)) for i in range(2)]
+        + [PasswordReset(user_id=test_user.id, hashed_token="live")]
+    )
+    db_session.commit()
+    runs = purge_stats.runs
+
+    purged = purge_password_resets(lambda: Session(bind=db_session.connection()), batch_size=2)
+
+    assert purged == 5
+    assert db_session.exec(select(PasswordReset.hashed_token)).all() == ["live"]
+    assert purge_stats.runs == runs + 1 and purge_stats.last_purged == 5
+
+def test_user_cache_eviction_survives_a_read_before_commit(db_session, test_user):
+    cache_user(test_user)
+    test_user.hashed_password = "rehashed"
+    db_session.add(test_user)
+    invalidate_user(db_session, test_user.id)
+    assert user_cache.get(test_user.id) is None
+
+    # a concurrent request reads the row before the commit and caches the old version
+    stale = User(**{**test_user.model_dump(), "hashed_password": "old"})
+    cache_user(stale)
+    assert user_cache.get(test_user.id) is not None
+    db_session.commit()
+    assert user_cache.get(test_user.id) is None
@@ -21,7 +21,7 @@ export default function TaskList() {
   const { data, isLoading } = useQuery<TaskPage>({
     queryKey: ["tasks"],
     queryFn: () =>
-      fetchTasks(auth.api, { limit: 10, offset: 1, is_completed: false }),
+      fetchTasks(auth.api, { limit: 10, offset: 0, is_completed: false }),
     staleTime: 30_000,
   });
 